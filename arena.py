@@ -0,0 +1,692 @@
+"""
+Общая память для состояний досок: арена BoardArena хранит доски
+в одном блоке multiprocessing.shared_memory в виде записей фиксированного
+размера, а ArenaBoard - потомок Board, который работает прямо с записью
+арены. Процессы передают друг другу только имя блока и номера досок,
+поэтому готовые расстановки и результаты партий не копируются и не
+сериализуются.
+
+Запись доски (все числа - little-endian, смещения кратны 8 байтам):
+    хеш Зобриста                      Q
+    живые корабли, поставленные       q, q
+    для каждого корабля x, y, направление, жизни    h * 4
+    символ каждой клетки (коды CELL_SYMBOLS)        B * size * size
+    заблокирована ли клетка                         B * size * size
+После всех записей идут результаты партий: (победитель, ходов) для каждой
+доски, -1 пока партия не сыграна.
+
+Запуск: python arena.py --boards 20000 --workers 2
+"""
+
+import argparse
+import os
+import pickle
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from random import Random
+from time import perf_counter
+
+from main import (BOARD_SIZE, SHIPS_TYPES, Board, BoardWrongShipException,
+                  DensityAI, Dot, Game, Ship, parse_fleet, zobrist_keys)
+
+
+# Сигнатура блока арены
+ARENA_MAGIC = int.from_bytes(b'BSAR', 'little')
+# Версия формата записей
+ARENA_VERSION = 1
+# Количество досок в арене по умолчанию
+ARENA_CAPACITY = 1000
+# Символы клеток Board; в записи хранится номер символа
+CELL_SYMBOLS = ('○', '■', '•', '×')
+CELL_CODES = {symbol: code for code, symbol in enumerate(CELL_SYMBOLS)}
+
+
+def _aligned(size: int) -> int:
+    """
+    Вспомогательная функция.
+    Округляет размер вверх до кратного 8 байтам.
+    """
+
+    return (size + 7) & ~7
+
+
+def slot_layout(size: int, ships: int) -> tuple[int, int, int, int]:
+    """
+    Возвращает размер записи доски size с ships кораблями в байтах
+    и смещения внутри записи: кораблей, символов клеток и блокировок.
+    """
+
+    ships_offset = 24
+    cells_offset = ships_offset + 8 * ships
+    locked_offset = cells_offset + size * size
+    return _aligned(locked_offset + size * size), ships_offset, cells_offset, locked_offset
+
+
+class _ArenaShip(Ship):
+    """
+    Вспомогательный класс: корабль, у которого положение и жизни
+    хранятся в записи арены. Жизни читаются и пишутся прямо в запись.
+    """
+
+    __slots__ = ('_record',)
+
+    def __init__(self, record: memoryview, length: int) -> None:
+        self._record = record
+        self.length = length
+        self.bow = Dot(record[0], record[1])
+        self.direction = record[2]
+        self._dots = None
+
+    @property
+    def lives(self) -> int:
+        return self._record[3]
+
+    @lives.setter
+    def lives(self, value: int) -> None:
+        self._record[3] = value
+
+
+class _ArenaRow():
+    """
+    Вспомогательный класс: строка table доски арены. Символы клеток
+    переводятся в коды записи и обратно при каждом обращении.
+    """
+
+    __slots__ = ('_cells',)
+
+    def __init__(self, cells: memoryview) -> None:
+        self._cells = cells
+
+    def __getitem__(self, y: int) -> str:
+        return CELL_SYMBOLS[self._cells[y]]
+
+    def __setitem__(self, y: int, symbol: str) -> None:
+        self._cells[y] = CELL_CODES[symbol]
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def __iter__(self):
+        return (CELL_SYMBOLS[code] for code in self._cells)
+
+
+class _ArenaDots():
+    """
+    Вспомогательный класс: множество locked_dots доски арены,
+    по байту на клетку в записи.
+    """
+
+    __slots__ = ('_locked', '_size')
+
+    def __init__(self, locked: memoryview, size: int) -> None:
+        self._locked = locked
+        self._size = size
+
+    def __contains__(self, dot: Dot) -> bool:
+        size = self._size
+        return 0 <= dot.x < size and 0 <= dot.y < size and \
+            bool(self._locked[dot.x * size + dot.y])
+
+    def add(self, dot: Dot) -> None:
+        self._locked[dot.x * self._size + dot.y] = 1
+
+    def discard(self, dot: Dot) -> None:
+        if dot in self:
+            self._locked[dot.x * self._size + dot.y] = 0
+
+    def clear(self) -> None:
+        self._locked[:] = bytes(len(self._locked))
+
+    def __len__(self) -> int:
+        return self._locked.tobytes().count(1)
+
+    def __iter__(self):
+        size = self._size
+        return (Dot(cell // size, cell % size)
+                for cell, locked in enumerate(self._locked) if locked)
+
+
+class ArenaBoard(Board):
+    """
+    Класс для представления доски, состояние которой хранится в записи
+    арены BoardArena. Логика игры - та же, что у Board: меняются только
+    хранилища table, locked_dots, жизней кораблей, live_ships и zobrist.
+    Индекс _ship_at и журнал отмены у каждого процесса свои.
+
+    Наследуемые атрибуты
+    --------
+    size : int
+        Размер доски.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    table : list
+        Строки клеток доски (представления записи арены).
+    ships : list
+        Список кораблей доски (жизни хранятся в записи арены).
+    locked_dots : set
+        Множество заблокированных точек (представление записи арены).
+    live_ships : int
+        Количество живых кораблей на доске.
+
+    Атрибуты
+    --------
+    arena : BoardArena
+        Арена, в которой хранится доска.
+    index : int
+        Номер доски в арене.
+
+    Наследуемые методы
+    --------
+    shot(Dot):
+        Делает выстрел по доске.
+    is_loser():
+        Проверяет состояние проигрыша.
+    make_shot(Dot), unmake_shot():
+        Делают выстрел с возможностью отмены и отменяют его.
+    render(), show():
+        Возвращают и выводят изображение доски.
+
+    Методы
+    --------
+    snapshot():
+        Возвращает неизменяемое состояние доски (байты записи арены).
+    restore(tuple):
+        Восстанавливает состояние доски из snapshot().
+    add_ship(Ship):
+        Ставит корабль на доску и записывает его в арену.
+    release():
+        Освобождает представления записи арены.
+    """
+
+    def __init__(self, arena: 'BoardArena', index: int) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта ArenaBoard.
+        Board.__init__ не вызывается: состояние доски уже лежит в арене.
+
+        Атрибуты
+        --------
+        arena : BoardArena
+            Арена, в которой хранится доска.
+        index : int
+            Номер доски в арене.
+        """
+
+        size = arena.size
+        Dot.intern(size)
+        self.arena = arena
+        self.index = index
+        self.size = size
+        self.ships_types = list(arena.ships_types)
+        slot_size, ships_offset, cells_offset, locked_offset = \
+            slot_layout(size, len(self.ships_types))
+        start = arena.slot_offset(index)
+        buffer = arena.shared.buf
+        self._views = [buffer[start:start + 8].cast('Q'),
+                       buffer[start + 8:start + 24].cast('q')]
+        self._zobrist, self._counters = self._views
+        self._records = [buffer[start + offset:start + offset + 8].cast('h')
+                         for offset in range(ships_offset, cells_offset, 8)]
+        cells = [buffer[start + cells_offset + x * size:
+                        start + cells_offset + (x + 1) * size]
+                 for x in range(size)]
+        self._locked = buffer[start + locked_offset:start + locked_offset + size * size]
+        self._views += self._records + cells + [self._locked]
+        self.table = [_ArenaRow(row) for row in cells]
+        self._dots = _ArenaDots(self._locked, size)
+        self.ships = list()
+        self._ship_at = [None] * (size * size)
+        for record, length in zip(self._records[:self._counters[1]], self.ships_types):
+            ship = _ArenaShip(record, length)
+            for dot in ship.dots:
+                self._ship_at[dot.x * size + dot.y] = len(self.ships)
+            self.ships.append(ship)
+        self._zobrist_keys = zobrist_keys(size)
+        self._journal = list()
+        self._frame = None
+        arena._views.add(self)
+
+    @property
+    def live_ships(self) -> int:
+        return self._counters[0]
+
+    @live_ships.setter
+    def live_ships(self, value: int) -> None:
+        self._counters[0] = value
+
+    @property
+    def zobrist(self) -> int:
+        return self._zobrist[0]
+
+    @zobrist.setter
+    def zobrist(self, value: int) -> None:
+        self._zobrist[0] = value
+
+    @property
+    def locked_dots(self) -> _ArenaDots:
+        return self._dots
+
+    @locked_dots.setter
+    def locked_dots(self, dots) -> None:
+        dots = list(dots)
+        self._dots.clear()
+        for dot in dots:
+            self._dots.add(dot)
+
+    # Заблокированные точки хранятся в записи арены, поэтому маска
+    # Board._locked_mask не ведётся: её изменения в методах Board
+    # отбрасываются, а snapshot() копирует байты записи
+    @property
+    def _locked_mask(self) -> int:
+        return 0
+
+    @_locked_mask.setter
+    def _locked_mask(self, value: int) -> None:
+        pass
+
+    def snapshot(self) -> tuple:
+        """
+        Возвращает неизменяемое состояние доски: (байты заблокированных
+        точек записи, жизни кораблей, количество живых кораблей, хеш Зобриста).
+        """
+
+        return (bytes(self._locked),
+                tuple(ship.lives for ship in self.ships),
+                self.live_ships, self.zobrist)
+
+    def restore(self, state: tuple) -> None:
+        """
+        Восстанавливает состояние доски из snapshot() и очищает
+        журнал отмены.
+        """
+
+        locked, lives, live_ships, zobrist = state
+        mask = sum(1 << cell for cell, flag in enumerate(locked) if flag)
+        super().restore((mask, lives, live_ships, zobrist))
+
+    def add_ship(self, ship: Ship) -> None:
+        """
+        Ставит корабль на доску (если не получается, выбрасывает исключение)
+        и записывает его положение и жизни в арену.
+        """
+
+        count = self._counters[1]
+        if count >= len(self.ships_types):
+            raise BoardWrongShipException()
+        record = self._records[count]
+        record[0], record[1], record[2], record[3] = \
+            ship.bow.x, ship.bow.y, ship.direction, ship.length
+        super().add_ship(_ArenaShip(record, ship.length))
+        self._counters[1] = count + 1
+
+    def release(self) -> None:
+        """
+        Освобождает представления записи арены. После этого доской
+        пользоваться нельзя, а арену можно закрыть.
+        """
+
+        for view in self._views:
+            view.release()
+        self._views = list()
+
+
+class BoardArena():
+    """
+    Класс для представления арены: блока общей памяти с записями досок
+    фиксированного размера и результатами партий. При передаче в другой
+    процесс (pickle) передаётся только имя блока, и процесс подключается
+    к той же памяти.
+
+    Атрибуты
+    --------
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    capacity : int
+        Количество записей досок.
+    slot_size : int
+        Размер записи одной доски в байтах.
+    shared : SharedMemory
+        Блок общей памяти.
+    name : str
+        Имя блока общей памяти.
+
+    Методы
+    --------
+    @classmethod
+    attach(str):
+        Подключается к существующей арене по имени блока.
+    slot_offset(int):
+        Возвращает смещение записи доски в блоке.
+    store(int, Board):
+        Записывает доску в арену.
+    view(int):
+        Возвращает доску ArenaBoard, которая работает прямо с записью.
+    load(int, board_class=Board):
+        Возвращает копию доски из арены.
+    set_result(int, int, int):
+        Записывает результат партии на доске.
+    result(int):
+        Возвращает результат партии на доске.
+    close():
+        Отключается от блока общей памяти.
+    unlink():
+        Удаляет блок общей памяти.
+    """
+
+    def __init__(self,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES,
+                 capacity: int = ARENA_CAPACITY,
+                 name: str = None) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта BoardArena
+        и создаёт новый блок общей памяти (с именем name, если оно задано).
+
+        Атрибуты
+        --------
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        capacity : int
+            Количество записей досок.
+        slot_size : int
+            Размер записи одной доски в байтах.
+        shared : SharedMemory
+            Блок общей памяти.
+        name : str
+            Имя блока общей памяти.
+        """
+
+        Game.check_fleet(size, ships_types)
+        if capacity < 1:
+            raise ValueError('Параметр capacity должен быть больше нуля.')
+        header = [ARENA_MAGIC, ARENA_VERSION, size, capacity,
+                  len(ships_types), *ships_types]
+        slot_size = slot_layout(size, len(ships_types))[0]
+        shared = shared_memory.SharedMemory(
+            name, create=True,
+            size=8 * len(header) + capacity * slot_size + 8 * capacity)
+        view = shared.buf[:8 * len(header)].cast('q')
+        for position, value in enumerate(header):
+            view[position] = value
+        view.release()
+        self._map(shared)
+        self._results[:] = memoryview(bytes([0xFF]) * (8 * capacity)).cast('i')
+
+    @classmethod
+    def attach(cls, name: str) -> 'BoardArena':
+        """
+        Подключается к существующей арене по имени блока общей памяти.
+        Если в блоке не арена или другая версия формата, выбрасывает ValueError.
+        """
+
+        arena = cls.__new__(cls)
+        arena._map(shared_memory.SharedMemory(name))
+        return arena
+
+    def _map(self, shared: shared_memory.SharedMemory) -> None:
+        """
+        Вспомогательный метод.
+        Читает заголовок блока и готовит представление результатов.
+        """
+
+        header = shared.buf[:40].cast('q')
+        magic, version, size, capacity, ships = header.tolist()
+        header.release()
+        if (magic, version) != (ARENA_MAGIC, ARENA_VERSION):
+            shared.close()
+            raise ValueError('Блок общей памяти не является ареной досок.')
+        header_size = 8 * (5 + ships)
+        header = shared.buf[40:header_size].cast('q')
+        self.ships_types = header.tolist()
+        header.release()
+        self.size = size
+        self.capacity = capacity
+        self.slot_size = slot_layout(size, ships)[0]
+        self.shared = shared
+        self.name = shared.name
+        self._slots = header_size
+        results = self._slots + capacity * self.slot_size
+        self._results = shared.buf[results:results + 8 * capacity].cast('i')
+        # Доски-представления, которые нужно освободить перед close()
+        self._views = weakref.WeakSet()
+
+    def __del__(self) -> None:
+        # Представления нужно освободить раньше, чем SharedMemory
+        # попробует закрыть свой блок
+        if hasattr(self, 'shared'):
+            self.close()
+
+    def __reduce__(self):
+        return BoardArena.attach, (self.name,)
+
+    def __len__(self) -> int:
+        return self.capacity
+
+    def __enter__(self) -> 'BoardArena':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        self.unlink()
+
+    def slot_offset(self, index: int) -> int:
+        """
+        Возвращает смещение записи доски index в блоке общей памяти.
+        """
+
+        if not 0 <= index < self.capacity:
+            raise IndexError('Номер доски вне арены.')
+        return self._slots + index * self.slot_size
+
+    def store(self, index: int, board: Board) -> None:
+        """
+        Записывает доску board (Board или BitBoard того же размера и флота)
+        в запись index: корабли, их жизни, символы клеток, заблокированные
+        точки, количество живых кораблей и хеш Зобриста.
+        """
+
+        if board.size != self.size or list(board.ships_types) != self.ships_types:
+            raise ValueError('Размер доски или флот не совпадают с ареной.')
+        view = self.view(index)
+        try:
+            view._zobrist[0] = board.zobrist
+            view._counters[0] = board.live_ships
+            view._counters[1] = len(board.ships)
+            for record, ship in zip(view._records, board.ships):
+                record[0], record[1], record[2], record[3] = \
+                    ship.bow.x, ship.bow.y, ship.direction, ship.lives
+            for row, cells in zip(view.table, board.table):
+                row._cells[:] = bytes(CELL_CODES[symbol] for symbol in cells)
+            view.locked_dots = board.locked_dots
+        finally:
+            view.release()
+        self.set_result(index, -1, -1)
+
+    def view(self, index: int) -> ArenaBoard:
+        """
+        Возвращает доску ArenaBoard, которая работает прямо с записью index:
+        выстрелы по ней видны всем процессам, подключённым к арене.
+        """
+
+        return ArenaBoard(self, index)
+
+    def load(self, index: int, board_class: type = Board) -> Board:
+        """
+        Возвращает копию доски index в виде board_class: корабли ставятся
+        заново, а заблокированные точки повторяются выстрелами. Доска
+        в арене должна быть готова к игре (после get_ready()).
+        """
+
+        view = self.view(index)
+        try:
+            board = board_class(self.size, self.ships_types)
+            for ship in view.ships:
+                board.add_ship(Ship(ship.length, ship.bow, ship.direction))
+            board.get_ready()
+            verbose = board.is_verbose
+            board.is_verbose = False
+            for dot in list(view.locked_dots):
+                if dot not in board.locked_dots:
+                    board.shot(dot)
+            board.is_verbose = verbose
+        finally:
+            view.release()
+        return board
+
+    def set_result(self, index: int, winner: int, turns: int) -> None:
+        """
+        Записывает результат партии на доске index:
+        номер победителя и количество ходов.
+        """
+
+        self.slot_offset(index)
+        self._results[2 * index] = winner
+        self._results[2 * index + 1] = turns
+
+    def result(self, index: int) -> tuple[int, int]:
+        """
+        Возвращает результат партии на доске index: (победитель, ходов)
+        или (-1, -1), если партия ещё не сыграна.
+        """
+
+        self.slot_offset(index)
+        return self._results[2 * index], self._results[2 * index + 1]
+
+    def close(self) -> None:
+        """
+        Освобождает все доски-представления и отключается от блока
+        общей памяти (сам блок остаётся для других процессов).
+        """
+
+        for board in list(self._views):
+            board.release()
+        self._results.release()
+        self.shared.close()
+
+    def unlink(self) -> None:
+        """
+        Удаляет блок общей памяти. Вызывается один раз, процессом,
+        который создал арену, после того как все процессы закончили работу.
+        """
+
+        self.shared.unlink()
+
+
+def play_slots(arena: BoardArena, start: int, stop: int,
+               player_class: type = DensityAI, seed: int = 0) -> int:
+    """
+    В текущем процессе стреляет стратегией player_class по доскам арены
+    с номерами от start до stop прямо в общей памяти и записывает
+    количество выстрелов до победы в результаты. Возвращает количество
+    сыгранных досок.
+    """
+
+    for index in range(start, stop):
+        board = arena.view(index)
+        board.is_verbose = False
+        player = player_class(Board(arena.size, arena.ships_types), board,
+                              Random(seed + index))
+        player.is_verbose = False
+        shots = 0
+        while not board.is_loser():
+            player.move()
+            shots += 1
+        arena.set_result(index, 0, shots)
+        board.release()
+    return stop - start
+
+
+def play_boards(boards: list, player_class: type = DensityAI,
+                seed: int = 0, start: int = 0) -> tuple[list, list]:
+    """
+    То же, что play_slots, но для досок, переданных в процесс копией
+    (pickle): возвращает доски после партий и количество выстрелов.
+    """
+
+    results = list()
+    for index, board in enumerate(boards, start):
+        board.is_verbose = False
+        player = player_class(Board(board.size, board.ships_types), board,
+                              Random(seed + index))
+        player.is_verbose = False
+        shots = 0
+        while not board.is_loser():
+            player.move()
+            shots += 1
+        results.append(shots)
+    return boards, results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Доски в общей памяти процессов')
+    parser.add_argument('--boards', type=int, default=20000,
+                        help='количество досок')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='количество процессов')
+    parser.add_argument('--chunk', type=int, default=500,
+                        help='количество досок в одном задании')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='зерно генератора случайных чисел')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE,
+                        help='размер доски')
+    parser.add_argument('--fleet', type=parse_fleet, default=SHIPS_TYPES,
+                        help='длины кораблей через запятую')
+    args = parser.parse_args()
+    try:
+        Game.check_fleet(args.size, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+    workers = args.workers or os.cpu_count() or 1
+
+    rng = Random(args.seed)
+    boards = list()
+    for _ in range(args.boards):
+        board = Game.random_board(Board, args.size, args.fleet, rng)
+        board.get_ready()
+        boards.append(board)
+    chunks = [(start, min(start + args.chunk, args.boards))
+              for start in range(0, args.boards, args.chunk)]
+
+    started = perf_counter()
+    copied = list()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_boards, boards[start:stop], DensityAI,
+                                   args.seed, start)
+                   for start, stop in chunks]
+        for future in futures:
+            played, results = future.result()
+            copied.extend(results)
+    copied_seconds = perf_counter() - started
+    pickled = sum(len(pickle.dumps(boards[start:stop])) for start, stop in chunks)
+
+    with BoardArena(args.size, args.fleet, args.boards) as arena:
+        started = perf_counter()
+        for index, board in enumerate(boards):
+            arena.store(index, board)
+        stored = perf_counter() - started
+        started = perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(play_slots, arena, start, stop, DensityAI,
+                                       args.seed)
+                       for start, stop in chunks]
+            for future in futures:
+                future.result()
+        shared_seconds = perf_counter() - started
+        shared = [arena.result(index)[1] for index in range(args.boards)]
+        sample = arena.load(0)
+        message = pickle.dumps(arena)
+
+    if shared != copied:
+        raise SystemExit('Результаты партий в арене и в копиях досок не совпали.')
+    print(f'Досок: {args.boards}, процессов: {workers}, выстрелов в среднем '
+          f'{sum(shared) / len(shared):.2f}, после партии на доске 0 '
+          f'живых кораблей: {sample.live_ships}')
+    print(f'Копии досок (pickle): {copied_seconds:.2f} с, '
+          f'{pickled / args.boards:.0f} байт на доску в одну сторону')
+    print(f'Арена: {shared_seconds:.2f} с (запись досок {stored:.2f} с), '
+          f'{arena.slot_size} байт на доску в общей памяти, '
+          f'{len(message)} байт на задание')
@@ -0,0 +1,307 @@
+"""
+Векторизованный движок «Морского боя» на NumPy.
+K партий хранятся в массивах формы (K, N, N), и за один шаг в каждой
+активной партии делается ровно один выстрел. Попадание, потопление и ореол
+отмечаются так же, как в Board.shot и Board.mark_oreol. Закончившиеся партии
+выбывают из активной части массивов.
+
+Для работы нужен NumPy (pip install numpy).
+
+Запуск: python batch.py --games 100000 --policy hunt_target --seed 0
+"""
+
+import argparse
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+from main import (BOARD_SIZE, SHIPS_TYPES, BoardOutException,
+                  BoardUsedException, Game, parse_fleet)
+
+
+class BatchEngine():
+    """
+    Класс для представления пакета из K партий, которые играются синхронно.
+    В каждой партии один игрок стреляет по доске соперника до её проигрыша,
+    т.е. движок оценивает стратегию стрельбы: сколько выстрелов ей нужно.
+
+    Атрибуты
+    --------
+    size : int
+        Размер доски.
+    ship_id : np.ndarray
+        Массив (A, N, N): номер корабля в клетке или -1 для моря.
+    shots : np.ndarray
+        Массив (A, N, N): клетки, куда уже стреляли или отмеченные ореолом.
+    hits : np.ndarray
+        Массив (A, N, N): клетки с попаданием.
+    lives : np.ndarray
+        Массив (A, S): оставшиеся жизни каждого корабля.
+    live_ships : np.ndarray
+        Массив (A,): количество живых кораблей.
+    turns : np.ndarray
+        Массив (A,): количество сделанных выстрелов.
+    active : np.ndarray
+        Массив (A,): исходные номера ещё идущих партий.
+    results : np.ndarray
+        Массив (K,): количество выстрелов до победы в каждой партии
+        (-1, пока партия не закончена).
+
+    Методы
+    --------
+    @classmethod
+    from_boards(list):
+        Создаёт пакет по списку досок Board или BitBoard.
+    @classmethod
+    random(int, pool_size=1000, seed=None, size=BOARD_SIZE,
+           ships_types=SHIPS_TYPES):
+        Создаёт пакет из случайных досок.
+    tables():
+        Возвращает состояния клеток активных партий в обозначениях Board.table.
+    step(np.ndarray):
+        Делает по одному выстрелу в каждой активной партии.
+    run(policy):
+        Играет все партии до конца и возвращает results.
+    """
+
+    def __init__(self, ship_id: np.ndarray, lives: np.ndarray) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта BatchEngine.
+
+        Атрибуты
+        --------
+        size : int
+            Размер доски.
+        ship_id : np.ndarray
+            Массив (K, N, N): номер корабля в клетке или -1 для моря.
+        shots : np.ndarray
+            Массив (K, N, N): клетки, куда уже стреляли
+            или отмеченные ореолом.
+        hits : np.ndarray
+            Массив (K, N, N): клетки с попаданием.
+        lives : np.ndarray
+            Массив (K, S): оставшиеся жизни каждого корабля.
+        live_ships : np.ndarray
+            Массив (K,): количество живых кораблей.
+        turns : np.ndarray
+            Массив (K,): количество сделанных выстрелов.
+        active : np.ndarray
+            Массив (K,): исходные номера ещё идущих партий.
+        results : np.ndarray
+            Массив (K,): количество выстрелов до победы в каждой партии.
+        """
+
+        games = ship_id.shape[0]
+        self.size = ship_id.shape[1]
+        self.ship_id = ship_id
+        self.shots = np.zeros(ship_id.shape, dtype=bool)
+        self.hits = np.zeros(ship_id.shape, dtype=bool)
+        self.lives = lives.astype(np.int16)
+        self.live_ships = (self.lives > 0).sum(axis=1).astype(np.int16)
+        self.turns = np.zeros(games, dtype=np.int32)
+        self.active = np.arange(games)
+        self.results = np.full(games, -1, dtype=np.int32)
+
+    @classmethod
+    def from_boards(cls, boards: list) -> 'BatchEngine':
+        """
+        Создаёт пакет по списку досок Board или BitBoard.
+        """
+
+        size = boards[0].size
+        fleet = max(len(board.ships) for board in boards)
+        ship_id = np.full((len(boards), size, size), -1, dtype=np.int16)
+        lives = np.zeros((len(boards), fleet), dtype=np.int16)
+        for game, board in enumerate(boards):
+            for index, ship in enumerate(board.ships):
+                lives[game, index] = ship.lives
+                for dot in ship.dots:
+                    ship_id[game, dot.x, dot.y] = index
+        return cls(ship_id, lives)
+
+    @classmethod
+    def random(cls,
+               games: int,
+               pool_size: int = 1000,
+               seed: int = None,
+               size: int = BOARD_SIZE,
+               ships_types: list = SHIPS_TYPES) -> 'BatchEngine':
+        """
+        Создаёт пакет из games случайных досок.
+        Чтобы не расставлять корабли games раз на Python, расставляются
+        pool_size досок через Game.random_board, а каждая партия берёт
+        случайную доску из этого набора и случайно поворачивает или отражает
+        её (8 симметрий квадрата). Доски расставляются своим генератором
+        с зерном seed, общий DEFAULT_RNG не затрагивается. Если флот
+        невозможно расставить, выбрасывает ValueError.
+        """
+
+        Game.check_fleet(size, ships_types)
+        rng = np.random.default_rng(seed)
+        board_rng = Random(seed)
+        pool = cls.from_boards([Game.random_board(size=size,
+                                                  ships_types=ships_types,
+                                                  rng=board_rng)
+                                for _ in range(min(games, pool_size))])
+        picks = rng.integers(0, pool.ship_id.shape[0], games)
+        ship_id = pool.ship_id[picks]
+        lives = pool.lives[picks]
+        symmetry = rng.integers(0, 8, games)
+        for transform in range(1, 8):
+            group = symmetry == transform
+            boards = np.rot90(ship_id[group], k=transform % 4, axes=(1, 2))
+            if transform >= 4:
+                boards = boards[:, :, ::-1]
+            ship_id[group] = boards
+        return cls(ship_id, lives)
+
+    def tables(self) -> np.ndarray:
+        """
+        Возвращает состояния клеток активных партий в обозначениях
+        Board.table: '○' - море, '■' - палуба, '•' - мимо / ореол,
+        '×' - попадание.
+        """
+
+        tables = np.full(self.ship_id.shape, '○')
+        tables[self.ship_id >= 0] = '■'
+        tables[self.shots & (self.ship_id < 0)] = '•'
+        tables[self.hits] = '×'
+        return tables
+
+    def step(self, targets: np.ndarray) -> None:
+        """
+        Делает по одному выстрелу в каждой активной партии.
+        targets - массив (A, 2) координат x, y выстрелов.
+        Если какой-то выстрел за пределами доски или в уже стрелянную клетку,
+        выбрасывает исключение и ничего не меняет.
+        """
+
+        games = np.arange(len(self.active))
+        x, y = targets[:, 0], targets[:, 1]
+        if ((x < 0) | (x >= self.size) | (y < 0) | (y >= self.size)).any():
+            raise BoardOutException
+        if self.shots[games, x, y].any():
+            raise BoardUsedException
+        self.shots[games, x, y] = True
+        self.turns += 1
+        # Попадания
+        ship = self.ship_id[games, x, y]
+        hit = ship >= 0
+        hit_games, hit_ships = games[hit], ship[hit]
+        self.hits[hit_games, x[hit], y[hit]] = True
+        self.lives[hit_games, hit_ships] -= 1
+        # Потопления: отмечаем ореол вокруг потопленных кораблей
+        sunk = self.lives[hit_games, hit_ships] == 0
+        sunk_games, sunk_ships = hit_games[sunk], hit_ships[sunk]
+        if len(sunk_games):
+            self.live_ships[sunk_games] -= 1
+            ships = self.ship_id[sunk_games] == sunk_ships[:, None, None]
+            padded = np.pad(ships, ((0, 0), (1, 1), (1, 1)))
+            oreol = np.zeros_like(ships)
+            for dx in range(3):
+                for dy in range(3):
+                    oreol |= padded[:, dx:dx + self.size, dy:dy + self.size]
+            self.shots[sunk_games] |= oreol
+        # Закончившиеся партии выбывают из активной части
+        finished = self.live_ships == 0
+        if finished.any():
+            self.results[self.active[finished]] = self.turns[finished]
+            keep = ~finished
+            for name in ('ship_id', 'shots', 'hits', 'lives',
+                         'live_ships', 'turns', 'active'):
+                setattr(self, name, getattr(self, name)[keep])
+
+    def run(self, policy) -> np.ndarray:
+        """
+        Играет все партии до конца и возвращает results.
+        policy - функция, которая по движку возвращает массив (A, 2)
+        координат следующих выстрелов для всех активных партий.
+        """
+
+        while len(self.active):
+            self.step(policy(self))
+        return self.results
+
+
+def random_policy(engine: BatchEngine, rng: np.random.Generator) -> np.ndarray:
+    """
+    Стратегия: случайная клетка из тех, куда ещё не стреляли.
+    """
+
+    scores = rng.random(engine.shots.shape)
+    scores[engine.shots] = -1
+    return _best_cells(engine, scores)
+
+
+def hunt_target_policy(engine: BatchEngine,
+                       rng: np.random.Generator) -> np.ndarray:
+    """
+    Стратегия «поиск / добивание»: если есть подбитый, но не потопленный
+    корабль, стреляем в случайную соседнюю с ним (по стороне) клетку,
+    иначе - в случайную клетку шахматной раскраски, а затем в любую.
+    """
+
+    size = engine.size
+    scores = rng.random(engine.shots.shape)
+    # Шахматная раскраска: каждый корабль длиннее одной клетки её задевает
+    parity = (np.add.outer(np.arange(size), np.arange(size)) % 2 == 0)
+    scores += parity
+    # Подбитые палубы ещё живых кораблей
+    games = np.arange(len(engine.active))[:, None, None]
+    ships = np.where(engine.ship_id >= 0, engine.ship_id, 0)
+    wounded = engine.hits & (engine.lives[games, ships] > 0)
+    padded = np.pad(wounded, ((0, 0), (1, 1), (1, 1)))
+    near = (padded[:, :-2, 1:-1] | padded[:, 2:, 1:-1]
+            | padded[:, 1:-1, :-2] | padded[:, 1:-1, 2:])
+    scores += 2 * near
+    scores[engine.shots] = -1
+    return _best_cells(engine, scores)
+
+
+def _best_cells(engine: BatchEngine, scores: np.ndarray) -> np.ndarray:
+    """
+    Вспомогательная функция.
+    Возвращает для каждой активной партии координаты клетки
+    с наибольшим значением scores.
+    """
+
+    best = scores.reshape(len(engine.active), -1).argmax(axis=1)
+    return np.stack((best // engine.size, best % engine.size), axis=1)
+
+
+POLICIES = {'random': random_policy, 'hunt_target': hunt_target_policy}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Пакетная оценка стратегий стрельбы')
+    parser.add_argument('--games', type=int, default=100000,
+                        help='количество партий')
+    parser.add_argument('--pool-size', type=int, default=1000,
+                        help='количество расставляемых на Python досок')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='hunt_target',
+                        help='стратегия стрельбы')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='зерно генератора случайных чисел')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE,
+                        help='размер доски')
+    parser.add_argument('--fleet', type=parse_fleet, default=SHIPS_TYPES,
+                        help='длины кораблей через запятую')
+    args = parser.parse_args()
+    try:
+        Game.check_fleet(args.size, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+
+    started = perf_counter()
+    engine = BatchEngine.random(args.games, args.pool_size, args.seed,
+                                args.size, args.fleet)
+    prepared = perf_counter()
+    rng = np.random.default_rng(args.seed)
+    results = engine.run(lambda batch: POLICIES[args.policy](batch, rng))
+    finished = perf_counter()
+    print(f'Партий: {args.games}, выстрелов до победы: '
+          f'в среднем {results.mean():.2f}, медиана {np.median(results):.0f}')
+    print(f'Подготовка досок: {prepared - started:.2f} с, '
+          f'игра: {finished - prepared:.2f} с, '
+          f'партий в секунду: {args.games / (finished - prepared):.0f}')
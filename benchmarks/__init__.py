@@ -0,0 +1,5 @@
+"""
+Замеры производительности «Морского боя».
+Общий набор замеров запускается командой python -m benchmarks,
+отдельные модули пакета - командой python -m benchmarks.<модуль>.
+"""
@@ -0,0 +1,79 @@
+"""
+Замер MonteCarloAI при разном времени на ход: количество выстрелов
+до победы в сравнении с DensityAI на тех же досках, выборок за ход
+(в том числе набранных в фоне, пока «думает» соперник) и превышение
+времени на ход.
+
+Запуск: python -m benchmarks.montecarlo --budgets 5 50 500 --games 20
+"""
+
+import argparse
+from time import perf_counter, sleep
+
+import main
+from main import BitBoard, DensityAI, HeadlessGame
+from montecarlo import MonteCarloAI
+
+
+def measure(player_class: type, games: int, seed: int,
+            think: float = 0.0, **options) -> dict:
+    """
+    Играет games партий стратегией player_class по случайным доскам
+    (при одном и том же seed доски одни и те же). Если think больше нуля,
+    после каждого промаха ждёт think секунд, как будто ходит соперник.
+    Возвращает количество выстрелов до победы в среднем, задержки хода
+    в миллисекундах и среднее количество выборок за ход.
+    """
+
+    main.seed_random(seed)
+    latencies = list()
+    samples = pondered = 0
+    for _ in range(games):
+        game = HeadlessGame(player_class, DensityAI, BitBoard)
+        player = game.players[0]
+        for name, value in options.items():
+            setattr(player, name, value)
+        while not player.opponent_board.is_loser():
+            started = perf_counter()
+            repeat = player.move()
+            latencies.append(perf_counter() - started)
+            if think and not repeat:
+                sleep(think)
+        if isinstance(player, MonteCarloAI):
+            player.stop_pondering()
+            samples += sum(move['samples'] for move in player.history)
+            pondered += sum(move['pondered'] for move in player.history)
+    latencies.sort()
+    return {'mean_shots': len(latencies) / games,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'samples_per_move': samples / len(latencies),
+            'pondered_per_move': pondered / len(latencies)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=20,
+                        help='количество партий')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='зерно генератора случайных чисел')
+    parser.add_argument('--budgets', type=float, nargs='+', default=[5, 50, 500],
+                        help='время на ход в миллисекундах')
+    parser.add_argument('--think', type=float, default=200,
+                        help='время хода соперника в миллисекундах '
+                             'для замера с выборками в фоне')
+    args = parser.parse_args()
+    runs = [('DensityAI', DensityAI, 0.0, {})]
+    for budget in args.budgets:
+        runs.append((f'MonteCarloAI {budget:g} мс', MonteCarloAI, 0.0,
+                     {'budget': budget / 1000}))
+    runs.append((f'MonteCarloAI {args.budgets[0]:g} мс, в фоне', MonteCarloAI,
+                 args.think / 1000, {'budget': args.budgets[0] / 1000, 'ponder': True}))
+    for title, player_class, think, options in runs:
+        stats = measure(player_class, args.games, args.seed, think, **options)
+        line = (f'{title:30} выстрелов {stats["mean_shots"]:6.2f}  '
+                f'p50 {stats["p50_ms"]:8.3f} мс  макс. {stats["max_ms"]:8.3f} мс')
+        if player_class is MonteCarloAI:
+            line += (f'  выборок за ход {stats["samples_per_move"]:9.0f}'
+                     f' (в фоне {stats["pondered_per_move"]:.0f})')
+        print(line)
@@ -0,0 +1,57 @@
+"""
+Сравнение генераторов случайной расстановки кораблей:
+Game.random_board (выбор из маски допустимых положений)
+и Game.rejection_board (метод проб и ошибок).
+
+Запуск: python -m benchmarks.placement --boards 2000
+"""
+
+import argparse
+from time import perf_counter
+
+from main import BOARD_SIZE, SHIPS_TYPES, Board, Game
+
+
+def rejection_board(board_class: type) -> Board:
+    """
+    Повторяет Game.rejection_board, пока попытка не удастся.
+    """
+
+    board = None
+    while board is None:
+        board = Game.rejection_board(board_class)
+    return board
+
+
+def measure(generator, boards: int) -> dict:
+    """
+    Генерирует boards готовых досок функцией generator и возвращает
+    количество досок в секунду и задержки одной доски в миллисекундах.
+    """
+
+    latencies = list()
+    started = perf_counter()
+    for _ in range(boards):
+        board_started = perf_counter()
+        generator(Board)
+        latencies.append((perf_counter() - board_started) * 1000)
+    elapsed = perf_counter() - started
+    latencies.sort()
+    return {'boards_per_second': boards / elapsed,
+            'p50_ms': latencies[len(latencies) // 2],
+            'p99_ms': latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)],
+            'max_ms': latencies[-1]}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--boards', type=int, default=2000,
+                        help='количество досок для каждого генератора')
+    args = parser.parse_args()
+    Game.check_fleet(BOARD_SIZE, SHIPS_TYPES)
+    for name, generator in (('random_board', Game.random_board),
+                            ('rejection_board', rejection_board)):
+        stats = measure(generator, args.boards)
+        print(f'{name:16} {stats["boards_per_second"]:10.1f} досок/с  '
+              f'p50 {stats["p50_ms"]:.3f} мс  p99 {stats["p99_ms"]:.3f} мс  '
+              f'макс. {stats["max_ms"]:.3f} мс')
@@ -0,0 +1,77 @@
+"""
+Замер SolverAI: задержки одного хода, доля ходов точного перебора,
+доля попаданий в таблицу транспозиций и в кэш состояний и количество
+выстрелов до победы в сравнении с DensityAI на тех же досках.
+
+Запуск: python -m benchmarks.solver --games 300 --seed 0
+"""
+
+import argparse
+from time import perf_counter
+
+import main
+from main import TRANSPOSITIONS, BitBoard, DensityAI, HeadlessGame
+from solver import LAYOUT_LIMIT, SolverAI, layout_counts
+
+
+def measure(player_class: type, games: int, seed: int, **options) -> dict:
+    """
+    Играет games партий стратегией player_class по случайным доскам
+    (при одном и том же seed доски одни и те же) и возвращает количество
+    выстрелов до победы в среднем и задержки хода в миллисекундах.
+    """
+
+    main.seed_random(seed)
+    latencies = list()
+    exact = fallback = 0
+    for _ in range(games):
+        game = HeadlessGame(player_class, DensityAI, BitBoard)
+        player = game.players[0]
+        for name, value in options.items():
+            setattr(player, name, value)
+        while not player.opponent_board.is_loser():
+            started = perf_counter()
+            player.move()
+            latencies.append(perf_counter() - started)
+        exact += getattr(player, 'exact_moves', 0)
+        fallback += getattr(player, 'fallback_moves', 0)
+    latencies.sort()
+    return {'mean_shots': len(latencies) / games,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p99_ms': latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'exact_share': exact / (exact + fallback) if exact + fallback else 0.0}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--games', type=int, default=300,
+                        help='количество партий')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='зерно генератора случайных чисел')
+    parser.add_argument('--limit', type=int, default=LAYOUT_LIMIT,
+                        help='наибольшее число расстановок для точного перебора')
+    args = parser.parse_args()
+    for title, player_class, seed in (
+            ('DensityAI', DensityAI, args.seed),
+            ('SolverAI, холодный кэш', SolverAI, args.seed),
+            ('SolverAI, те же доски', SolverAI, args.seed),
+            ('SolverAI, новые доски', SolverAI, args.seed + 1)):
+        options = {'limit': args.limit} if player_class is SolverAI else {}
+        before = layout_counts.cache_info()
+        table_before = TRANSPOSITIONS.hits, TRANSPOSITIONS.misses
+        stats = measure(player_class, args.games, seed, **options)
+        line = (f'{title:24} выстрелов {stats["mean_shots"]:6.2f}  '
+                f'p50 {stats["p50_ms"]:.3f} мс  p99 {stats["p99_ms"]:.3f} мс  '
+                f'макс. {stats["max_ms"]:.3f} мс')
+        if player_class is SolverAI:
+            info = layout_counts.cache_info()
+            hits, misses = info.hits - before.hits, info.misses - before.misses
+            rate = hits / (hits + misses) if hits + misses else 0.0
+            table_hits = TRANSPOSITIONS.hits - table_before[0]
+            table_lookups = table_hits + TRANSPOSITIONS.misses - table_before[1]
+            line += (f'  точных ходов {stats["exact_share"]:.0%}  '
+                     f'в таблице транспозиций '
+                     f'{table_hits / table_lookups if table_lookups else 0.0:.0%}  '
+                     f'попаданий в кэш {rate:.0%} ({info.currsize} состояний)')
+        print(line)
@@ -0,0 +1,321 @@
+"""
+Набор замеров основных операций «Морского боя»:
+Board.add_ship, Board.shot, Board.make_shot / unmake_shot, Game.random_board,
+AI.ask и целых партий
+для нескольких размеров доски и флотов.
+
+Для каждой операции считаются операции в секунду, задержки p50 / p99 и
+пиковый объём памяти, выделенной за замер (по tracemalloc). Результаты
+сохраняются в JSON, а режим сравнения отмечает замедления относительно
+сохранённого базового файла.
+
+Запуск: python -m benchmarks [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from datetime import datetime
+from time import perf_counter_ns
+
+import main
+from main import AI, BitBoard, Board, DensityAI, Dot, Game, HeadlessGame, Ship
+
+
+# Конфигурации (название, размер доски, флот)
+CONFIGS = [
+    ('6x6', 6, [3, 2, 2, 1, 1, 1, 1]),
+    ('10x10', 10, [4, 3, 3, 2, 2, 2, 1, 1, 1, 1]),
+    ('20x20', 20, [4, 3, 3, 2, 2, 2, 1, 1, 1, 1] * 3),
+]
+# Во сколько раз меньше итераций делается под tracemalloc
+ALLOCATION_SHARE = 10
+# Допустимое замедление в режиме сравнения (0.2 - на 20%)
+THRESHOLD = 0.2
+
+
+def quiet_board(board_class: type, size: int, fleet: list) -> Board:
+    """
+    Возвращает готовую к игре случайную доску без вывода сообщений.
+    """
+
+    board = Game.random_board(board_class, size, fleet)
+    board.get_ready()
+    board.is_verbose = False
+    return board
+
+
+def bench_add_ship(board_class: type, size: int, fleet: list,
+                   iterations: int) -> list[int]:
+    """
+    Замеряет отдельные вызовы add_ship при расстановке готовых флотов
+    на пустые доски. Возвращает задержки в наносекундах.
+    """
+
+    latencies = list()
+    while len(latencies) < iterations:
+        layout = [(ship.length, ship.bow, ship.direction)
+                  for ship in quiet_board(Board, size, fleet).ships]
+        board = board_class(size, fleet)
+        for length, bow, direction in layout:
+            ship = Ship(length, bow, direction)
+            started = perf_counter_ns()
+            board.add_ship(ship)
+            latencies.append(perf_counter_ns() - started)
+    return latencies[:iterations]
+
+
+def bench_shot(board_class: type, size: int, fleet: list,
+               iterations: int) -> list[int]:
+    """
+    Замеряет отдельные вызовы shot по клеткам доски в случайном порядке,
+    пропуская клетки, уже отмеченные ореолом.
+    Возвращает задержки в наносекундах.
+    """
+
+    cells = [Dot(x, y) for x in range(size) for y in range(size)]
+    latencies = list()
+    while len(latencies) < iterations:
+        board = quiet_board(board_class, size, fleet)
+        main.DEFAULT_RNG.shuffle(cells)
+        for dot in cells:
+            if board.is_loser():
+                break
+            started = perf_counter_ns()
+            try:
+                board.shot(dot)
+            except main.BoardUsedException:
+                continue
+            latencies.append(perf_counter_ns() - started)
+    return latencies[:iterations]
+
+
+def bench_make_unmake(board_class: type, size: int, fleet: list,
+                      iterations: int) -> list[int]:
+    """
+    Замеряет пару make_shot + unmake_shot (гипотетический выстрел
+    с отменой) по свободным клеткам доски, на которой уже сделана
+    половина выстрелов. Возвращает задержки в наносекундах.
+    """
+
+    cells = [Dot(x, y) for x in range(size) for y in range(size)]
+    latencies = list()
+    while len(latencies) < iterations:
+        board = quiet_board(board_class, size, fleet)
+        main.DEFAULT_RNG.shuffle(cells)
+        for dot in cells[:len(cells) // 2]:
+            if board.is_loser():
+                break
+            try:
+                board.shot(dot)
+            except main.BoardUsedException:
+                pass
+        for dot in cells[len(cells) // 2:]:
+            started = perf_counter_ns()
+            try:
+                board.make_shot(dot)
+            except main.BoardUsedException:
+                continue
+            board.unmake_shot()
+            latencies.append(perf_counter_ns() - started)
+    return latencies[:iterations]
+
+
+def bench_random_board(board_class: type, size: int, fleet: list,
+                       iterations: int) -> list[int]:
+    """
+    Замеряет генерацию готовой доски (флот проверен Game.check_fleet,
+    поэтому повторы не нужны). Возвращает задержки в наносекундах.
+    """
+
+    latencies = list()
+    for _ in range(iterations):
+        started = perf_counter_ns()
+        Game.random_board(board_class, size, fleet)
+        latencies.append(perf_counter_ns() - started)
+    return latencies
+
+
+def bench_rejection_board(board_class: type, size: int, fleet: list,
+                          iterations: int) -> list[int]:
+    """
+    Замеряет генерацию готовой доски методом проб и ошибок
+    (с повторами, если попытка не удалась). Возвращает задержки
+    в наносекундах.
+    """
+
+    latencies = list()
+    for _ in range(iterations):
+        started = perf_counter_ns()
+        board = None
+        while board is None:
+            board = Game.rejection_board(board_class, size, fleet)
+        latencies.append(perf_counter_ns() - started)
+    return latencies
+
+
+def bench_ask(ai_class: type, size: int, fleet: list,
+              iterations: int) -> list[int]:
+    """
+    Замеряет отдельные решения ask игрока ai_class в партиях против
+    такого же игрока. Повторные попытки после исключений тоже считаются.
+    Возвращает задержки в наносекундах.
+    """
+
+    latencies = list()
+    while len(latencies) < iterations:
+        game = HeadlessGame(ai_class, ai_class, BitBoard, size, fleet)
+        player = game.players[0]
+        ask = player.ask
+
+        def timed_ask() -> Dot:
+            started = perf_counter_ns()
+            dot = ask()
+            latencies.append(perf_counter_ns() - started)
+            return dot
+
+        # Подменяем ask у экземпляра, move() вызывает именно его
+        player.ask = timed_ask
+        while not player.opponent_board.is_loser():
+            player.move()
+    return latencies[:iterations]
+
+
+def bench_game(board_class: type, size: int, fleet: list,
+               iterations: int) -> list[int]:
+    """
+    Замеряет целые партии DensityAI против AI без ввода-вывода.
+    Возвращает задержки в наносекундах.
+    """
+
+    latencies = list()
+    for _ in range(iterations):
+        started = perf_counter_ns()
+        HeadlessGame(DensityAI, AI, board_class, size, fleet).start()
+        latencies.append(perf_counter_ns() - started)
+    return latencies
+
+
+# Замеры: (название, функция, класс доски или игрока, доля итераций)
+BENCHMARKS = [
+    ('add_ship[Board]', bench_add_ship, Board, 1),
+    ('add_ship[BitBoard]', bench_add_ship, BitBoard, 1),
+    ('shot[Board]', bench_shot, Board, 1),
+    ('shot[BitBoard]', bench_shot, BitBoard, 1),
+    ('make_unmake[Board]', bench_make_unmake, Board, 1),
+    ('make_unmake[BitBoard]', bench_make_unmake, BitBoard, 1),
+    ('random_board[Board]', bench_random_board, Board, 10),
+    ('random_board[BitBoard]', bench_random_board, BitBoard, 10),
+    ('rejection_board[Board]', bench_rejection_board, Board, 50),
+    ('ask[AI]', bench_ask, AI, 1),
+    ('ask[DensityAI]', bench_ask, DensityAI, 1),
+    ('game[BitBoard]', bench_game, BitBoard, 50),
+]
+
+
+def summarize(latencies: list[int]) -> dict:
+    """
+    Возвращает операции в секунду и задержки p50 / p99 в микросекундах.
+    """
+
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {'iterations': len(latencies),
+            'ops_per_sec': len(latencies) * 1e9 / total if total else 0.0,
+            'p50_us': latencies[len(latencies) // 2] / 1000,
+            'p99_us': latencies[min(len(latencies) - 1,
+                                    len(latencies) * 99 // 100)] / 1000}
+
+
+def run(iterations: int, only: str = None, seed: int = 0) -> dict:
+    """
+    Выполняет все замеры (или те, в названии которых есть only)
+    и возвращает результаты в виде словаря, готового к записи в JSON.
+    """
+
+    results = dict()
+    for config_name, size, fleet in CONFIGS:
+        Game.check_fleet(size, fleet)
+        for name, bench, subject, divisor in BENCHMARKS:
+            key = f'{config_name}/{name}'
+            if only and only not in key:
+                continue
+            count = max(1, iterations // divisor)
+            main.seed_random(seed)
+            stats = summarize(bench(subject, size, fleet, count))
+            # Отдельный короткий прогон под tracemalloc, чтобы он
+            # не искажал задержки
+            main.seed_random(seed)
+            tracemalloc.start()
+            bench(subject, size, fleet, max(1, count // ALLOCATION_SHARE))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats['peak_alloc_kb'] = peak / 1024
+            results[key] = stats
+            print(f'{key:32} {stats["ops_per_sec"]:12.1f} оп/с  '
+                  f'p50 {stats["p50_us"]:9.1f} мкс  p99 {stats["p99_us"]:9.1f} мкс  '
+                  f'память {stats["peak_alloc_kb"]:8.1f} КБ', flush=True)
+    return {'meta': {'python': sys.version.split()[0],
+                     'platform': platform.platform(),
+                     'date': datetime.now().isoformat(timespec='seconds'),
+                     'iterations': iterations},
+            'results': results}
+
+
+def compare(current: dict, baseline: dict, threshold: float = THRESHOLD) -> list:
+    """
+    Сравнивает результаты с базовыми по операциям в секунду.
+    Возвращает список замедлившихся замеров (название, базовое значение,
+    текущее значение, отношение).
+    """
+
+    regressions = list()
+    for key, stats in current['results'].items():
+        base = baseline['results'].get(key)
+        if not base or not base['ops_per_sec']:
+            continue
+        ratio = stats['ops_per_sec'] / base['ops_per_sec']
+        marker = ''
+        if ratio < 1 - threshold:
+            regressions.append((key, base['ops_per_sec'], stats['ops_per_sec'], ratio))
+            marker = '  <-- замедление'
+        print(f'{key:32} {base["ops_per_sec"]:12.1f} -> '
+              f'{stats["ops_per_sec"]:12.1f} оп/с  x{ratio:.2f}{marker}')
+    return regressions
+
+
+def main_cli(argv: list = None) -> int:
+    """
+    Точка входа python -m benchmarks.
+    Возвращает код завершения: 1, если в режиме сравнения есть замедления.
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000,
+                        help='количество итераций самых быстрых замеров')
+    parser.add_argument('--only', default=None,
+                        help='выполнять только замеры с этой подстрокой в названии')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='зерно генератора случайных чисел')
+    parser.add_argument('--output', default=None,
+                        help='файл JSON для сохранения результатов')
+    parser.add_argument('--compare', default=None,
+                        help='файл JSON с базовыми результатами')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='допустимое замедление, доля от базового значения')
+    args = parser.parse_args(argv)
+
+    current = run(args.iterations, args.only, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(current, file, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        print('\nСравнение с', args.compare)
+        if compare(current, baseline, args.threshold):
+            return 1
+    return 0
@@ -0,0 +1,328 @@
+"""
+Парное сравнение двух стратегий стрельбы методом Монте-Карло.
+
+Обе стратегии стреляют по одним и тем же случайным доскам до потопления
+всех кораблей, а сравнивается количество выстрелов до победы. Партии
+играются пакетами в пуле процессов, и после каждого пакета проверяется
+последовательный критерий по средней парной разности: как только разница
+значима с заданной доверительной вероятностью, оценка останавливается.
+Порог критерия скорректирован на число промежуточных проверок (поправка
+Бонферрони), поэтому ранняя остановка не завышает вероятность ошибки.
+
+Запуск: python evaluation.py AI DensityAI --max-games 20000 --confidence 0.95
+"""
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from statistics import NormalDist
+from time import perf_counter
+
+from main import AI, BOARD_SIZE, SHIPS_TYPES, BitBoard, Board, Game, parse_fleet
+from tournament import chunk_seed, load_player_class
+
+
+# Количество партий в одном пакете
+BATCH_SIZE = 200
+# Сколько пакетов сыграть до первой проверки критерия
+MIN_BATCHES = 2
+
+
+def shots_to_win(player_class: type,
+                 board_class: type,
+                 size: int,
+                 ships_types: list,
+                 seed: int,
+                 index: int = 0) -> int:
+    """
+    Возвращает количество выстрелов, за которое стратегия player_class
+    топит все корабли на случайной доске. Доска однозначно определяется
+    зерном seed, поэтому при одном зерне обе стратегии стреляют по одной
+    и той же расстановке, а ходы - зерном и номером стратегии index,
+    чтобы одинаковые стратегии не повторяли ходы друг друга.
+    """
+
+    streams = Game.streams(seed, 3)
+    board_rng, player_rng = streams[0], streams[1 + index]
+    board = Game.random_board(board_class, size, ships_types, board_rng)
+    board.get_ready()
+    board.is_verbose = False
+    player = player_class(board_class(size, ships_types), board, player_rng)
+    player.is_verbose = False
+    shots = 0
+    while not board.is_loser():
+        player.move()
+        shots += 1
+    return shots
+
+
+def play_batch(first_class: type,
+               second_class: type,
+               board_class: type,
+               games: int,
+               seed: int,
+               size: int = BOARD_SIZE,
+               ships_types: list = SHIPS_TYPES) -> list[tuple[int, int]]:
+    """
+    Играет games парных партий в текущем процессе и возвращает для каждой
+    количество выстрелов до победы первой и второй стратегии.
+    """
+
+    seeds = Random(seed)
+    results = list()
+    for _ in range(games):
+        game_seed = seeds.getrandbits(64)
+        results.append((shots_to_win(first_class, board_class, size,
+                                     ships_types, game_seed, 0),
+                        shots_to_win(second_class, board_class, size,
+                                     ships_types, game_seed, 1)))
+    return results
+
+
+class Evaluation():
+    """
+    Класс для представления парной оценки двух стратегий-потомков AI
+    с ранней остановкой. Пакеты по batch_size партий играются в пуле
+    процессов, а критерий проверяется после каждого пакета в порядке
+    их номеров, поэтому результат не зависит от числа процессов.
+
+    Атрибуты
+    --------
+    first_class : type
+        Класс первой стратегии.
+    second_class : type
+        Класс второй стратегии.
+    max_games : int
+        Наибольшее количество парных партий (объём оценки без остановки).
+    confidence : float
+        Доверительная вероятность критерия.
+    seed : int
+        Общее зерно оценки.
+    workers : int
+        Количество процессов (по умолчанию - число ядер).
+    batch_size : int
+        Количество партий в одном пакете.
+    board_class : type
+        Класс доски: Board или BitBoard.
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+
+    Методы
+    --------
+    batches():
+        Возвращает количество пакетов, которое понадобится без остановки.
+    threshold():
+        Возвращает порог z-критерия для одной промежуточной проверки.
+    summary(list):
+        Возвращает статистику по результатам парных партий.
+    run():
+        Проводит оценку и возвращает её итоги.
+    """
+
+    def __init__(self,
+                 first_class: type,
+                 second_class: type,
+                 max_games: int,
+                 confidence: float = 0.95,
+                 seed: int = 0,
+                 workers: int = None,
+                 batch_size: int = BATCH_SIZE,
+                 board_class: type = BitBoard,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта Evaluation.
+
+        Атрибуты
+        --------
+        first_class : type
+            Класс первой стратегии.
+        second_class : type
+            Класс второй стратегии.
+        max_games : int
+            Наибольшее количество парных партий (объём оценки без остановки).
+        confidence : float
+            Доверительная вероятность критерия.
+        seed : int
+            Общее зерно оценки.
+        workers : int
+            Количество процессов (по умолчанию - число ядер).
+        batch_size : int
+            Количество партий в одном пакете.
+        board_class : type
+            Класс доски: Board или BitBoard.
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        """
+
+        for player_class in (first_class, second_class):
+            if not issubclass(player_class, AI):
+                raise ValueError('Оценивать можно только стратегии-потомки AI.')
+        Game.check_fleet(size, ships_types)
+        if not 0 < confidence < 1:
+            raise ValueError('Параметр confidence должен быть от 0 до 1.')
+        if batch_size < 1 or max_games < batch_size:
+            raise ValueError('Параметр max_games должен быть не меньше '
+                             'batch_size, а batch_size - больше нуля.')
+        self.first_class = first_class
+        self.second_class = second_class
+        self.max_games = max_games
+        self.confidence = confidence
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.board_class = board_class
+        self.size = size
+        self.ships_types = list(ships_types)
+
+    def batches(self) -> int:
+        """
+        Возвращает количество пакетов, которое понадобится без остановки.
+        """
+
+        return math.ceil(self.max_games / self.batch_size)
+
+    def threshold(self) -> float:
+        """
+        Возвращает порог z-критерия для одной промежуточной проверки:
+        уровень значимости делится поровну между всеми возможными
+        проверками (поправка Бонферрони).
+        """
+
+        looks = max(1, self.batches() - MIN_BATCHES + 1)
+        return NormalDist().inv_cdf(1 - (1 - self.confidence) / (2 * looks))
+
+    def summary(self, results: list) -> dict:
+        """
+        Возвращает статистику по результатам парных партий: средние
+        количества выстрелов, среднюю парную разность с доверительным
+        интервалом, величину эффекта (разность, делённую на стандартное
+        отклонение разностей) и значение z-критерия.
+        """
+
+        n = len(results)
+        differences = [first - second for first, second in results]
+        mean = sum(differences) / n
+        variance = sum((d - mean) ** 2 for d in differences) / (n - 1) if n > 1 else 0.0
+        deviation = math.sqrt(variance)
+        error = deviation / math.sqrt(n)
+        spread = self.threshold() * error
+        return {'games': n,
+                'mean_shots': (sum(first for first, _ in results) / n,
+                               sum(second for _, second in results) / n),
+                'mean_difference': mean,
+                'difference_ci': (mean - spread, mean + spread),
+                'effect_size': mean / deviation if deviation else 0.0,
+                'z': mean / error if error else 0.0}
+
+    def run(self) -> dict:
+        """
+        Проводит оценку и возвращает её итоги: статистику summary(), была ли
+        остановка раньше max_games, затраченное время и оценку времени,
+        сэкономленного по сравнению с розыгрышем всех max_games партий.
+        """
+
+        threshold = self.threshold()
+        total = self.batches()
+        results = list()
+        stopped = False
+        started = perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = dict()
+            submitted = 0
+            for batch in range(total):
+                # Держим в работе по два пакета на процесс
+                while submitted < total and submitted < batch + 2 * self.workers:
+                    games = min(self.batch_size,
+                                self.max_games - submitted * self.batch_size)
+                    pending[submitted] = executor.submit(
+                        play_batch, self.first_class, self.second_class,
+                        self.board_class, games, chunk_seed(self.seed, 0, submitted),
+                        self.size, self.ships_types)
+                    submitted += 1
+                results.extend(pending.pop(batch).result())
+                if batch + 1 >= MIN_BATCHES and \
+                   abs(self.summary(results)['z']) >= threshold:
+                    stopped = batch + 1 < total
+                    break
+            for future in pending.values():
+                future.cancel()
+        elapsed = perf_counter() - started
+        stats = self.summary(results)
+        fixed = elapsed / len(results) * self.max_games
+        stats.update({'players': (self.first_class.__name__,
+                                  self.second_class.__name__),
+                      'significant': abs(stats['z']) >= threshold,
+                      'stopped_early': stopped,
+                      'threshold': threshold,
+                      'seconds': elapsed,
+                      'fixed_seconds': fixed,
+                      'saved_seconds': fixed - elapsed})
+        return stats
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    """
+
+    parser = argparse.ArgumentParser(description='Парная оценка стратегий '
+                                                 'с ранней остановкой')
+    parser.add_argument('players', nargs=2,
+                        help="классы стратегий: 'AI' или 'module:Class'")
+    parser.add_argument('--max-games', type=int, default=20000,
+                        help='наибольшее количество парных партий')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='доверительная вероятность')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='общее зерно оценки')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='количество процессов')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='количество партий в одном пакете')
+    parser.add_argument('--board', choices=['Board', 'BitBoard'], default='BitBoard',
+                        help='класс доски')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE,
+                        help='размер доски')
+    parser.add_argument('--fleet', type=parse_fleet, default=SHIPS_TYPES,
+                        help='длины кораблей через запятую')
+    args = parser.parse_args(argv)
+    if args.batch_size < 1 or args.max_games < args.batch_size:
+        parser.error('Параметр --max-games должен быть не меньше '
+                     '--batch-size, а --batch-size - больше нуля.')
+    if not 0 < args.confidence < 1:
+        parser.error('Параметр --confidence должен быть от 0 до 1.')
+    try:
+        Game.check_fleet(args.size, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    evaluation = Evaluation(*(load_player_class(name) for name in args.players),
+                            args.max_games, args.confidence, args.seed,
+                            args.workers, args.batch_size,
+                            BitBoard if args.board == 'BitBoard' else Board,
+                            args.size, args.fleet)
+    result = evaluation.run()
+    low, high = result['difference_ci']
+    first, second = result['players']
+    print(f'{first} / {second}: партий {result["games"]} из {evaluation.max_games}, '
+          f'выстрелов в среднем {result["mean_shots"][0]:.2f} / '
+          f'{result["mean_shots"][1]:.2f}')
+    print(f'Разность {result["mean_difference"]:+.3f} [{low:+.3f}; {high:+.3f}], '
+          f'величина эффекта {result["effect_size"]:+.3f}, '
+          f'z = {result["z"]:+.2f} (порог {result["threshold"]:.2f})')
+    print(('Разница значима' if result['significant'] else 'Разница не обнаружена')
+          + (' (ранняя остановка)' if result['stopped_early'] else ''))
+    print(f'Время: {result["seconds"]:.2f} с, без остановки около '
+          f'{result["fixed_seconds"]:.2f} с, сэкономлено '
+          f'{result["saved_seconds"]:.2f} с')
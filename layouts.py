@@ -0,0 +1,543 @@
+"""
+Точный подсчёт расстановок флота и равномерный выбор расстановки.
+
+Доска заполняется по клеткам построчно, а состояние динамики - профиль:
+для каждого столбца, что стоит в последней рассмотренной клетке этого
+столбца (пусто, палуба горизонтального корабля или вертикальный корабль,
+который ещё может продолжиться, и его длина), плюс соседняя по диагонали
+клетка предыдущей строки и длина текущего горизонтального корабля. Ореол
+проверяется по профилю, а корабль засчитывается флоту, когда он закончился.
+Для каждого состояния хранится не одно число, а вектор: сколько способов
+закончить расстановку для каждого остатка флота. Векторы считаются с конца
+доски к началу на NumPy, поэтому состояний не больше, чем профилей
+(около 3 млн на доске 10x10), а не профилей, умноженных на остатки флота.
+
+Таблицы на границах строк позволяют выбирать расстановку точно равномерно
+без повторных попыток: строка за строкой выбирается вариант заполнения
+с вероятностью, пропорциональной числу способов закончить расстановку.
+Таблицы для каждой пары (размер, флот) сохраняются в каталог кэша
+(LAYOUT_CACHE_DIR, переменная окружения BATTLESHIP_CACHE).
+
+Для работы нужен NumPy (pip install numpy).
+
+Запуск: python layouts.py --size 10 --fleet 4,3,3,2,2,2,1,1,1,1 --samples 1000
+"""
+
+import argparse
+import os
+from bisect import bisect_right
+from functools import lru_cache
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+from main import (BOARD_SIZE, DEFAULT_RNG, PLACEMENT_CACHE_SIZE, SHIPS_TYPES,
+                  BitBoard, Board, Dot, Game, Ship, parse_fleet)
+
+
+# Каталог кэша таблиц расстановок
+LAYOUT_CACHE_DIR = os.environ.get(
+    'BATTLESHIP_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'battleship'))
+# Версия формата файла таблиц
+LAYOUT_CACHE_VERSION = 1
+# Сколько бит может занимать код состояния динамики
+CODE_BITS = 62
+# Пока числа в таблице меньше этого порога, сумма двух из них помещается
+# в int64; дальше таблица считается в целых числах Python
+INT64_LIMIT = 1 << 61
+# Сколько вариантов заполнения строк хранится для выбора расстановок
+ROW_CACHE_SIZE = 4096
+
+
+class LayoutTable():
+    """
+    Класс для представления таблиц точного подсчёта расстановок флота
+    на доске: для каждой границы строк и каждого профиля - количество
+    способов закончить расстановку для каждого остатка флота.
+
+    Атрибуты
+    --------
+    size : int
+        Размер доски.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    lengths : list
+        Различные длины кораблей в порядке убывания.
+    numbers : list
+        Количество кораблей каждой длины из lengths.
+    variants : int
+        Количество возможных остатков флота (длина вектора в таблице).
+    codes : list
+        Для каждой границы строк словарь {код профиля: номер строки таблицы}.
+    tables : list
+        Для каждой границы строк массив (профили, variants + 1): количество
+        способов закончить расстановку; последний столбец всегда нулевой.
+    total : int
+        Количество всех расстановок флота.
+
+    Методы
+    --------
+    build():
+        Заполняет таблицы.
+    count():
+        Возвращает количество всех расстановок флота.
+    sample(rng=DEFAULT_RNG):
+        Возвращает равномерно выбранную расстановку.
+    make_board(board_class=Board, rng=DEFAULT_RNG):
+        Возвращает доску с равномерно выбранной расстановкой.
+    save(str):
+        Сохраняет таблицы в файл.
+    @classmethod
+    load(str, int, list):
+        Загружает таблицы из файла.
+    """
+
+    def __init__(self,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта LayoutTable.
+
+        Атрибуты
+        --------
+        size : int
+            Размер доски.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        lengths : list
+            Различные длины кораблей в порядке убывания.
+        numbers : list
+            Количество кораблей каждой длины из lengths.
+        variants : int
+            Количество возможных остатков флота (длина вектора в таблице).
+        codes : list
+            Для каждой границы строк словарь {код профиля: номер строки таблицы}.
+        tables : list
+            Для каждой границы строк массив (профили, variants + 1):
+            количество способов закончить расстановку.
+        total : int
+            Количество всех расстановок флота (None до build()).
+        """
+
+        if size < 1 or not ships_types or min(ships_types) < 1:
+            raise ValueError('Размер доски и длины кораблей должны быть больше нуля.')
+        self.size = size
+        self.ships_types = sorted(ships_types, reverse=True)
+        self.lengths = sorted(set(ships_types), reverse=True)
+        self.numbers = [self.ships_types.count(length) for length in self.lengths]
+        # Остаток флота - число в смешанной системе счисления:
+        # разряд каждой длины от 0 до количества кораблей этой длины
+        self._strides = list()
+        self.variants = 1
+        for number in self.numbers:
+            self._strides.append(self.variants)
+            self.variants *= number + 1
+        # Код состояния: профиль по width бит на столбец, затем клетка
+        # по диагонали и длина текущего горизонтального корабля
+        self._width = (self.lengths[0] + 1).bit_length()
+        self._full = (1 << self._width) - 1
+        self._diagonal = size * self._width
+        self._run = self._diagonal + self._width
+        if self._run + self._width > CODE_BITS:
+            raise ValueError('Доска слишком велика для точного подсчёта расстановок.')
+        self._gathers = dict()
+        # Сочетания законченных кораблей, их номера и матрица переходов
+        # остатков флота для выбора расстановок
+        self._combos = dict()
+        self._combo_matrix = None
+        self._rows = dict()
+        self.codes = None
+        self.tables = None
+        self.total = None
+
+    def _index(self, numbers: list) -> int:
+        """
+        Вспомогательный метод.
+        Возвращает номер остатка флота по количеству кораблей каждой длины.
+        """
+
+        return sum(number * stride for number, stride in zip(numbers, self._strides))
+
+    def _gather(self, consumed: tuple) -> np.ndarray:
+        """
+        Вспомогательный метод.
+        Возвращает для каждого остатка флота номер остатка без кораблей
+        consumed или variants, если таких кораблей в нём нет.
+        """
+
+        gather = self._gathers.get(consumed)
+        if gather is None:
+            indices = np.arange(self.variants)
+            gather = indices.copy()
+            valid = np.ones(self.variants, dtype=bool)
+            for position, (stride, number) in enumerate(zip(self._strides, self.numbers)):
+                used = consumed.count(self.lengths[position])
+                valid &= indices // stride % (number + 1) >= used
+                gather -= used * stride
+            gather[~valid] = self.variants
+            self._gathers[consumed] = gather
+        return gather
+
+    def _steps(self, code: int, column: int) -> list:
+        """
+        Вспомогательный метод.
+        Возвращает переходы из состояния code для клетки в столбце column:
+        (код следующего состояния, длины законченных кораблей, занята ли клетка).
+        """
+
+        width, full = self._width, self._full
+        shift = column * width
+        last = column + 1 == self.size
+        diagonal = code >> self._diagonal & full
+        run = code >> self._run & full
+        profile = code & (1 << self._diagonal) - 1
+        above = profile >> shift & full
+        right = 0 if last else profile >> shift + width & full
+        left = profile >> shift - width & full if column else 0
+        cleared = profile & ~(full << shift)
+        steps = list()
+        # Клетка пуста: заканчиваются вертикальный корабль сверху
+        # и горизонтальный корабль слева
+        consumed = tuple(sorted(length for length in
+                                (above if above != full else 0, run if run > 1 else 0)
+                                if length))
+        if all(length in self.lengths for length in consumed):
+            steps.append((cleared if last else cleared | above << self._diagonal,
+                          consumed, False))
+        # Клетка занята: по диагонали сверху и справа сверху пусто,
+        # сверху - пусто или вертикальный корабль
+        if diagonal or right or above == full:
+            return steps
+        longest = self.lengths[0]
+        if above:
+            # Продолжение вертикального корабля, слева должно быть пусто
+            if left or above == longest:
+                return steps
+            profile, run = cleared | above + 1 << shift, 0
+        elif not left:
+            # Новый корабль: пока считаем его вертикальным
+            profile, run = cleared | 1 << shift, 0
+        elif left == 1:
+            # Слева одиночная палуба: это горизонтальный корабль
+            if longest < 2:
+                return steps
+            profile = cleared & ~(full << shift - width) | full << shift | full << shift - width
+            run = 2
+        elif left == full and run < longest:
+            profile, run = cleared | full << shift, run + 1
+        else:
+            return steps
+        if last:
+            consumed = (run,) if run > 1 else ()
+            if all(length in self.lengths for length in consumed):
+                steps.append((profile, consumed, True))
+        else:
+            steps.append((profile | above << self._diagonal | run << self._run, (), True))
+        return steps
+
+    def _combo(self, consumed: tuple) -> int:
+        """
+        Вспомогательный метод.
+        Возвращает номер сочетания законченных кораблей consumed
+        (строки в матрице переходов остатков флота).
+        """
+
+        combo = self._combos.get(consumed)
+        if combo is None:
+            combo = self._combos[consumed] = len(self._combos)
+            gathers = [self._gather(key) for key in self._combos]
+            self._combo_matrix = np.stack(gathers)
+        return combo
+
+    def _row(self, x: int, code: int) -> tuple:
+        """
+        Вспомогательный метод.
+        Возвращает все варианты заполнения строки x из состояния code,
+        после которых расстановку ещё можно закончить: номера состояний
+        в таблице следующей границы, номера сочетаний законченных кораблей,
+        коды состояний и занятые столбцы. Варианты хранятся в кэше.
+        """
+
+        key = (x, code)
+        row = self._rows.get(key)
+        if row is None:
+            variants = [(code, (), ())]
+            for y in range(self.size):
+                variants = [(next_code, consumed + more, cells + (y,) if busy else cells)
+                            for code, consumed, cells in variants
+                            for next_code, more, busy in self._steps(code, y)]
+            codes = self.codes[x + 1]
+            variants = [(codes[next_code], self._combo(tuple(sorted(consumed))),
+                         next_code, cells)
+                        for next_code, consumed, cells in variants if next_code in codes]
+            rows, combos, next_codes, cells = zip(*variants)
+            row = (np.array(rows), np.array(combos), next_codes, cells)
+            if len(self._rows) >= ROW_CACHE_SIZE:
+                self._rows.pop(next(iter(self._rows)))
+            self._rows[key] = row
+        return row
+
+    def build(self) -> None:
+        """
+        Заполняет таблицы: сначала перебирает все достижимые состояния
+        от начала доски к концу, затем считает векторы с конца к началу.
+        """
+
+        size = self.size
+        cells = size * size
+        layer = {0: 0}
+        codes = [layer]
+        transitions = list()
+        combos = dict()
+        for cell in range(cells):
+            column = cell % size
+            following = dict()
+            moves = ([[], [], []], [[], [], []])
+            for code, row in layer.items():
+                for next_code, consumed, occupied in self._steps(code, column):
+                    sources, targets, kinds = moves[occupied]
+                    sources.append(row)
+                    targets.append(following.setdefault(next_code, len(following)))
+                    kinds.append(combos.setdefault(consumed, len(combos)))
+            transitions.append((len(layer), [tuple(np.array(values, dtype=np.int64)
+                                                   for values in move)
+                                             for move in moves]))
+            layer = following
+            if column == size - 1:
+                codes.append(layer)
+        gathers = [self._gather(consumed) for consumed in combos]
+        # В конце доски остаются вертикальные корабли последней строки
+        table = np.zeros((len(layer), self.variants + 1), dtype=np.int64)
+        for code, row in layer.items():
+            consumed = [code >> column * self._width & self._full for column in range(size)]
+            numbers = [0] * len(self.numbers)
+            valid = True
+            for length in consumed:
+                if length and length != self._full:
+                    if length not in self.lengths:
+                        valid = False
+                        break
+                    numbers[self.lengths.index(length)] += 1
+            if valid and all(n <= m for n, m in zip(numbers, self.numbers)):
+                table[row, self._index(numbers)] = 1
+        tables = [None] * (size + 1)
+        tables[size] = table
+        for cell in reversed(range(cells)):
+            count, moves = transitions.pop()
+            current = np.zeros((count, self.variants + 1), dtype=table.dtype)
+            for sources, targets, kinds in moves:
+                for kind in np.unique(kinds):
+                    chosen = kinds == kind
+                    current[sources[chosen], :self.variants] += \
+                        table[targets[chosen]][:, gathers[kind]]
+            if current.dtype != object and len(current) and current.max() >= INT64_LIMIT:
+                current = current.astype(object)
+            table = current
+            if cell % size == 0:
+                tables[cell // size] = table
+        self.codes = codes
+        self.tables = tables
+        self.total = int(tables[0][0, self._index(self.numbers)])
+
+    def count(self) -> int:
+        """
+        Возвращает количество всех расстановок флота
+        (при первом обращении заполняет таблицы).
+        """
+
+        if self.total is None:
+            self.build()
+        return self.total
+
+    def sample(self, rng: Random = DEFAULT_RNG) -> tuple:
+        """
+        Возвращает равномерно выбранную расстановку: (x, y, направление)
+        для каждого корабля флота в порядке ships_types. Если флот
+        невозможно расставить, выбрасывает ValueError.
+        """
+
+        if not self.count():
+            raise ValueError('Флот невозможно расставить на доске.')
+        size = self.size
+        code, rest = 0, self._index(self.numbers)
+        occupied = set()
+        for x in range(size):
+            # Вариант строки выбирается с вероятностью, пропорциональной
+            # числу способов закончить расстановку после него
+            rows, combos, next_codes, cells = self._row(x, code)
+            remaining = self._combo_matrix[combos, rest]
+            weights = np.cumsum(self.tables[x + 1][rows, remaining]).tolist()
+            chosen = bisect_right(weights, rng.randrange(weights[-1]))
+            code, rest = next_codes[chosen], int(remaining[chosen])
+            occupied.update(x * size + y for y in cells[chosen])
+        # Собираем корабли из занятых клеток: нос - верхняя или левая палуба
+        ships = dict()
+        for cell in sorted(occupied):
+            x, y = divmod(cell, size)
+            if x and cell - size in occupied or y and cell - 1 in occupied:
+                continue
+            direction = 1 if y + 1 < size and cell + 1 in occupied else 0
+            step = 1 if direction else size
+            length = 1
+            while cell + length * step in occupied and \
+                    (direction == 0 or y + length < size):
+                length += 1
+            ships.setdefault(length, list()).append((x, y, direction))
+        return tuple(ships[length].pop() for length in self.ships_types)
+
+    def make_board(self, board_class: type = Board, rng: Random = DEFAULT_RNG) -> Board:
+        """
+        Возвращает доску board_class с равномерно выбранной расстановкой
+        (как и Game.random_board, без вызова get_ready()).
+        """
+
+        board = board_class(self.size, self.ships_types)
+        for length, (x, y, direction) in zip(self.ships_types, self.sample(rng)):
+            board.add_ship(Ship(length, Dot(x, y), direction))
+        return board
+
+    def save(self, path: str) -> None:
+        """
+        Сохраняет таблицы в файл (сжатый архив NumPy). Таблицы в целых
+        числах Python (больше int64) не сохраняются: выбрасывается ValueError.
+        """
+
+        if self.tables is None:
+            self.build()
+        if any(table.dtype == object for table in self.tables):
+            raise ValueError('Таблицы не помещаются в int64 и не сохраняются.')
+        arrays = {'meta': np.array([LAYOUT_CACHE_VERSION, self.size, *self.ships_types])}
+        for row, (codes, table) in enumerate(zip(self.codes, self.tables)):
+            arrays[f'codes{row}'] = np.fromiter(codes, dtype=np.int64, count=len(codes))
+            arrays[f'counts{row}'] = table
+        # Пишем во временный файл, чтобы другой процесс не прочитал
+        # недописанные таблицы
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as file:
+            np.savez_compressed(file, **arrays)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str, size: int, ships_types: list) -> 'LayoutTable':
+        """
+        Загружает таблицы из файла. Если файл записан для другой доски,
+        флота или версии формата, выбрасывает ValueError.
+        """
+
+        table = cls(size, ships_types)
+        with np.load(path) as data:
+            meta = data['meta'].tolist()
+            if meta != [LAYOUT_CACHE_VERSION, size, *table.ships_types]:
+                raise ValueError('Файл таблиц записан для другой доски или флота.')
+            table.codes = list()
+            table.tables = list()
+            for row in range(size + 1):
+                codes = data[f'codes{row}'].tolist()
+                table.codes.append(dict(zip(codes, range(len(codes)))))
+                table.tables.append(data[f'counts{row}'])
+        table.total = int(table.tables[0][0, table._index(table.numbers)])
+        return table
+
+
+def cache_path(size: int, ships_types: list, directory: str = LAYOUT_CACHE_DIR) -> str:
+    """
+    Возвращает путь к файлу таблиц для доски size и флота ships_types.
+    """
+
+    fleet = '-'.join(map(str, sorted(ships_types, reverse=True)))
+    return os.path.join(directory, f'layouts-{size}-{fleet}.npz')
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def layout_table(size: int, fleet: tuple, directory: str = LAYOUT_CACHE_DIR) -> LayoutTable:
+    """
+    Возвращает заполненные таблицы для доски size и флота fleet (кортеж).
+    Таблицы берутся из кэша в памяти, затем из файла в каталоге directory,
+    и только если их нет, считаются и сохраняются в этот файл.
+    Если directory равен None, файлы не используются.
+    """
+
+    path = cache_path(size, fleet, directory) if directory is not None else None
+    if path is not None and os.path.exists(path):
+        try:
+            return LayoutTable.load(path, size, list(fleet))
+        except (OSError, ValueError, KeyError):
+            # Повреждённый или устаревший файл просто пересчитываем
+            pass
+    table = LayoutTable(size, list(fleet))
+    table.build()
+    if path is not None:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            table.save(path)
+        except (OSError, ValueError):
+            pass
+    return table
+
+
+def count_layouts(size: int = BOARD_SIZE, ships_types: list = SHIPS_TYPES) -> int:
+    """
+    Возвращает точное количество расстановок флота ships_types на доске
+    размера size (корабли одной длины не различаются).
+    """
+
+    return layout_table(size, tuple(sorted(ships_types, reverse=True))).count()
+
+
+def uniform_board(board_class: type = Board,
+                  size: int = BOARD_SIZE,
+                  ships_types: list = SHIPS_TYPES,
+                  rng: Random = DEFAULT_RNG) -> Board:
+    """
+    Возвращает доску с расстановкой, выбранной равномерно среди всех
+    расстановок флота, без повторных попыток. В отличие от
+    Game.random_board, никогда не возвращает None: если флот невозможно
+    расставить, выбрасывает ValueError.
+    """
+
+    return layout_table(size, tuple(sorted(ships_types, reverse=True))).make_board(
+        board_class, rng)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Точный подсчёт и равномерный '
+                                                 'выбор расстановок флота')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE,
+                        help='размер доски')
+    parser.add_argument('--fleet', type=parse_fleet, default=SHIPS_TYPES,
+                        help='длины кораблей через запятую')
+    parser.add_argument('--samples', type=int, default=1000,
+                        help='количество расстановок для замера выбора')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='зерно генератора случайных чисел')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='не читать и не сохранять файл таблиц')
+    args = parser.parse_args()
+    try:
+        Game.check_fleet(args.size, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+
+    directory = None if args.no_cache else LAYOUT_CACHE_DIR
+    path = cache_path(args.size, args.fleet, directory) if directory else None
+    cached = path is not None and os.path.exists(path)
+    started = perf_counter()
+    table = layout_table(args.size, tuple(args.fleet), directory)
+    print(f'Расстановок: {table.count()}, '
+          f'{"загрузка таблиц" if cached else "подсчёт"}: {perf_counter() - started:.2f} с')
+    if path is not None and os.path.exists(path):
+        print(f'Файл таблиц: {path}, {os.path.getsize(path)} байт')
+    if table.count():
+        rng = Random(args.seed)
+        for board_class in (Board, BitBoard):
+            started = perf_counter()
+            for _ in range(args.samples):
+                table.make_board(board_class, rng)
+            uniform = (perf_counter() - started) / args.samples
+            started = perf_counter()
+            for _ in range(args.samples):
+                Game.random_board(board_class, args.size, args.fleet, rng)
+            greedy = (perf_counter() - started) / args.samples
+            print(f'{board_class.__name__}: равномерная расстановка {uniform * 1e6:.1f} мкс, '
+                  f'Game.random_board {greedy * 1e6:.1f} мкс')
@@ -1,11 +1,33 @@
-from random import randint
-from time import sleep
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import shutil
+import sys
+from collections import Counter
+from collections.abc import Callable
+from functools import lru_cache, partial, wraps
+from random import Random
+from time import perf_counter, sleep
 
 
 # Размер игровой доски
 BOARD_SIZE = 6
 # Длины / количество палуб всех кораблей в порядке убывания
 SHIPS_TYPES = [3, 2, 2, 1, 1, 1, 1]
+# Генератор по умолчанию: из него берутся зёрна партий, для которых
+# зерно не задано явно, поэтому seed_random делает воспроизводимыми
+# и их
+DEFAULT_RNG = Random()
+
+
+def seed_random(seed: int = None) -> None:
+    """
+    Задаёт зерно генератора по умолчанию DEFAULT_RNG.
+    """
+
+    DEFAULT_RNG.seed(seed)
 
 
 class BoardException(Exception):
@@ -55,6 +77,9 @@ class BoardWrongShipException(BoardException):
 class Dot():
     """
     Класс для представления точки на доске.
+    Точки доски заранее создаются один раз (интернируются), и Dot(x, y)
+    возвращает общий экземпляр. Точки за пределами интернированной области
+    создаются заново. Точки нельзя изменять после создания.
 
     Атрибуты
     --------
@@ -62,22 +87,51 @@ class Dot():
         Координата по оси x.
     y : int
         Координата по оси y.
+    _interned : dict
+        Общие экземпляры точек по ключу (x, y).
+    _interned_size : int
+        Размер наибольшей доски, точки которой уже интернированы.
+
+    Методы
+    --------
+    @classmethod
+    intern(int):
+        Заранее создаёт общие экземпляры всех точек доски размера size.
+    __getnewargs__():
+        Возвращает аргументы Dot(x, y) для копирования и сериализации.
     """
 
-    def __init__(self, x: int, y: int) -> None:
+    __slots__ = ('x', 'y')
+
+    _interned: dict = dict()
+    _interned_size: int = 0
+
+    def __new__(cls, x: int, y: int) -> 'Dot':
+        """
+        Возвращает общий экземпляр точки с координатами x, y,
+        либо новый, если такая точка не интернирована.
         """
-        Устанавливает все необходимые атрибуты для объекта Dot.
 
-        Атрибуты
-        --------
-        x : int
-            Координата по оси x.
-        y : int
-            Координата по оси y.
+        dot = cls._interned.get((x, y))
+        if dot is None:
+            dot = super().__new__(cls)
+            dot.x = x
+            dot.y = y
+        return dot
+
+    @classmethod
+    def intern(cls, size: int) -> None:
+        """
+        Заранее создаёт общие экземпляры всех точек доски размера size.
         """
 
-        self.x = x
-        self.y = y
+        if size <= cls._interned_size:
+            return
+        for x in range(size):
+            for y in range(size):
+                if (x, y) not in cls._interned:
+                    cls._interned[(x, y)] = cls(x, y)
+        cls._interned_size = size
 
     def __eq__(self, other: 'Dot') -> bool:
         """
@@ -86,7 +140,25 @@ class Dot():
         достаточно просто использовать оператор in.
         """
 
-        return self.x == other.x and self.y == other.y
+        return self is other or (self.x == other.x and self.y == other.y)
+
+    def __hash__(self) -> int:
+        """
+        Позволяет хранить точки в множествах и использовать как ключи словаря.
+        """
+
+        return hash((self.x, self.y))
+
+    def __getnewargs__(self) -> tuple[int, int]:
+        """
+        Позволяет копировать (copy, deepcopy) и сериализовать (pickle) точки:
+        при восстановлении Dot(x, y) вернёт общий экземпляр точки.
+        """
+
+        return self.x, self.y
+
+
+Dot.intern(BOARD_SIZE)
 
 
 class Ship():
@@ -103,17 +175,21 @@ class Ship():
         Направление корабля (вертикальное/горизонтальное).
     lives : int
         Количеством жизней (сколько точек корабля еще не подбито).
+    _dots : tuple
+        Кортеж точек корабля, вычисляется при первом обращении к dots.
 
     Методы
     --------
     @property
     dots():
-        Возвращает список всех точек корабля.
+        Возвращает кортеж всех точек корабля.
     is_strike(Dot):
         Проверяет попадание,
         иными словами, принадлежит ли точка dot этому кораблю.
     """
 
+    __slots__ = ('length', 'bow', 'direction', 'lives', '_dots')
+
     def __init__(self, length: int, bow: Dot, direction: int) -> None:
         """
         Устанавливает все необходимые атрибуты для объекта Ship.
@@ -128,30 +204,36 @@ class Ship():
             Направление корабля (вертикальное/горизонтальное).
         lives : int
             Количеством жизней (сколько точек корабля еще не подбито).
+        _dots : tuple
+            Кортеж точек корабля, вычисляется при первом обращении к dots.
         """
 
         self.length = length
         self.bow = bow
         self.direction = direction
         self.lives = length
+        self._dots = None
 
     @property
-    def dots(self) -> list[Dot]:
+    def dots(self) -> tuple[Dot, ...]:
         """
-        Возвращает список всех точек корабля.
+        Возвращает кортеж всех точек корабля.
+        Кортеж вычисляется один раз, корабль нельзя передвигать после создания.
         """
 
-        dot_list = list()
-        for i in range(self.length):
-            x, y = self.bow.x, self.bow.y
+        if self._dots is None:
+            dot_list = list()
+            for i in range(self.length):
+                x, y = self.bow.x, self.bow.y
 
-            if self.direction == 0:
-                x += i
-            elif self.direction == 1:
-                y += i
+                if self.direction == 0:
+                    x += i
+                elif self.direction == 1:
+                    y += i
 
-            dot_list.append(Dot(x, y))
-        return dot_list
+                dot_list.append(Dot(x, y))
+            self._dots = tuple(dot_list)
+        return self._dots
 
     def is_strike(self, dot: Dot) -> bool:
         """
@@ -172,17 +254,39 @@ class Board():
         Информация о том, нужно ли скрывать
         корабли на доске (для вывода доски соперника),
         или нет (для своей доски).
+    _is_verbose : bool
+        Информация о том, нужно ли сообщать в консоли о результатах
+        выстрелов (для обычной игры), или нет (для игры без ввода-вывода).
+    size : int
+        Размер доски.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
     table : list
         Двумерный список, в котором хранятся состояния каждой из клеток.
         При инициации заполняется символами моря '○'.
     ships : list
         Список кораблей доски.
-    locked_dots : list
-        Список заблокированных точек: во время генерации случайной доски
+    locked_dots : set
+        Множество заблокированных точек: во время генерации случайной доски
         служит для хранения уже занятых кораблями и их ореолами точек, а
         во время игры служит для хранения точек, куда игрок уже стрелял.
     live_ships : int
         Количество живых кораблей на доске.
+    _locked_mask : int
+        Битовая маска точек locked_dots (бит x * size + y): неизменяемое
+        целое, поэтому snapshot() не копирует множество.
+    _ship_at : list
+        Для каждой клетки x * size + y индекс корабля в списке ships или None.
+    zobrist : int
+        64-битный хеш Зобриста видимого сопернику состояния доски:
+        промахов и ореолов, попаданий и палуб потопленных кораблей.
+    _zobrist_keys : tuple
+        Ключи Зобриста клеток доски (zobrist_keys(size)).
+    _journal : list
+        Журнал отмены: для каждого хода make_shot хеш до хода и список
+        точек, которые этот ход заблокировал (первая - сама точка выстрела).
+    _frame : list
+        Список точек текущего хода make_shot, пока он выполняется, иначе None.
 
     Методы
     --------
@@ -192,14 +296,25 @@ class Board():
     @is_hidden.setter
     def is_hidden():
         Сеттер для параметра _is_hidden
+    @property
+    def is_verbose():
+        Геттер для параметра _is_verbose
+    @is_verbose.setter
+    def is_verbose():
+        Сеттер для параметра _is_verbose
+    report(str):
+        Выводит сообщение о результате выстрела, если включён параметр
+        _is_verbose.
     add_ship(Ship):
         Ставит корабль на доску (если не получается, выбрасывает исключение).
     mark_oreol(Ship, is_game=True):
         Формирует ореол корабля, т.е. помечает точки вокруг,
         где другого корабля по правилам быть не может.
+    render():
+        Возвращает изображение доски в виде строки
+        в зависимости от параметра _is_hidden.
     show():
         Выводит доску в консоль в зависимости от параметра _is_hidden.
-    @staticmethod
     out(Dot):
         Возвращает True , если точка выходит за пределы доски,
         и False, если не выходит.
@@ -210,37 +325,76 @@ class Board():
         Возвращает True, если право следующего хода остаётся за текущим игроком
         и False, если право следующего хода переходит сопернику.
     get_ready():
-        Обнуляет перед стартом игры список заблокированных точек,
-        который использовался во время генерации доски.
+        Обнуляет перед стартом игры множество заблокированных точек,
+        которое использовалось во время генерации доски.
     is_loser():
         Проверяет состояние проигрыша.
+    make_shot(Dot):
+        Делает выстрел, который можно отменить через unmake_shot.
+    unmake_shot():
+        Отменяет последний выстрел, сделанный через make_shot.
+    snapshot():
+        Возвращает неизменяемое состояние доски после расстановки.
+    restore(tuple):
+        Восстанавливает состояние доски из snapshot().
     """
 
     _is_hidden: bool = False
+    _is_verbose: bool = True
 
-    def __init__(self) -> None:
+    def __init__(self,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES) -> None:
         """
         Устанавливает все необходимые атрибуты для объекта Board.
 
         Атрибуты
         --------
+        size : int
+            Размер доски.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
         table : list
             Двумерный список, в котором хранятся состояния каждой из клеток.
             При инициации заполняется символами моря '○'.
         ships : list
             Список кораблей доски.
-        locked_dots : list
-            Список заблокированных точек: во время генерации случайной доски
+        locked_dots : set
+            Множество заблокированных точек: во время генерации случайной доски
             служит для хранения уже занятых кораблями и их ореолами точек, а
             во время игры служит для хранения точек, куда игрок уже стрелял.
         live_ships : int
             Количество живых кораблей на доске.
+        _locked_mask : int
+            Битовая маска точек locked_dots (бит x * size + y): неизменяемое
+            целое, поэтому snapshot() не копирует множество.
+        _ship_at : list
+            Для каждой клетки x * size + y индекс корабля в списке ships или None.
+        zobrist : int
+            64-битный хеш Зобриста видимого сопернику состояния доски:
+            промахов и ореолов, попаданий и палуб потопленных кораблей.
+        _zobrist_keys : tuple
+            Ключи Зобриста клеток доски (zobrist_keys(size)).
+        _journal : list
+            Журнал отмены: для каждого хода make_shot хеш до хода и список
+            точек, которые этот ход заблокировал (первая - сама точка выстрела).
+        _frame : list
+            Список точек текущего хода make_shot, пока он выполняется, иначе None.
         """
 
-        self.table = [['○'] * BOARD_SIZE for _ in range(BOARD_SIZE)]
+        Dot.intern(size)
+        self.size = size
+        self.ships_types = list(ships_types)
+        self.table = [['○'] * size for _ in range(size)]
         self.ships = list()
-        self.locked_dots = list()
-        self.live_ships = len(SHIPS_TYPES)
+        self.locked_dots = set()
+        self.live_ships = len(self.ships_types)
+        self._locked_mask = 0
+        self._ship_at = [None] * (size * size)
+        self.zobrist = 0
+        self._zobrist_keys = zobrist_keys(size)
+        self._journal = list()
+        self._frame = None
 
     @property
     def is_hidden(self) -> bool:
@@ -261,19 +415,55 @@ class Board():
         else:
             raise ValueError('Параметр is_hidden должен быть True или False.')
 
+    @property
+    def is_verbose(self) -> bool:
+        """
+        Геттер для параметра _is_verbose
+        """
+
+        return self._is_verbose
+
+    @is_verbose.setter
+    def is_verbose(self, value: bool) -> None:
+        """
+        Сеттер для параметра _is_verbose
+        """
+
+        if isinstance(value, bool):
+            self._is_verbose = value
+        else:
+            raise ValueError('Параметр is_verbose должен быть True или False.')
+
+    def report(self, message: str) -> None:
+        """
+        Выводит сообщение о результате выстрела, если включён параметр
+        _is_verbose.
+        """
+
+        if self._is_verbose:
+            print(message)
+            sleep(1)
+
     def add_ship(self, ship: Ship) -> None:
         """
         Ставит корабль на доску (если не получается, выбрасывает исключение).
         """
 
+        # Корабль, не помещающийся на доске, отсутствует в индексе положений
+        if (ship.bow.x, ship.bow.y, ship.direction) not in \
+           placement_lookup(self.size, ship.length):
+            raise BoardWrongShipException()
         # Проверяем возможность установки всех точек корабля
         for dot in ship.dots:
-            if Board.out(dot) or dot in self.locked_dots:
+            if dot in self.locked_dots:
                 raise BoardWrongShipException()
-        # Устанавливаем на доску корабль
+        # Устанавливаем на доску корабль и запоминаем его индекс в клетках
+        index = len(self.ships)
         for dot in ship.dots:
             self.table[dot.x][dot.y] = '■'
-            self.locked_dots.append(dot)
+            self.locked_dots.add(dot)
+            self._locked_mask |= 1 << (dot.x * self.size + dot.y)
+            self._ship_at[dot.x * self.size + dot.y] = index
         # Добавляем корабль в список кораблей доски
         self.ships.append(ship)
         # Отмечаем ореол корабля
@@ -294,41 +484,64 @@ class Board():
                 x, y = dot.x + dx, dot.y + dy
                 current_dot = Dot(x, y)
                 # Если сосед в пределах доски и не был помечен ранее
-                if (not Board.out(current_dot)) and \
+                if (not self.out(current_dot)) and \
                    (current_dot not in self.locked_dots):
                     # Помечаем соседа
-                    self.locked_dots.append(current_dot)
+                    self.locked_dots.add(current_dot)
+                    self._locked_mask |= 1 << (x * self.size + y)
                     # Если идёт игра, отмечаем ореол на доске
                     if is_game:
                         self.table[x][y] = '•'
+                        self.zobrist ^= self._zobrist_keys[x * self.size + y][MISS]
+                        # Запоминаем точку для отмены хода
+                        if self._frame is not None:
+                            self._frame.append(current_dot)
+
+    def render(self) -> str:
+        """
+        Возвращает изображение доски в виде строки
+        в зависимости от параметра _is_hidden.
+        Все номера строк и столбцов выравниваются по ширине
+        самого длинного номера.
+        """
+
+        width = len(str(self.size))
+        pad = ' ' * (width - 1)
+        lines = [' ' * width + 'X|' + ''.join(' ' + str(col).rjust(width)
+                                            for col in range(1, self.size + 1)),
+                 'Y◢'.ljust(width + 2) + '_' * ((width + 1) * self.size)]
+        for row, cells in enumerate(self._rows(), start=1):
+            lines.append(str(row).ljust(width) + ' | ' + pad
+                         + (' ' + pad).join(cells) + ' ')
+        frame = '\n'.join(lines) + '\n\n\n'
+        if self.is_hidden:
+            # Прячем ещё живые корабли соперника
+            frame = frame.replace('■', '○')
+        return frame
+
+    def _rows(self) -> list:
+        """
+        Вспомогательный метод.
+        Возвращает символы клеток доски построчно.
+        table хранится по столбцам, поэтому строки получаем через zip.
+        """
+
+        return list(zip(*self.table))
 
     def show(self) -> None:
         """
         Выводит доску в консоль в зависимости от параметра _is_hidden.
         """
 
-        print(' X| 1 2 3 4 5 6')
-        print('Y◢ ____________')
-        for row in range(BOARD_SIZE):
-            print(row + 1, end=' | ')
-            for col in range(BOARD_SIZE):
-                cell = self.table[col][row]
-                if self.is_hidden:
-                    # Прячем ещё живые корабли соперника
-                    print('○', end=' ') if cell == '■' else print(cell, end=' ')
-                else:
-                    print(cell, end=' ')
-            print('')
-        print('\n')
+        sys.stdout.write(self.render())
 
-    @staticmethod
-    def out(dot: Dot) -> bool:
+    def out(self, dot: Dot) -> bool:
         """
         Возвращает True , если точка выходит за пределы доски,
         и False, если не выходит.
         """
 
-        return not (0 <= dot.x < BOARD_SIZE and 0 <= dot.y < BOARD_SIZE)
+        return not (0 <= dot.x < self.size and 0 <= dot.y < self.size)
 
     def shot(self, dot: Dot) -> bool:
         """
@@ -340,55 +553,62 @@ class Board():
         """
 
         # Если выстрел за пределы доски
-        if Board.out(dot):
+        if self.out(dot):
             raise BoardOutException
         # Если выстрел в уже стрелянную точку
         if dot in self.locked_dots:
             raise BoardUsedException
-        # Добавляем точку в список уже стрелянных
-        self.locked_dots.append(dot)
-        # Для каждого корабля на доске
-        for ship in self.ships:
-            # Если есть попадание
-            if ship.is_strike(dot):
-                # Отнимаем жизнь у корабля
-                ship.lives -= 1
-                # Помечаем точку на доске
-                self.table[dot.x][dot.y] = '×'
-                # Если это потопление
-                if ship.lives == 0:
-                    # Уменьшаем количество живых кораблей
-                    self.live_ships -= 1
-                    # Отмечаем ореол вокруг потопленного корабля
-                    self.mark_oreol(ship, is_game=True)
-                    # Сообщаем о потоплении
-                    print('\n\tКорабль потоплен!')
-                    sleep(1)
-                    # У текущего игрока сохраняется право следующего хода
-                    return True
-                # Попал, но не потопил
-                else:
-                    # Сообщаем о попадании
-                    print('\n\tПопадание!')
-                    sleep(1)
-                    # У текущего игрока сохраняется право следующего хода
-                    return True
+        # Добавляем точку в множество уже стрелянных
+        self.locked_dots.add(dot)
+        self._locked_mask |= 1 << (dot.x * self.size + dot.y)
+        # Запоминаем точку для отмены хода
+        if self._frame is not None:
+            self._frame.append(dot)
+        # Находим корабль в клетке по индексу, без перебора кораблей
+        index = self._ship_at[dot.x * self.size + dot.y]
+        keys = self._zobrist_keys[dot.x * self.size + dot.y]
         # Нет попадания
+        if index is None:
+            # Помечаем точку на доске
+            self.table[dot.x][dot.y] = '•'
+            self.zobrist ^= keys[MISS]
+            # Сообщаем о промахе
+            self.report('\n\tМимо.')
+            # Право следующего хода переходит сопернику
+            return False
+        # Есть попадание: отнимаем жизнь у корабля
+        ship = self.ships[index]
+        ship.lives -= 1
         # Помечаем точку на доске
-        self.table[dot.x][dot.y] = '•'
-        # Сообщаем о промахе
-        print('\n\tМимо.')
-        sleep(1)
-        # Право следующего хода переходит сопернику
-        return False
+        self.table[dot.x][dot.y] = '×'
+        self.zobrist ^= keys[HIT]
+        # Если это потопление
+        if ship.lives == 0:
+            # Уменьшаем количество живых кораблей
+            self.live_ships -= 1
+            # Палубы корабля в хеше становятся палубами потопленного
+            for deck in ship.dots:
+                keys = self._zobrist_keys[deck.x * self.size + deck.y]
+                self.zobrist ^= keys[HIT] ^ keys[SUNK]
+            # Отмечаем ореол вокруг потопленного корабля
+            self.mark_oreol(ship, is_game=True)
+            # Сообщаем о потоплении
+            self.report('\n\tКорабль потоплен!')
+        # Попал, но не потопил
+        else:
+            # Сообщаем о попадании
+            self.report('\n\tПопадание!')
+        # У текущего игрока сохраняется право следующего хода
+        return True
 
     def get_ready(self) -> None:
         """
-        Обнуляет перед стартом игры список заблокированных точек,
-        который использовался во время генерации доски.
+        Обнуляет перед стартом игры множество заблокированных точек,
+        которое использовалось во время генерации доски.
         """
 
-        self.locked_dots = list()
+        self.locked_dots = set()
+        self._locked_mask = 0
 
     def is_loser(self) -> bool:
         """
@@ -397,235 +617,1746 @@ class Board():
 
         return self.live_ships == 0
 
+    def make_shot(self, dot: Dot) -> bool:
+        """
+        Делает выстрел, как shot, и записывает в журнал отмены точки,
+        которые он заблокировал, чтобы unmake_shot мог его отменить.
+        Журнал хранит только изменения, поэтому поиск может перебирать
+        гипотетические выстрелы без копирования доски.
+        """
 
-class Player():
-    """
-    Родительский класс для представления игроков.
-
-    Атрибуты
-    --------
-    own_board : Board
-        Собственная доска.
-    opponent_board: Board
-        Доска соперника.
-
-    Методы
-    --------
-    ask():
-        Спрашивает игрока, в какую клетку он делает выстрел.
-        Потомки должны реализовать этот метод.
-    move():
-        Делает ход в игре.
-        Вызывает метод ask() и делает выстрел по доске соперника,
-        если есть исключения, повторяет попытку сделать ход.
-        Возвращает True, если право следующего хода остаётся за текущим игроком
-        и False, если право следующего хода переходит сопернику.
-    """
+        zobrist = self.zobrist
+        self._frame = list()
+        try:
+            repeat = self.shot(dot)
+        finally:
+            frame, self._frame = self._frame, None
+        self._journal.append((zobrist, frame))
+        return repeat
 
-    def __init__(self, own_board: Board, opponent_board: Board) -> None:
+    def unmake_shot(self) -> None:
         """
-        Устанавливает все необходимые атрибуты для объекта Player.
-
-        Атрибуты
-        --------
-        own_board : Board
-            Собственная доска.
-        opponent_board: Board
-            Доска соперника.
+        Отменяет последний выстрел, сделанный через make_shot:
+        снимает блокировку с его точек, возвращает им прежние символы
+        и возвращает жизнь подбитому кораблю и прежний хеш.
         """
 
-        self.own_board = own_board
-        self.opponent_board = opponent_board
-
-    def ask(self):
+        self.zobrist, frame = self._journal.pop()
+        for dot in frame:
+            self.locked_dots.discard(dot)
+            self._locked_mask &= ~(1 << (dot.x * self.size + dot.y))
+            # До выстрела в клетке было море или целая палуба
+            index = self._ship_at[dot.x * self.size + dot.y]
+            self.table[dot.x][dot.y] = '○' if index is None else '■'
+        index = self._ship_at[frame[0].x * self.size + frame[0].y]
+        if index is not None:
+            ship = self.ships[index]
+            # Выстрел потопил корабль
+            if ship.lives == 0:
+                self.live_ships += 1
+            ship.lives += 1
+
+    def snapshot(self) -> tuple:
         """
-        Спрашивает игрока, в какую клетку он делает выстрел.
-        Потомки должны реализовать этот метод.
+        Возвращает неизменяемое состояние доски после расстановки:
+        (маска заблокированных точек, жизни кораблей, количество живых
+        кораблей, хеш Зобриста). Маска - целое число, поэтому снимок
+        не копирует locked_dots; точки и символы клеток восстанавливаются
+        по ней и по расстановке.
         """
 
-        raise NotImplementedError(f'Определите ask в {self.__class__.__name__}.')
+        return (self._locked_mask,
+                tuple(ship.lives for ship in self.ships),
+                self.live_ships, self.zobrist)
 
-    def move(self) -> bool:
+    def restore(self, state: tuple) -> None:
         """
-        Делает ход в игре.
-        Вызывает метод ask() и делает выстрел по доске соперника,
-        если есть исключения, повторяет попытку сделать ход.
-        Возвращает True, если право следующего хода остаётся за текущим игроком
-        и False, если право следующего хода переходит сопернику.
+        Восстанавливает состояние доски из snapshot() и очищает
+        журнал отмены.
         """
 
-        while True:
-            try:
-                return self.opponent_board.shot(self.ask())
-            except ValueError:
-                print('\n\tВнимательнее, вводите две цифры через пробел.\n')
-                sleep(1)
-            except BoardException as e:
-                print(e)
-                sleep(1)
+        locked_mask, lives, self.live_ships, self.zobrist = state
+        self.locked_dots = {Dot(cell // self.size, cell % self.size)
+                            for cell in range(self.size * self.size)
+                            if locked_mask >> cell & 1}
+        self._locked_mask = locked_mask
+        for ship, ship_lives in zip(self.ships, lives):
+            ship.lives = ship_lives
+        for x in range(self.size):
+            for y in range(self.size):
+                ship = self._ship_at[x * self.size + y] is not None
+                if locked_mask >> (x * self.size + y) & 1:
+                    self.table[x][y] = '×' if ship else '•'
+                else:
+                    self.table[x][y] = '■' if ship else '○'
+        self._journal = list()
 
 
-class AI(Player):
+# Наибольшее число конфигураций (размер доски, длина корабля),
+# для которых хранятся предвычисленные положения кораблей
+PLACEMENT_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def neighbour_masks(size: int) -> tuple[int, ...]:
+    """
+    Возвращает для каждой клетки доски размера size битовую маску
+    всех её соседей. Клетке с координатами x, y соответствует бит x * size + y.
+    Результат вычисляется при первом обращении и хранится в кэше.
     """
-    Класс для представления игрока-компьютера.
 
-    Наследуемые атрибуты
-    --------
-    own_board : Board
-        Собственная доска.
-    opponent_board: Board
-        Доска соперника.
+    masks = list()
+    for x in range(size):
+        for y in range(size):
+            mask = 0
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    nx, ny = x + dx, y + dy
+                    if (dx or dy) and 0 <= nx < size and 0 <= ny < size:
+                        mask |= 1 << (nx * size + ny)
+            masks.append(mask)
+    return tuple(masks)
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def ship_placements(size: int, length: int) -> tuple[tuple, ...]:
+    """
+    Возвращает все положения корабля длины length на доске размера size
+    в виде кортежей (нос, направление, маска клеток корабля,
+    маска корабля вместе с ореолом, номера клеток корабля, точки корабля).
+    Однопалубный корабль в обоих направлениях занимает одну и ту же клетку,
+    поэтому для него берётся только одно направление.
+    Результат вычисляется при первом обращении и хранится в кэше.
+    """
 
-    Наследуемые методы
-    --------
-    move():
-        Делает ход в игре.
-        Вызывает метод ask() и делает выстрел по доске соперника,
-        если есть исключения, повторяет попытку сделать ход.
-        Возвращает True, если право следующего хода остаётся за текущим игроком
-        и False, если право следующего хода переходит сопернику.
+    neighbours = neighbour_masks(size)
+    placements = list()
+    for direction in ((0,) if length == 1 else (0, 1)):
+        for x in range(size - (length - 1 if direction == 0 else 0)):
+            for y in range(size - (length - 1 if direction == 1 else 0)):
+                cells = tuple((x + i) * size + y if direction == 0
+                              else x * size + y + i for i in range(length))
+                mask = oreol = 0
+                for cell in cells:
+                    mask |= 1 << cell
+                    oreol |= neighbours[cell]
+                dots = tuple(Dot(cell // size, cell % size) for cell in cells)
+                placements.append((Dot(x, y), direction, mask,
+                                   oreol | mask, cells, dots))
+    return tuple(placements)
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def placement_lookup(size: int, length: int) -> dict:
+    """
+    Возвращает словарь {(x, y, направление): номер положения} для положений
+    из ship_placements(size, length). Однопалубный корабль находится
+    по любому из двух направлений.
+    """
 
-    Методы
-    --------
-    ask():
-        Спрашивает игрока, в какую клетку он делает выстрел.
-        Для AI это будет выбор случайной точки.
+    lookup = dict()
+    for index, (bow, direction, *_) in enumerate(ship_placements(size, length)):
+        lookup[(bow.x, bow.y, direction)] = index
+        if length == 1:
+            lookup[(bow.x, bow.y, 1)] = index
+    return lookup
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def placement_covering(size: int, length: int) -> tuple[tuple[int, ...], ...]:
+    """
+    Возвращает для каждой клетки доски номера тех положений
+    из ship_placements(size, length), которые занимают эту клетку.
     """
 
-    def ask(self) -> Dot:
-        """
-        Спрашивает игрока, в какую клетку он делает выстрел.
-        Для AI это будет выбор случайной точки.
-        """
+    covering = [[] for _ in range(size * size)]
+    for index, placement in enumerate(ship_placements(size, length)):
+        for cell in placement[4]:
+            covering[cell].append(index)
+    return tuple(tuple(indices) for indices in covering)
 
-        x, y = randint(1, BOARD_SIZE), randint(1, BOARD_SIZE)
-        print(f'x y = {x} {y}')
-        sleep(1)
-        return Dot(x - 1, y - 1)
 
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def placement_blockers(size: int, length: int) -> tuple[int, ...]:
+    """
+    Возвращает для каждой клетки доски битовую маску номеров тех положений
+    из ship_placements(size, length), которые занимают эту клетку.
+    """
 
-class User(Player):
+    return tuple(sum(1 << index for index in indices)
+                 for indices in placement_covering(size, length))
+
+
+# Наибольшее количество запомненных тупиковых состояний в проверке
+# fleet_feasibility для одной конфигурации
+FEASIBILITY_MEMO_SIZE = 1 << 18
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def board_blocks(size: int) -> tuple[tuple[int, ...], ...]:
+    """
+    Возвращает четыре разбиения доски размера size на квадраты 2 x 2
+    (со сдвигами 0 и 1 по каждой оси; у краёв квадраты обрезаются)
+    в виде битовых масок клеток каждого квадрата.
+    Корабли, не касающиеся друг друга, не могут заходить в один квадрат,
+    а корабль длины L заходит хотя бы в (L + 1) // 2 квадратов разбиения.
     """
-    Класс для представления игрока-пользователя.
 
-    Наследуемые атрибуты
-    --------
-    own_board : Board
-        Собственная доска.
-    opponent_board: Board
-        Доска соперника.
+    tilings = list()
+    for shift_x in (0, 1):
+        for shift_y in (0, 1):
+            blocks = list()
+            for left in range(-shift_x, size, 2):
+                for top in range(-shift_y, size, 2):
+                    mask = 0
+                    for x in range(max(left, 0), min(left + 2, size)):
+                        for y in range(max(top, 0), min(top + 2, size)):
+                            mask |= 1 << (x * size + y)
+                    blocks.append(mask)
+            tilings.append(tuple(blocks))
+    return tuple(tilings)
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def fleet_feasibility(size: int, fleet: tuple) -> tuple[bool, float]:
+    """
+    Проверяет, можно ли вообще расставить флот fleet (длины кораблей
+    в порядке убывания) на доске размера size.
+    Возвращает (можно ли расставить, плотность флота). Плотность - доля
+    доски, расширенной на одну клетку вправо и вниз, которую занимают
+    корабли с ореолом: там корабль длины L вместе с половиной ореола -
+    прямоугольник 2 x (L + 1), и прямоугольники разных кораблей не
+    пересекаются. Поэтому при плотности больше 1 флот заведомо
+    не помещается, а чем ближе она к 1, тем реже удаются расстановки.
+    Иначе выполняется точный перебор с возвратом: одинаковые корабли
+    ставятся по возрастанию номера положения, первый корабль - только
+    в одно положение из симметричных, тупиковые состояния запоминаются,
+    а ветви отсекаются по числу свободных клеток и квадратов board_blocks.
+    Результат хранится в кэше.
+    """
 
-    Наследуемые методы
-    --------
-    move():
-        Делает ход в игре.
-        Вызывает метод ask() и делает выстрел по доске соперника,
-        если есть исключения, повторяет попытку сделать ход.
-        Возвращает True, если право следующего хода остаётся за текущим игроком
-        и False, если право следующего хода переходит сопернику.
+    density = sum(2 * (length + 1) for length in fleet) / (size + 1) ** 2
+    if density > 1 or fleet[0] > size:
+        return False, density
+    placements = {length: [(mask, oreol)
+                           for _, _, mask, oreol, _, _ in ship_placements(size, length)]
+                  for length in set(fleet)}
+    # Для оставшихся после i-го кораблей: сумма длин, наименьшее число
+    # квадратов одного разбиения и суммарное по всем разбиениям
+    cells_left = [0] * (len(fleet) + 1)
+    blocks_left = [0] * (len(fleet) + 1)
+    halo_left = [0] * (len(fleet) + 1)
+    for i in range(len(fleet) - 1, -1, -1):
+        cells_left[i] = cells_left[i + 1] + fleet[i]
+        blocks_left[i] = blocks_left[i + 1] + (fleet[i] + 1) // 2
+        halo_left[i] = halo_left[i + 1] + 2 * (fleet[i] + 1)
+    # Первый корабль ставим только в положения, номер которых не больше
+    # номеров их образов при поворотах и отражениях доски
+    last = size - 1
+    transforms = (lambda x, y: (y, last - x), lambda x, y: (last - x, last - y),
+                  lambda x, y: (last - y, x), lambda x, y: (x, last - y),
+                  lambda x, y: (last - x, y), lambda x, y: (y, x),
+                  lambda x, y: (last - y, last - x))
+    numbers = {mask: number
+               for number, (mask, _) in enumerate(placements[fleet[0]])}
+    canonical = list()
+    for number, (mask, _) in enumerate(placements[fleet[0]]):
+        cells = [cell for cell in range(size * size) if mask >> cell & 1]
+        canonical.append(all(
+            number <= numbers[sum(1 << (nx * size + ny) for nx, ny in
+                                  (transform(cell // size, cell % size)
+                                   for cell in cells))]
+            for transform in transforms))
+    tilings = board_blocks(size)
+    full = size * size
+    failed = set()
+
+    def place(index: int, start: int, occupied: int) -> bool:
+        if index == len(fleet):
+            return True
+        # Отсечение: оставшимся кораблям не хватит свободных клеток
+        # или квадратов 2 x 2
+        if full - occupied.bit_count() < cells_left[index]:
+            return False
+        free_blocks = 0
+        for blocks in tilings:
+            free = sum(1 for block in blocks if block & ~occupied)
+            if free < blocks_left[index]:
+                return False
+            free_blocks += free
+        if free_blocks < halo_left[index]:
+            return False
+        key = (index, start, occupied)
+        if key in failed:
+            return False
+        length = fleet[index]
+        same = index + 1 < len(fleet) and fleet[index + 1] == length
+        for number, (mask, oreol) in enumerate(placements[length][start:], start):
+            if mask & occupied or (index == 0 and not canonical[number]):
+                continue
+            if place(index + 1, number + 1 if same else 0, occupied | oreol):
+                return True
+        if len(failed) < FEASIBILITY_MEMO_SIZE:
+            failed.add(key)
+        return False
 
-    Методы
-    --------
-    ask():
-        Спрашивает игрока, в какую клетку он делает выстрел.
+    return place(0, 0, 0), density
+
+
+# Состояния клетки в хеше Зобриста: промах или ореол, попадание,
+# палуба потопленного корабля (клетка, куда не стреляли, в хеш не входит)
+MISS, HIT, SUNK = 0, 1, 2
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def zobrist_keys(size: int) -> tuple[tuple[int, int, int], ...]:
+    """
+    Возвращает для каждой клетки доски размера size три случайных
+    64-битных ключа Зобриста: для промаха, попадания и палубы потопленного
+    корабля. Хеш состояния - XOR ключей всех отмеченных клеток, поэтому
+    выстрел меняет его за O(1). Ключи получаются из генератора с зерном
+    size, так что хеши совпадают во всех процессах.
     """
 
-    def ask(self) -> Dot:
-        """
-        Спрашивает игрока, в какую клетку он делает выстрел.
-        """
+    rng = Random(size)
+    return tuple(tuple(rng.getrandbits(64) for _ in (MISS, HIT, SUNK))
+                 for _ in range(size * size))
 
-        x, y = input('x y = ').strip().split()
-        if x and y:
-            return Dot(int(x) - 1, int(y) - 1)
-        else:
-            raise ValueError
 
+def clear_placement_cache() -> None:
+    """
+    Очищает кэши предвычисленных положений кораблей, масок соседей
+    и проверок расстановки флота.
+    """
 
-class Game():
+    for cached in (neighbour_masks, ship_placements, placement_lookup,
+                   placement_covering, placement_blockers, board_blocks,
+                   fleet_feasibility, zobrist_keys):
+        cached.cache_clear()
+
+
+def _random_bit(mask: int, rng: Random = DEFAULT_RNG) -> int:
     """
-    Класс для представления игры.
+    Вспомогательная функция.
+    Возвращает номер случайного установленного бита непустой маски mask.
+    """
+
+    for _ in range(rng.randint(0, mask.bit_count() - 1)):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+
+class BitBoard(Board):
+    """
+    Класс для представления игровой доски на битовых масках.
+    Альтернатива Board с той же логикой и теми же исключениями:
+    каждой клетке соответствует один бит целого числа, поэтому проверки
+    при расстановке кораблей, выстреле и отметке ореола не требуют
+    перебора списков точек.
 
     Атрибуты
     --------
-    user : User
-        Игрок-пользователь.
-    user_board : Board
-        Доска пользователя.
-    ai : AI
-        Игрок-компьютер, объект класса Ai .
-    ai_board : Board
-        Доска компьютера.
+    _is_hidden : bool
+        Информация о том, нужно ли скрывать
+        корабли на доске (для вывода доски соперника),
+        или нет (для своей доски).
+    size : int
+        Размер доски.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    ships : list
+        Список кораблей доски.
+    live_ships : int
+        Количество живых кораблей на доске.
+    _ships_mask : int
+        Битовая маска клеток, занятых кораблями.
+    _locked_mask : int
+        Битовая маска заблокированных клеток (аналог Board.locked_dots).
+    _hits_mask : int
+        Битовая маска клеток, где было попадание.
+    _misses_mask : int
+        Битовая маска клеток, отмеченных промахом или ореолом.
+    _ship_at : list
+        Для каждой клетки индекс корабля в списке ships или None.
+    zobrist : int
+        64-битный хеш Зобриста видимого сопернику состояния доски.
+    _zobrist_keys : tuple
+        Ключи Зобриста клеток доски (zobrist_keys(size)).
+    _journal : list
+        Журнал отмены: для каждого хода make_shot маски, количество
+        живых кораблей и хеш до хода и номер клетки выстрела.
 
     Методы
     --------
-    make_board():
-        Возвращает готовую к игре доску с расставленными кораблями.
-    @staticmethod
-    random_board():
-        Вспомогательная функция.
-        Пытается сгенерировать случайную расстановку кораблей на пустой доске.
-        В случае успеха возвращает объект Board, в ином случае None.
-    @staticmethod
-    greet():
-        Приветствует в консоли пользователя и рассказывает о формате ввода.
-    show_boards():
-        Выводит на экран доски обоих игроков.
-    loop():
-        Игровой цикл.
-        Поочерёдно для каждого игрока вызывается метод move() и
-        выполняется проверка проигрыша доски соперника.
-    start():
-        Запуск игры. Сначала вызывается приветствие, затем игровой цикл.
+    @property
+    table():
+        Состояния клеток построчно (кортежи, только для чтения),
+        собранные из битовых масок.
+    @property
+    locked_dots():
+        Множество заблокированных точек, собранное из битовой маски.
+    add_ship(Ship):
+        Ставит корабль на доску (если не получается, выбрасывает исключение).
+    mark_oreol(Ship, is_game=True):
+        Формирует ореол корабля, т.е. помечает точки вокруг,
+        где другого корабля по правилам быть не может.
+    shot(Dot):
+        Делает выстрел по доске.
+        Если есть попытка выстрелить за пределы доски или
+        в использованную точку, то выбрасывает исключения.
+        Возвращает True, если право следующего хода остаётся за текущим игроком
+        и False, если право следующего хода переходит сопернику.
+    get_ready():
+        Обнуляет перед стартом игры маску заблокированных клеток,
+        которая использовалась во время генерации доски.
+    make_shot(Dot):
+        Делает выстрел, который можно отменить через unmake_shot.
+    unmake_shot():
+        Отменяет последний выстрел, сделанный через make_shot.
+    snapshot():
+        Возвращает неизменяемое состояние доски после расстановки.
+    restore(tuple):
+        Восстанавливает состояние доски из snapshot().
+
+    Наследуемые методы
+    --------
+    is_loser():
+        Проверяет состояние проигрыша.
     """
 
-    def __init__(self) -> None:
+    # Перевод кода клетки (1 - попадание, 2 - палуба, 4 - промах или ореол)
+    # сначала в байт, а затем в символ доски
+    _CODES = bytes.maketrans(bytes(range(8)), b'oxsxmxxx')
+    _SYMBOLS = (('o', '○'), ('x', '×'), ('s', '■'), ('m', '•'))
+
+    def __init__(self,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES) -> None:
         """
-        Устанавливает все необходимые атрибуты для объекта Game.
+        Устанавливает все необходимые атрибуты для объекта BitBoard.
 
         Атрибуты
         --------
-        user : User
-            Игрок-пользователь.
-        user_board : Board
-            Доска пользователя.
-        ai : AI
-            Игрок-компьютер, объект класса Ai .
-        ai_board : Board
+        size : int
+            Размер доски.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        ships : list
+            Список кораблей доски.
+        live_ships : int
+            Количество живых кораблей на доске.
+        _ships_mask : int
+            Битовая маска клеток, занятых кораблями.
+        _locked_mask : int
+            Битовая маска заблокированных клеток.
+        _hits_mask : int
+            Битовая маска клеток, где было попадание.
+        _misses_mask : int
+            Битовая маска клеток, отмеченных промахом или ореолом.
+        _ship_at : list
+            Для каждой клетки индекс корабля в списке ships или None.
+        zobrist : int
+            64-битный хеш Зобриста видимого сопернику состояния доски.
+        _zobrist_keys : tuple
+            Ключи Зобриста клеток доски (zobrist_keys(size)).
+        _journal : list
+            Журнал отмены: для каждого хода make_shot маски, количество
+            живых кораблей и хеш до хода и номер клетки выстрела.
+        """
+
+        Dot.intern(size)
+        self.size = size
+        self.ships_types = list(ships_types)
+        self.ships = list()
+        self.live_ships = len(self.ships_types)
+        self._ships_mask = 0
+        self._locked_mask = 0
+        self._hits_mask = 0
+        self._misses_mask = 0
+        self._ship_at = [None] * (size * size)
+        self.zobrist = 0
+        self._zobrist_keys = zobrist_keys(size)
+        self._journal = list()
+
+    def _cells(self) -> str:
+        """
+        Вспомогательный метод.
+        Возвращает строку символов всех клеток в порядке их номеров.
+        Маски раскладываются на байты по одному на клетку и объединяются
+        целиком, без цикла по клеткам на Python.
+        """
+
+        cells = self.size * self.size
+        code = 0
+        for mask, weight in ((self._hits_mask, b'\x01'),
+                             (self._ships_mask, b'\x02'),
+                             (self._misses_mask, b'\x04')):
+            bits = format(mask, f'0{cells}b')[::-1].encode()
+            code |= int.from_bytes(bits.translate(
+                bytes.maketrans(b'01', b'\x00' + weight)), 'big')
+        symbols = code.to_bytes(cells, 'big').translate(BitBoard._CODES).decode()
+        for code_symbol, symbol in BitBoard._SYMBOLS:
+            symbols = symbols.replace(code_symbol, symbol)
+        return symbols
+
+    @property
+    def table(self) -> tuple[tuple[str, ...], ...]:
+        """
+        Состояния клеток построчно, собранные из битовых масок.
+        Только для чтения: это кортежи, а не хранилище доски, поэтому
+        изменить клетку через table[x][y] нельзя (в отличие от Board).
+        """
+
+        cells = self._cells()
+        return tuple(tuple(cells[x:x + self.size])
+                     for x in range(0, self.size * self.size, self.size))
+
+    def _rows(self) -> list:
+        """
+        Вспомогательный метод.
+        Возвращает символы клеток доски построчно.
+        """
+
+        cells = self._cells()
+        return [cells[y::self.size] for y in range(self.size)]
+
+    @property
+    def locked_dots(self) -> set[Dot]:
+        """
+        Множество заблокированных точек, собранное из битовой маски.
+        """
+
+        return {Dot(i // self.size, i % self.size)
+                for i in range(self.size * self.size)
+                if self._locked_mask >> i & 1}
+
+    def add_ship(self, ship: Ship) -> None:
+        """
+        Ставит корабль на доску (если не получается, выбрасывает исключение).
+        """
+
+        # Корабль, не помещающийся на доске, отсутствует в индексе положений
+        placement = self._placement(ship)
+        if placement is None:
+            raise BoardWrongShipException()
+        _, _, mask, _, cells, _ = placement
+        # Проверяем, не заняты ли клетки кораблями или их ореолами
+        if mask & self._locked_mask:
+            raise BoardWrongShipException()
+        # Устанавливаем на доску корабль
+        index = len(self.ships)
+        for cell in cells:
+            self._ship_at[cell] = index
+        self._ships_mask |= mask
+        self._locked_mask |= mask
+        # Добавляем корабль в список кораблей доски
+        self.ships.append(ship)
+        # Отмечаем ореол корабля
+        self.mark_oreol(ship)
+
+    def _placement(self, ship: Ship) -> tuple:
+        """
+        Вспомогательный метод.
+        Возвращает положение корабля из ship_placements или None,
+        если корабль не помещается на доске.
+        """
+
+        index = placement_lookup(self.size, ship.length).get(
+            (ship.bow.x, ship.bow.y, ship.direction))
+        if index is None:
+            return None
+        return ship_placements(self.size, ship.length)[index]
+
+    def mark_oreol(self, ship: Ship, is_game: bool = False) -> None:
+        """
+        Формирует ореол корабля, т.е. помечает точки вокруг,
+        где другого корабля по правилам быть не может.
+        """
+
+        # Клетки самого корабля к этому моменту уже помечены
+        oreol = self._placement(ship)[3]
+        # Оставляем только соседей, не помеченных ранее
+        oreol &= ~self._locked_mask
+        self._locked_mask |= oreol
+        # Если идёт игра, отмечаем ореол на доске
+        if is_game:
+            self._misses_mask |= oreol
+            while oreol:
+                low = oreol & -oreol
+                self.zobrist ^= self._zobrist_keys[low.bit_length() - 1][MISS]
+                oreol ^= low
+
+    def shot(self, dot: Dot) -> bool:
+        """
+        Делает выстрел по доске.
+        Если есть попытка выстрелить за пределы доски или
+        в использованную точку, то выбрасывает исключения.
+        Возвращает True, если право следующего хода остаётся за текущим игроком
+        и False, если право следующего хода переходит сопернику.
+        """
+
+        # Если выстрел за пределы доски
+        if self.out(dot):
+            raise BoardOutException
+        cell = dot.x * self.size + dot.y
+        bit = 1 << cell
+        # Если выстрел в уже стрелянную точку
+        if self._locked_mask & bit:
+            raise BoardUsedException
+        # Добавляем точку в маску уже стрелянных
+        self._locked_mask |= bit
+        index = self._ship_at[cell]
+        # Нет попадания
+        if index is None:
+            self._misses_mask |= bit
+            self.zobrist ^= self._zobrist_keys[cell][MISS]
+            self.report('\n\tМимо.')
+            return False
+        # Есть попадание: отнимаем жизнь у корабля
+        ship = self.ships[index]
+        ship.lives -= 1
+        self._hits_mask |= bit
+        self.zobrist ^= self._zobrist_keys[cell][HIT]
+        # Если это потопление
+        if ship.lives == 0:
+            self.live_ships -= 1
+            # Палубы корабля в хеше становятся палубами потопленного
+            for deck in self._placement(ship)[4]:
+                keys = self._zobrist_keys[deck]
+                self.zobrist ^= keys[HIT] ^ keys[SUNK]
+            self.mark_oreol(ship, is_game=True)
+            self.report('\n\tКорабль потоплен!')
+        else:
+            self.report('\n\tПопадание!')
+        # У текущего игрока сохраняется право следующего хода
+        return True
+
+    def get_ready(self) -> None:
+        """
+        Обнуляет перед стартом игры маску заблокированных клеток,
+        которая использовалась во время генерации доски.
+        """
+
+        self._locked_mask = 0
+
+    def make_shot(self, dot: Dot) -> bool:
+        """
+        Делает выстрел, как shot, и записывает в журнал отмены маски
+        до выстрела: маски - неизменяемые целые числа, поэтому запись
+        не копирует доску.
+        """
+
+        state = (self._locked_mask, self._hits_mask, self._misses_mask,
+                 self.live_ships, self.zobrist)
+        repeat = self.shot(dot)
+        self._journal.append((*state, dot.x * self.size + dot.y))
+        return repeat
+
+    def unmake_shot(self) -> None:
+        """
+        Отменяет последний выстрел, сделанный через make_shot:
+        возвращает маски, количество живых кораблей и хеш к состоянию
+        до выстрела и жизнь подбитому кораблю.
+        """
+
+        (self._locked_mask, self._hits_mask, self._misses_mask,
+         self.live_ships, self.zobrist, cell) = self._journal.pop()
+        index = self._ship_at[cell]
+        if index is not None:
+            self.ships[index].lives += 1
+
+    def snapshot(self) -> tuple:
+        """
+        Возвращает неизменяемое состояние доски после расстановки:
+        (маски заблокированных клеток, попаданий и промахов,
+        жизни кораблей, количество живых кораблей, хеш Зобриста).
+        """
+
+        return (self._locked_mask, self._hits_mask, self._misses_mask,
+                tuple(ship.lives for ship in self.ships), self.live_ships,
+                self.zobrist)
+
+    def restore(self, state: tuple) -> None:
+        """
+        Восстанавливает состояние доски из snapshot() и очищает
+        журнал отмены.
+        """
+
+        (self._locked_mask, self._hits_mask, self._misses_mask,
+         lives, self.live_ships, self.zobrist) = state
+        for ship, ship_lives in zip(self.ships, lives):
+            ship.lives = ship_lives
+        self._journal = list()
+
+
+# Количество ячеек общей таблицы транспозиций
+TRANSPOSITION_SIZE = 1 << 16
+
+
+class TranspositionTable():
+    """
+    Класс для представления таблицы транспозиций: хранилища ограниченного
+    размера для результатов вычислений по 64-битному ключу (например,
+    хешу Зобриста доски). Ключ попадает в ячейку key % size. Если ячейка
+    занята другим ключом, новая запись вытесняет старую, только когда
+    старая осталась от прошлого поколения или стоила не дороже новой:
+    дорогие результаты живут дольше.
+
+    Атрибуты
+    --------
+    size : int
+        Количество ячеек.
+    slots : list
+        Ячейки: (ключ, значение, стоимость, поколение) или None.
+    generation : int
+        Номер текущего поколения.
+    hits : int
+        Количество найденных записей.
+    misses : int
+        Количество ненайденных записей.
+    stores : int
+        Количество сохранённых записей.
+    replacements : int
+        Количество записей, вытеснивших чужую запись.
+    rejected : int
+        Количество записей, не вытеснивших более дорогую запись.
+
+    Методы
+    --------
+    get(int, default=None):
+        Возвращает значение по ключу или default.
+    put(int, object, cost=1):
+        Сохраняет значение по ключу.
+    new_generation():
+        Начинает новое поколение: старые записи можно вытеснять всегда.
+    clear():
+        Очищает таблицу и счётчики.
+    stats():
+        Возвращает счётчики и заполненность таблицы.
+    """
+
+    def __init__(self, size: int = TRANSPOSITION_SIZE) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта TranspositionTable.
+
+        Атрибуты
+        --------
+        size : int
+            Количество ячеек.
+        slots : list
+            Ячейки: (ключ, значение, стоимость, поколение) или None.
+        generation : int
+            Номер текущего поколения.
+        hits : int
+            Количество найденных записей.
+        misses : int
+            Количество ненайденных записей.
+        stores : int
+            Количество сохранённых записей.
+        replacements : int
+            Количество записей, вытеснивших чужую запись.
+        rejected : int
+            Количество записей, не вытеснивших более дорогую запись.
+        """
+
+        if size < 1:
+            raise ValueError('Параметр size должен быть больше нуля.')
+        self.size = size
+        self.clear()
+
+    def get(self, key: int, default=None):
+        """
+        Возвращает значение по ключу или default, если его нет в таблице.
+        """
+
+        slot = self.slots[key % self.size]
+        if slot is not None and slot[0] == key:
+            self.hits += 1
+            return slot[1]
+        self.misses += 1
+        return default
+
+    def put(self, key: int, value, cost: int = 1) -> None:
+        """
+        Сохраняет значение по ключу. cost - стоимость вычисления значения
+        (например, количество перебранных расстановок).
+        """
+
+        index = key % self.size
+        slot = self.slots[index]
+        if slot is not None and slot[0] != key:
+            if slot[3] == self.generation and slot[2] > cost:
+                self.rejected += 1
+                return
+            self.replacements += 1
+        self.slots[index] = (key, value, cost, self.generation)
+        self.stores += 1
+
+    def new_generation(self) -> None:
+        """
+        Начинает новое поколение (например, новую партию): записи прошлых
+        поколений остаются доступны, но вытесняются независимо от стоимости.
+        """
+
+        self.generation += 1
+
+    def clear(self) -> None:
+        """
+        Очищает таблицу и счётчики.
+        """
+
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+        self.rejected = 0
+
+    def stats(self) -> dict:
+        """
+        Возвращает счётчики, долю найденных записей и заполненность таблицы.
+        """
+
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'stores': self.stores,
+                'replacements': self.replacements,
+                'rejected': self.rejected,
+                'filled': sum(slot is not None for slot in self.slots) / self.size}
+
+
+# Общая таблица транспозиций процесса: результаты, сохранённые одним
+# игроком, доступны другим игрокам и в следующих партиях
+TRANSPOSITIONS = TranspositionTable()
+
+
+class Player():
+    """
+    Родительский класс для представления игроков.
+
+    Атрибуты
+    --------
+    _is_verbose : bool
+        Информация о том, нужно ли выводить в консоль ход и ошибки
+        игрока (для обычной игры), или нет (для игры без ввода-вывода).
+    own_board : Board
+        Собственная доска.
+    opponent_board: Board
+        Доска соперника.
+    last_shot : Dot
+        Точка последнего удачного (без исключений) выстрела игрока.
+    rng : Random
+        Генератор случайных чисел игрока.
+
+    Методы
+    --------
+    @property
+    def is_verbose():
+        Геттер для параметра _is_verbose
+    @is_verbose.setter
+    def is_verbose():
+        Сеттер для параметра _is_verbose
+    report(str):
+        Выводит сообщение игрока, если включён параметр _is_verbose.
+    ask():
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Потомки должны реализовать этот метод.
+    move():
+        Делает ход в игре.
+        Вызывает метод ask() и делает выстрел по доске соперника,
+        если есть исключения, повторяет попытку сделать ход.
+        Возвращает True, если право следующего хода остаётся за текущим игроком
+        и False, если право следующего хода переходит сопернику.
+    async ask_async():
+        Асинхронный вариант ask() для игры по сети.
+        По умолчанию сразу возвращает результат ask(). Потомки, которые
+        ждут ход извне, переопределяют этот метод.
+    async move_async():
+        Асинхронный вариант move(): ожидает ask_async() и не блокирует
+        другие партии в том же цикле событий.
+    """
+
+    _is_verbose: bool = True
+
+    def __init__(self,
+                 own_board: Board,
+                 opponent_board: Board,
+                 rng: Random = DEFAULT_RNG) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта Player.
+
+        Атрибуты
+        --------
+        own_board : Board
+            Собственная доска.
+        opponent_board: Board
+            Доска соперника.
+        last_shot : Dot
+            Точка последнего удачного (без исключений) выстрела игрока.
+        rng : Random
+            Генератор случайных чисел игрока.
+        """
+
+        self.own_board = own_board
+        self.opponent_board = opponent_board
+        self.last_shot = None
+        self.rng = rng
+
+    @property
+    def is_verbose(self) -> bool:
+        """
+        Геттер для параметра _is_verbose
+        """
+
+        return self._is_verbose
+
+    @is_verbose.setter
+    def is_verbose(self, value: bool) -> None:
+        """
+        Сеттер для параметра _is_verbose
+        """
+
+        if isinstance(value, bool):
+            self._is_verbose = value
+        else:
+            raise ValueError('Параметр is_verbose должен быть True или False.')
+
+    def report(self, message: str) -> None:
+        """
+        Выводит сообщение игрока, если включён параметр _is_verbose.
+        """
+
+        if self._is_verbose:
+            print(message)
+            sleep(1)
+
+    def ask(self):
+        """
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Потомки должны реализовать этот метод.
+        """
+
+        raise NotImplementedError(f'Определите ask в {self.__class__.__name__}.')
+
+    def move(self) -> bool:
+        """
+        Делает ход в игре.
+        Вызывает метод ask() и делает выстрел по доске соперника,
+        если есть исключения, повторяет попытку сделать ход.
+        Возвращает True, если право следующего хода остаётся за текущим игроком
+        и False, если право следующего хода переходит сопернику.
+        """
+
+        while True:
+            try:
+                dot = self.ask()
+                repeat = self.opponent_board.shot(dot)
+                self.last_shot = dot
+                return repeat
+            except ValueError:
+                self.report('\n\tВнимательнее, вводите две цифры через пробел.\n')
+            except BoardException as e:
+                self.report(str(e))
+
+    async def ask_async(self) -> Dot:
+        """
+        Асинхронный вариант ask() для игры по сети.
+        По умолчанию сразу возвращает результат ask(). Потомки, которые
+        ждут ход извне, переопределяют этот метод.
+        """
+
+        return self.ask()
+
+    async def move_async(self) -> bool:
+        """
+        Асинхронный вариант move(): ожидает ask_async() и не блокирует
+        другие партии в том же цикле событий.
+        Возвращает True, если право следующего хода остаётся за текущим игроком
+        и False, если право следующего хода переходит сопернику.
+        """
+
+        while True:
+            try:
+                dot = await self.ask_async()
+                repeat = self.opponent_board.shot(dot)
+                self.last_shot = dot
+                return repeat
+            except ValueError:
+                self.report('\n\tВнимательнее, вводите две цифры через пробел.\n')
+            except BoardException as e:
+                self.report(str(e))
+
+
+class AI(Player):
+    """
+    Класс для представления игрока-компьютера.
+
+    Наследуемые атрибуты
+    --------
+    own_board : Board
+        Собственная доска.
+    opponent_board: Board
+        Доска соперника.
+    rng : Random
+        Генератор случайных чисел игрока.
+
+    Наследуемые методы
+    --------
+    move():
+        Делает ход в игре.
+        Вызывает метод ask() и делает выстрел по доске соперника,
+        если есть исключения, повторяет попытку сделать ход.
+        Возвращает True, если право следующего хода остаётся за текущим игроком
+        и False, если право следующего хода переходит сопернику.
+
+    Методы
+    --------
+    ask():
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Для AI это будет выбор случайной точки.
+    """
+
+    def ask(self) -> Dot:
+        """
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Для AI это будет выбор случайной точки.
+        """
+
+        size = self.opponent_board.size
+        x, y = self.rng.randint(1, size), self.rng.randint(1, size)
+        self.report(f'x y = {x} {y}')
+        return Dot(x - 1, y - 1)
+
+
+class DensityAI(AI):
+    """
+    Класс для представления игрока-компьютера, стреляющего по карте
+    плотности вероятности.
+    Для каждой клетки хранится, сколько ещё возможных положений оставшихся
+    кораблей её накрывает. В режиме поиска выбирается клетка с наибольшим
+    значением, в режиме добивания - клетка рядом с подбитыми палубами.
+    После выстрела пересчитываются только положения, задетые этим выстрелом.
+
+    Наследуемые атрибуты
+    --------
+    own_board : Board
+        Собственная доска.
+    opponent_board: Board
+        Доска соперника.
+    last_shot : Dot
+        Точка последнего удачного (без исключений) выстрела игрока.
+    rng : Random
+        Генератор случайных чисел игрока.
+
+    Атрибуты
+    --------
+    size : int
+        Размер доски соперника.
+    fleet : dict
+        Количество ещё не потопленных кораблей каждой длины.
+    placements : dict
+        Для каждой длины положения корабля из ship_placements.
+    covering : dict
+        Для каждой длины и каждой клетки список номеров накрывающих её положений.
+    alive : dict
+        Для каждой длины массив флагов: возможно ли ещё положение.
+    counts : dict
+        Для каждой длины и каждой клетки число возможных положений,
+        накрывающих клетку.
+    heat : list
+        Карта плотности: для каждой клетки сумма counts по всем длинам
+        с учётом количества кораблей в fleet.
+    available : bytearray
+        Для каждой клетки флаг: можно ли ещё в неё стрелять.
+    hits : set
+        Клетки подбитых, но ещё не потопленных кораблей.
+
+    Методы
+    --------
+    ask():
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Для DensityAI это клетка с наибольшей плотностью.
+    move():
+        Делает ход в игре и учитывает его результат в карте плотности.
+    async move_async():
+        Асинхронный вариант move() с учётом результата в карте плотности.
+    observe(Dot, bool, bool):
+        Учитывает результат выстрела: промах, попадание или потопление.
+    """
+
+    def __init__(self,
+                 own_board: Board,
+                 opponent_board: Board,
+                 rng: Random = DEFAULT_RNG) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта DensityAI.
+
+        Атрибуты
+        --------
+        size : int
+            Размер доски соперника.
+        fleet : dict
+            Количество ещё не потопленных кораблей каждой длины.
+        placements : dict
+            Для каждой длины положения корабля из ship_placements.
+        covering : dict
+            Для каждой длины и каждой клетки список номеров
+            накрывающих её положений.
+        alive : dict
+            Для каждой длины массив флагов: возможно ли ещё положение.
+        counts : dict
+            Для каждой длины и каждой клетки число возможных положений,
+            накрывающих клетку.
+        heat : list
+            Карта плотности: для каждой клетки сумма counts по всем длинам
+            с учётом количества кораблей в fleet.
+        available : bytearray
+            Для каждой клетки флаг: можно ли ещё в неё стрелять.
+        hits : set
+            Клетки подбитых, но ещё не потопленных кораблей.
+        """
+
+        super().__init__(own_board, opponent_board, rng)
+        self.size = opponent_board.size
+        cells = self.size * self.size
+        self.fleet = dict()
+        for length in opponent_board.ships_types:
+            self.fleet[length] = self.fleet.get(length, 0) + 1
+        self.placements = dict()
+        self.covering = dict()
+        self.alive = dict()
+        self.counts = dict()
+        self.heat = [0] * cells
+        for length, number in self.fleet.items():
+            placements = ship_placements(self.size, length)
+            covering = placement_covering(self.size, length)
+            counts = [len(indices) for indices in covering]
+            for cell, count in enumerate(counts):
+                self.heat[cell] += number * count
+            self.placements[length] = placements
+            self.covering[length] = covering
+            self.alive[length] = bytearray(b'\x01') * len(placements)
+            self.counts[length] = counts
+        self.available = bytearray(b'\x01') * cells
+        self.hits = set()
+
+    def ask(self) -> Dot:
+        """
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Для DensityAI это клетка с наибольшей плотностью.
+        """
+
+        scores = self.heat
+        # Режим добивания: считаем только положения через подбитые палубы
+        if self.hits:
+            scores = [0] * len(self.heat)
+            for length, number in self.fleet.items():
+                if not number:
+                    continue
+                alive = self.alive[length]
+                placements = self.placements[length]
+                seen = set()
+                for hit in self.hits:
+                    for index in self.covering[length][hit]:
+                        if alive[index] and index not in seen:
+                            seen.add(index)
+                            ship_cells = placements[index][4]
+                            weight = number * sum(1 for cell in ship_cells
+                                                  if cell in self.hits) ** 2
+                            for cell in ship_cells:
+                                scores[cell] += weight
+        # Выбираем среди доступных клеток случайную с наибольшим значением
+        best, candidates = 0, list()
+        for cell, score in enumerate(scores):
+            if not self.available[cell]:
+                continue
+            if score > best:
+                best, candidates = score, [cell]
+            elif score == best and best:
+                candidates.append(cell)
+        if not candidates:
+            candidates = [cell for cell, free in enumerate(self.available) if free]
+        cell = candidates[self.rng.randint(0, len(candidates) - 1)]
+        x, y = cell // self.size, cell % self.size
+        self.report(f'x y = {x + 1} {y + 1}')
+        return Dot(x, y)
+
+    def move(self) -> bool:
+        """
+        Делает ход в игре и учитывает его результат в карте плотности.
+        Возвращает True, если право следующего хода остаётся за текущим игроком
+        и False, если право следующего хода переходит сопернику.
+        """
+
+        live_ships = self.opponent_board.live_ships
+        repeat = super().move()
+        self.observe(self.last_shot, repeat,
+                     self.opponent_board.live_ships < live_ships)
+        return repeat
+
+    async def move_async(self) -> bool:
+        """
+        Асинхронный вариант move() с учётом результата в карте плотности.
+        """
+
+        live_ships = self.opponent_board.live_ships
+        repeat = await super().move_async()
+        self.observe(self.last_shot, repeat,
+                     self.opponent_board.live_ships < live_ships)
+        return repeat
+
+    def _exclude(self, cell: int) -> None:
+        """
+        Вспомогательный метод.
+        Отмечает клетку как заведомо пустую: убирает все положения,
+        накрывающие её, и вычитает их из карты плотности.
+        """
+
+        for length, covering in self.covering.items():
+            alive = self.alive[length]
+            counts = self.counts[length]
+            number = self.fleet[length]
+            for index in covering[cell]:
+                if alive[index]:
+                    alive[index] = 0
+                    for ship_cell in self.placements[length][index][4]:
+                        counts[ship_cell] -= 1
+                        self.heat[ship_cell] -= number
+
+    def observe(self, dot: Dot, is_hit: bool, is_sunk: bool) -> None:
+        """
+        Учитывает результат выстрела: промах, попадание или потопление.
+        """
+
+        size = self.size
+        cell = dot.x * size + dot.y
+        self.available[cell] = 0
+        if not is_hit:
+            self._exclude(cell)
+            return
+        self.hits.add(cell)
+        # По диагонали от палубы кораблей быть не может
+        for dx, dy in ((-1, -1), (-1, 1), (1, -1), (1, 1)):
+            x, y = dot.x + dx, dot.y + dy
+            if 0 <= x < size and 0 <= y < size:
+                self._exclude(x * size + y)
+        if not is_sunk:
+            return
+        # Потопленный корабль - связная линия подбитых палуб через cell
+        ship_cells = {cell}
+        frontier = [cell]
+        while frontier:
+            current = frontier.pop()
+            x, y = current // size, current % size
+            for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                neighbour = nx * size + ny
+                if 0 <= nx < size and 0 <= ny < size and \
+                   neighbour in self.hits and neighbour not in ship_cells:
+                    ship_cells.add(neighbour)
+                    frontier.append(neighbour)
+        self.hits -= ship_cells
+        # Одним кораблём этой длины меньше
+        length = len(ship_cells)
+        if self.fleet.get(length):
+            self.fleet[length] -= 1
+            for i, count in enumerate(self.counts[length]):
+                self.heat[i] -= count
+        # Палубы и ореол потопленного корабля заведомо не содержат других
+        oreol = set()
+        for ship_cell in ship_cells:
+            x, y = ship_cell // size, ship_cell % size
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < size and 0 <= ny < size:
+                        oreol.add(nx * size + ny)
+        for oreol_cell in oreol:
+            self.available[oreol_cell] = 0
+            self._exclude(oreol_cell)
+
+
+class User(Player):
+    """
+    Класс для представления игрока-пользователя.
+
+    Наследуемые атрибуты
+    --------
+    own_board : Board
+        Собственная доска.
+    opponent_board: Board
+        Доска соперника.
+
+    Наследуемые методы
+    --------
+    move():
+        Делает ход в игре.
+        Вызывает метод ask() и делает выстрел по доске соперника,
+        если есть исключения, повторяет попытку сделать ход.
+        Возвращает True, если право следующего хода остаётся за текущим игроком
+        и False, если право следующего хода переходит сопернику.
+
+    Методы
+    --------
+    ask():
+        Спрашивает игрока, в какую клетку он делает выстрел.
+    """
+
+    def ask(self) -> Dot:
+        """
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        """
+
+        x, y = input('x y = ').strip().split()
+        if x and y:
+            return Dot(int(x) - 1, int(y) - 1)
+        else:
+            raise ValueError
+
+
+class TerminalRenderer():
+    """
+    Класс для инкрементального вывода кадра (списка строк) в терминал.
+    Первый кадр выводится целиком с очисткой экрана, а каждый следующий -
+    только изменившимися участками строк с адресацией курсора ANSI.
+    Кадр собирается в одну строку и выводится одной записью в поток.
+    Под кадром находится область сообщений (приглашения и результаты
+    выстрелов), которая очищается при выводе каждого кадра.
+    Если кадр не помещается в терминал, он выводится целиком без
+    управляющих последовательностей, как в обычном терминале.
+
+    Атрибуты
+    --------
+    stream : TextIO
+        Поток вывода.
+    lines : list
+        Строки последнего выведенного кадра или None.
+    terminal_size : tuple
+        Размер терминала (столбцы, строки) при выводе последнего кадра.
+    written : int
+        Количество символов, выведенных всеми кадрами.
+
+    Методы
+    --------
+    @staticmethod
+    supported(stream=None):
+        Проверяет, поддерживает ли терминал адресацию курсора ANSI.
+    columns():
+        Возвращает ширину терминала.
+    fits(list):
+        Проверяет, помещается ли кадр в терминал вместе с областью сообщений.
+    diff(list):
+        Возвращает управляющие последовательности, которые превращают
+        последний выведенный кадр в новый.
+    draw(list, message=''):
+        Выводит кадр и сообщение под ним.
+    reset():
+        Забывает последний кадр: следующий будет выведен целиком.
+    """
+
+    # Сколько строк под кадром оставлять для сообщений
+    MESSAGE_ROWS = 6
+    # Сколько совпадающих символов можно перезаписать вместо
+    # перемещения курсора (перемещение стоит около 8 символов)
+    GAP = 6
+
+    def __init__(self, stream=None) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта TerminalRenderer.
+
+        Атрибуты
+        --------
+        stream : TextIO
+            Поток вывода (по умолчанию sys.stdout).
+        lines : list
+            Строки последнего выведенного кадра или None.
+        terminal_size : tuple
+            Размер терминала (столбцы, строки) при выводе последнего кадра.
+        written : int
+            Количество символов, выведенных всеми кадрами.
+        """
+
+        self.stream = stream if stream is not None else sys.stdout
+        self.lines = None
+        self.terminal_size = None
+        self.written = 0
+
+    @staticmethod
+    def supported(stream=None) -> bool:
+        """
+        Проверяет, поддерживает ли терминал адресацию курсора ANSI:
+        поток должен быть терминалом, а переменная TERM - задана
+        и не равна dumb.
+        """
+
+        stream = stream if stream is not None else sys.stdout
+        return stream.isatty() and os.environ.get('TERM', 'dumb') != 'dumb'
+
+    def columns(self) -> int:
+        """
+        Возвращает ширину терминала.
+        """
+
+        return shutil.get_terminal_size().columns
+
+    def fits(self, lines: list) -> bool:
+        """
+        Проверяет, помещается ли кадр в терминал вместе с областью сообщений:
+        иначе терминал прокрутит экран и адресация курсора собьётся.
+        """
+
+        columns, rows = shutil.get_terminal_size()
+        return (len(lines) + self.MESSAGE_ROWS <= rows
+                and max(map(len, lines), default=0) <= columns)
+
+    def diff(self, lines: list) -> str:
+        """
+        Возвращает управляющие последовательности, которые превращают
+        последний выведенный кадр в новый: для каждой строки перемещение
+        курсора к изменившемуся участку и новые символы этого участка.
+        Участки, разделённые не более чем GAP совпадающими символами,
+        выводятся одним куском.
+        """
+
+        parts = list()
+        for row, (old, new) in enumerate(zip(self.lines, lines), start=1):
+            if old == new:
+                continue
+            if len(old) != len(new):
+                # Строка сменила длину: переписываем её от первого
+                # отличия до конца и стираем остаток
+                start = next((i for i, (a, b) in enumerate(zip(old, new))
+                              if a != b), min(len(old), len(new)))
+                parts.append(f'\x1b[{row};{start + 1}H{new[start:]}\x1b[K')
+                continue
+            start = end = None
+            for column, (a, b) in enumerate(zip(old, new)):
+                if a == b:
+                    continue
+                if start is not None and column - end > self.GAP:
+                    parts.append(f'\x1b[{row};{start + 1}H{new[start:end]}')
+                    start = None
+                if start is None:
+                    start = column
+                end = column + 1
+            parts.append(f'\x1b[{row};{start + 1}H{new[start:end]}')
+        return ''.join(parts)
+
+    def draw(self, lines: list, message: str = '') -> None:
+        """
+        Выводит кадр и сообщение под ним одной записью в поток.
+        Если кадр не помещается в терминал, выводит его целиком
+        без управляющих последовательностей.
+        """
+
+        if not self.fits(lines):
+            self.reset()
+            output = '\n'.join(lines) + '\n' + (message + '\n' if message else '')
+        else:
+            size = shutil.get_terminal_size()
+            if (self.lines is None or len(self.lines) != len(lines)
+                    or size != self.terminal_size):
+                # Первый кадр или изменился размер: очищаем экран
+                # и выводим кадр целиком
+                output = '\x1b[H\x1b[2J' + '\n'.join(lines)
+            else:
+                output = self.diff(lines)
+            # Переходим в область сообщений и очищаем её
+            output += f'\x1b[{len(lines) + 1};1H\x1b[J'
+            if message:
+                output += message + '\n'
+            self.lines = list(lines)
+            self.terminal_size = size
+        self.stream.write(output)
+        self.stream.flush()
+        self.written += len(output)
+
+    def reset(self) -> None:
+        """
+        Забывает последний кадр: следующий будет выведен целиком.
+        """
+
+        self.lines = None
+        self.terminal_size = None
+
+
+class Game():
+    """
+    Класс для представления игры.
+
+    Атрибуты
+    --------
+    user : User
+        Игрок-пользователь.
+    user_board : Board
+        Доска пользователя.
+    ai : AI
+        Игрок-компьютер, объект класса Ai .
+    ai_board : Board
+        Доска компьютера.
+    ai_class : type
+        Класс игрока-компьютера (или функция, которая создаёт его
+        с теми же аргументами).
+    board_class : type
+        Класс доски: Board или BitBoard.
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    seed : int
+        Зерно партии: по нему однозначно восстанавливаются расстановки
+        и ходы компьютера.
+    pool : BoardPool
+        Запас готовых расстановок (pool.BoardPool) или None.
+    renderer : TerminalRenderer
+        Инкрементальный вывод досок в терминал или None (тогда доски
+        каждый ход выводятся целиком).
+
+    Методы
+    --------
+    @staticmethod
+    streams(int, count=4):
+        Возвращает count независимых генераторов случайных чисел,
+        однозначно определяемых зерном партии.
+    @staticmethod
+    check_fleet(int, list):
+        Вспомогательная функция.
+        Проверяет, что флот вообще можно расставить на доске,
+        иначе выбрасывает ValueError.
+    @staticmethod
+    check_pool(BoardPool, int, list):
+        Вспомогательная функция.
+        Проверяет, что запас расстановок подходит для доски и флота.
+    make_board(rng=DEFAULT_RNG):
+        Возвращает готовую к игре доску с расставленными кораблями
+        (из запаса pool, если он задан).
+    @staticmethod
+    random_board(board_class=Board, size=BOARD_SIZE, ships_types=SHIPS_TYPES,
+                 rng=DEFAULT_RNG):
+        Вспомогательная функция.
+        Генерирует случайную расстановку кораблей на пустой доске,
+        выбирая каждый корабль среди его допустимых положений.
+        В случае успеха возвращает объект Board, в ином случае None.
+    @staticmethod
+    rejection_board(board_class=Board, size=BOARD_SIZE,
+                    ships_types=SHIPS_TYPES, rng=DEFAULT_RNG):
+        Вспомогательная функция.
+        Пытается сгенерировать случайную расстановку кораблей на пустой доске
+        методом проб и ошибок.
+        В случае успеха возвращает объект Board, в ином случае None.
+    @staticmethod
+    greet():
+        Приветствует в консоли пользователя и рассказывает о формате ввода.
+    frame(columns=None):
+        Возвращает кадр с досками обоих игроков в виде списка строк.
+    show_boards(message=''):
+        Выводит на экран доски обоих игроков.
+    loop():
+        Игровой цикл.
+        Поочерёдно для каждого игрока вызывается метод move() и
+        выполняется проверка проигрыша доски соперника.
+    start():
+        Запуск игры. Сначала вызывается приветствие, затем игровой цикл.
+    """
+
+    def __init__(self,
+                 board_class: type = Board,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES,
+                 seed: int = None,
+                 pool=None,
+                 renderer: TerminalRenderer = None,
+                 ai_class: type = AI) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта Game.
+
+        Атрибуты
+        --------
+        user : User
+            Игрок-пользователь.
+        user_board : Board
+            Доска пользователя.
+        ai : AI
+            Игрок-компьютер, объект класса Ai .
+        ai_board : Board
             Доска компьютера.
+        ai_class : type
+            Класс игрока-компьютера (или функция, которая создаёт его
+            с теми же аргументами, например functools.partial).
+        board_class : type
+            Класс доски: Board или BitBoard.
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        seed : int
+            Зерно партии (если не задано, берётся из DEFAULT_RNG).
+        pool : BoardPool
+            Запас готовых расстановок (pool.BoardPool) или None.
+            Расстановки из запаса не зависят от зерна партии.
+        renderer : TerminalRenderer
+            Инкрементальный вывод досок в терминал или None (тогда доски
+            каждый ход выводятся целиком).
         """
 
-        self.user_board = self.make_board()
-        self.ai_board = self.make_board()
+        self.board_class = board_class
+        self.size = size
+        self.ships_types = list(ships_types)
+        Game.check_fleet(size, ships_types)
+        self.seed = seed if seed is not None else DEFAULT_RNG.getrandbits(64)
+        self.pool = Game.check_pool(pool, size, ships_types)
+        self.renderer = renderer
+        self.ai_class = ai_class
+        streams = Game.streams(self.seed)
+        self.user_board = self.make_board(streams[0])
+        self.ai_board = self.make_board(streams[1])
         self.ai_board.is_hidden = True
-        self.user = User(self.user_board, self.ai_board)
-        self.ai = AI(self.ai_board, self.user_board)
+        self.user = User(self.user_board, self.ai_board, streams[2])
+        self.ai = ai_class(self.ai_board, self.user_board, streams[3])
+
+    @staticmethod
+    def streams(seed: int, count: int = 4) -> list[Random]:
+        """
+        Возвращает count независимых генераторов случайных чисел,
+        однозначно определяемых зерном партии: для доски первого и второго
+        игрока и для самих игроков. Поэтому ходы игроков не зависят от того,
+        сколько случайных чисел понадобилось на расстановку.
+        """
+
+        master = Random(seed)
+        return [Random(master.getrandbits(64)) for _ in range(count)]
+
+    @staticmethod
+    def check_fleet(size: int, ships_types: list) -> None:
+        """
+        Вспомогательная функция.
+        Проверяет, что флот ships_types вообще можно расставить на доске
+        размера size, иначе выбрасывает ValueError: make_board искал бы
+        такую расстановку бесконечно. Результат проверки хранится в кэше.
+        """
+
+        if not ships_types or min(ships_types) < 1:
+            raise ValueError('Флот должен состоять из кораблей длины больше нуля.')
+        fleet = tuple(sorted(ships_types, reverse=True))
+        feasible, density = fleet_feasibility(size, fleet)
+        if not feasible:
+            raise ValueError(f'Флот {list(fleet)} невозможно расставить на доске '
+                             f'{size}x{size} (плотность {density:.2f}).')
+
+    @staticmethod
+    def check_pool(pool, size: int, ships_types: list):
+        """
+        Вспомогательная функция.
+        Проверяет, что запас расстановок pool подходит для доски size
+        и флота ships_types, и возвращает его.
+        """
 
-    def make_board(self) -> Board:
+        if pool is not None and (pool.size, pool.ships_types) != \
+                (size, list(ships_types)):
+            raise ValueError('Запас расстановок подготовлен '
+                             'для другого размера доски или флота.')
+        return pool
+
+    def make_board(self, rng: Random = DEFAULT_RNG) -> Board:
         """
-        Возвращает готовую к игре доску с расставленными кораблями.
+        Возвращает готовую к игре доску с расставленными кораблями
+        (из запаса pool, если он задан).
         """
 
-        board = None
-        while board is None:
-            board = Game.random_board()
+        if self.pool is not None:
+            return self.pool.make_board(self.board_class)
+        board = Game.random_board(self.board_class, self.size,
+                                  self.ships_types, rng)
         board.get_ready()
         return board
 
     @staticmethod
-    def random_board() -> Board:
+    def random_board(board_class: type = Board,
+                     size: int = BOARD_SIZE,
+                     ships_types: list = SHIPS_TYPES,
+                     rng: Random = DEFAULT_RNG) -> Board:
+        """
+        Вспомогательная функция.
+        Генерирует случайную расстановку кораблей на пустой доске.
+        Для очередного корабля хранит битовую маску всех его ещё допустимых
+        положений (нос, направление) и выбирает из неё случайное. Назад
+        возвращается только в настоящем тупике, когда положений не осталось.
+        В случае успеха возвращает объект Board, в ином случае
+        (флот невозможно расставить) None.
+        """
+
+        placements = {length: ship_placements(size, length)
+                      for length in set(ships_types)}
+        blockers = {length: placement_blockers(size, length)
+                    for length in placements}
+        # Маски допустимых положений для каждой длины корабля
+        legal = {length: (1 << len(placements[length])) - 1
+                 for length in placements}
+        # Длины кораблей, которые ещё предстоит поставить после i-го
+        remaining = [set(ships_types[i + 1:]) for i in range(len(ships_types))]
+        # Стек для возврата: (оставшиеся варианты, маски допустимых положений)
+        stack = list()
+        chosen = list()
+        options = legal[ships_types[0]]
+        while len(chosen) < len(ships_types):
+            length = ships_types[len(chosen)]
+            # Тупик: возвращаемся к предыдущему кораблю
+            if not options:
+                if not stack:
+                    return None
+                options, legal = stack.pop()
+                chosen.pop()
+                continue
+            # Выбираем случайное допустимое положение корабля
+            index = _random_bit(options, rng)
+            options &= ~(1 << index)
+            stack.append((options, legal))
+            chosen.append(placements[length][index])
+            # Убираем положения, задевающие корабль и его ореол
+            oreol = chosen[-1][3]
+            legal = dict(legal)
+            for other in remaining[len(chosen) - 1]:
+                blocked = 0
+                cells = oreol
+                while cells:
+                    low = cells & -cells
+                    blocked |= blockers[other][low.bit_length() - 1]
+                    cells ^= low
+                legal[other] &= ~blocked
+                # Какой-то из оставшихся кораблей уже некуда ставить
+                if not legal[other]:
+                    options, legal = stack.pop()
+                    chosen.pop()
+                    break
+            else:
+                if len(chosen) < len(ships_types):
+                    options = legal[ships_types[len(chosen)]]
+        # Ставим выбранные корабли на доску
+        board = board_class(size, ships_types)
+        for length, (bow, direction, *_) in zip(ships_types, chosen):
+            board.add_ship(Ship(length, bow, direction))
+        return board
+
+    @staticmethod
+    def rejection_board(board_class: type = Board,
+                        size: int = BOARD_SIZE,
+                        ships_types: list = SHIPS_TYPES,
+                        rng: Random = DEFAULT_RNG) -> Board:
         """
         Вспомогательная функция.
-        Пытается сгенерировать случайную расстановку кораблей на пустой доске.
+        Пытается сгенерировать случайную расстановку кораблей на пустой доске
+        методом проб и ошибок.
         В случае успеха возвращает объект Board, в ином случае None.
         """
 
         # Создаём пустую доску
-        board = Board()
+        board = board_class(size, ships_types)
         # Устанавливаем счётчик попыток
         attempts = 0
         # Для каждого типа корабля, от самого большого к самому маленькому
-        for length in SHIPS_TYPES:
+        for length in ships_types:
             # Начинаем попытки поставить корабль
             while True:
                 # Если число попыток превышено, то сдаёмся и начинаем заново
@@ -635,10 +2366,10 @@ class Game():
                 # расположить его в случайном направлении
                 try:
                     board.add_ship(Ship(length,
-                                        Dot(randint(0, BOARD_SIZE-1),
-                                            randint(0, BOARD_SIZE-1)
+                                        Dot(rng.randint(0, size-1),
+                                            rng.randint(0, size-1)
                                             ),
-                                        randint(0, 1)
+                                        rng.randint(0, 1)
                                         )
                                    )
                     break
@@ -685,11 +2416,35 @@ class Game():
         print(marks)
         input('\n\tНажмите -= Enter =- для старта')
 
-    def show_boards(self) -> None:
+    def frame(self, columns: int = None) -> list[str]:
         """
-        Выводит на экран доски обоих игроков.
+        Возвращает кадр с досками обоих игроков в виде списка строк:
+        доски стоят рядом, если помещаются в columns символов по ширине,
+        и одна под другой в ином случае.
         """
 
+        blocks = [[title, ''] + board.render().rstrip('\n').split('\n')
+                  for title, board in (('Доска пользователя:', self.user.own_board),
+                                       ('Доска компьютера:', self.ai.own_board))]
+        width = max(map(len, blocks[0])) + 4
+        if columns is not None and width + max(map(len, blocks[1])) <= columns:
+            return [left.ljust(width) + right for left, right in zip(*blocks)]
+        return blocks[0] + [''] + blocks[1]
+
+    def show_boards(self, message: str = '') -> None:
+        """
+        Выводит на экран доски обоих игроков и сообщение message.
+        Если задан renderer, выводятся только изменившиеся клетки,
+        а сообщение - под досками; иначе доски выводятся целиком
+        после сообщения.
+        """
+
+        if self.renderer is not None:
+            self.renderer.draw(self.frame(self.renderer.columns()), message)
+            return
+        if message:
+            print('\n\n\n' + '-' * 50 + '\n\n\n')
+            print(message)
         print('\n\n\n' + '-' * 50)
         print('Доска пользователя:\n')
         self.user.own_board.show()
@@ -720,15 +2475,11 @@ class Game():
             player += 0 if repeat else 1
             # Если игрок-компьютер проиграл
             if self.ai.own_board.is_loser():
-                print('\n\n\n' + '-' * 50 + '\n\n\n')
-                print('#' * 22 + '\n#    Вы выиграли!    #\n' + '#' * 22)
-                self.show_boards()
+                self.show_boards('#' * 22 + '\n#    Вы выиграли!    #\n' + '#' * 22)
                 break
             # Если игрок-пользователь проиграл
             if self.user.own_board.is_loser():
-                print('\n\n\n' + '-' * 50 + '\n\n\n')
-                print('#' * 22 + '\n# Компьютер выиграл! #\n' + '#' * 22)
-                self.show_boards()
+                self.show_boards('#' * 22 + '\n# Компьютер выиграл! #\n' + '#' * 22)
                 break
 
     def start(self) -> None:
@@ -740,6 +2491,881 @@ class Game():
         self.loop()
 
 
+
+class GameResult():
+    """
+    Класс для представления итогов игры без ввода-вывода.
+
+    Атрибуты
+    --------
+    winner : int
+        Номер победившего игрока: 0 - ходивший первым, 1 - вторым.
+    turns : int
+        Количество сделанных ходов (выстрелов) обоих игроков.
+    shots : list
+        Последовательность выстрелов в виде кортежей
+        (номер игрока, x, y, право следующего хода осталось за игроком).
+    seed : int
+        Зерно партии или None, если партия восстановлена по выстрелам.
+    """
+
+    def __init__(self,
+                 winner: int,
+                 turns: int,
+                 shots: list,
+                 seed: int = None) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта GameResult.
+
+        Атрибуты
+        --------
+        winner : int
+            Номер победившего игрока: 0 - ходивший первым, 1 - вторым.
+        turns : int
+            Количество сделанных ходов (выстрелов) обоих игроков.
+        shots : list
+            Последовательность выстрелов в виде кортежей
+            (номер игрока, x, y, право следующего хода осталось за игроком).
+        seed : int
+            Зерно партии или None, если партия восстановлена по выстрелам.
+        """
+
+        self.winner = winner
+        self.turns = turns
+        self.shots = shots
+        self.seed = seed
+
+
+class HeadlessGame(Game):
+    """
+    Класс для представления игры без ввода-вывода и пауз.
+    Нужен для массового моделирования партий между стратегиями-потомками
+    Player. Игроки не должны запрашивать ввод у пользователя (User не подходит).
+
+    Атрибуты
+    --------
+    board_class : type
+        Класс доски: Board или BitBoard.
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    seed : int
+        Зерно партии: по нему однозначно восстанавливается вся партия
+        (если доски взяты не из запаса pool).
+    pool : BoardPool
+        Запас готовых расстановок (pool.BoardPool) или None.
+    boards : list
+        Доски первого и второго игрока.
+    players : list
+        Первый и второй игрок.
+
+    Наследуемые методы
+    --------
+    @staticmethod
+    streams(int, count=4):
+        Возвращает count независимых генераторов случайных чисел,
+        однозначно определяемых зерном партии.
+    @staticmethod
+    check_fleet(int, list):
+        Вспомогательная функция.
+        Проверяет, что флот вообще можно расставить на доске,
+        иначе выбрасывает ValueError.
+    @staticmethod
+    check_pool(BoardPool, int, list):
+        Вспомогательная функция.
+        Проверяет, что запас расстановок подходит для доски и флота.
+    make_board(rng=DEFAULT_RNG):
+        Возвращает готовую к игре доску с расставленными кораблями
+        (из запаса pool, если он задан).
+    @staticmethod
+    random_board(board_class=Board, size=BOARD_SIZE, ships_types=SHIPS_TYPES,
+                 rng=DEFAULT_RNG):
+        Вспомогательная функция.
+        Генерирует случайную расстановку кораблей на пустой доске,
+        выбирая каждый корабль среди его допустимых положений.
+        В случае успеха возвращает объект Board, в ином случае None.
+
+    Методы
+    --------
+    loop():
+        Игровой цикл без вывода на экран.
+        Возвращает итоги игры, объект GameResult.
+    start():
+        Запуск игры. Возвращает итоги игры, объект GameResult.
+    """
+
+    def __init__(self,
+                 first_class: type = AI,
+                 second_class: type = AI,
+                 board_class: type = Board,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES,
+                 seed: int = None,
+                 pool=None) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта HeadlessGame.
+
+        Атрибуты
+        --------
+        board_class : type
+            Класс доски: Board или BitBoard.
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        seed : int
+            Зерно партии (если не задано, берётся из DEFAULT_RNG).
+        pool : BoardPool
+            Запас готовых расстановок (pool.BoardPool) или None.
+        boards : list
+            Доски первого и второго игрока.
+        players : list
+            Первый и второй игрок.
+        """
+
+        self.board_class = board_class
+        self.size = size
+        self.ships_types = list(ships_types)
+        Game.check_fleet(size, ships_types)
+        self.seed = seed if seed is not None else DEFAULT_RNG.getrandbits(64)
+        self.pool = Game.check_pool(pool, size, ships_types)
+        streams = Game.streams(self.seed)
+        self.boards = [self.make_board(streams[0]), self.make_board(streams[1])]
+        self.players = [first_class(self.boards[0], self.boards[1], rng=streams[2]),
+                        second_class(self.boards[1], self.boards[0], rng=streams[3])]
+        for board in self.boards:
+            board.is_verbose = False
+        for player in self.players:
+            player.is_verbose = False
+
+    def loop(self) -> GameResult:
+        """
+        Игровой цикл без вывода на экран.
+        Возвращает итоги игры, объект GameResult.
+        """
+
+        shots = list()
+        player = 0
+        while True:
+            current = self.players[player]
+            repeat = current.move()
+            dot = current.last_shot
+            shots.append((player, dot.x, dot.y, repeat))
+            if current.opponent_board.is_loser():
+                return GameResult(player, len(shots), shots, self.seed)
+            if not repeat:
+                player = 1 - player
+
+    def start(self) -> GameResult:
+        """
+        Запуск игры. Возвращает итоги игры, объект GameResult.
+        """
+
+        return self.loop()
+
+
+class ReplayPlayer(Player):
+    """
+    Класс для представления игрока, повторяющего записанные выстрелы.
+
+    Наследуемые атрибуты
+    --------
+    own_board : Board
+        Собственная доска.
+    opponent_board: Board
+        Доска соперника.
+    last_shot : Dot
+        Точка последнего удачного (без исключений) выстрела игрока.
+    rng : Random
+        Генератор случайных чисел игрока (не используется).
+
+    Атрибуты
+    --------
+    shots : list
+        Ещё не сделанные записанные выстрелы игрока, объекты Dot.
+
+    Методы
+    --------
+    ask():
+        Возвращает следующий записанный выстрел.
+    """
+
+    def __init__(self,
+                 own_board: Board,
+                 opponent_board: Board,
+                 rng: Random = DEFAULT_RNG,
+                 shots: list = ()) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта ReplayPlayer.
+
+        Атрибуты
+        --------
+        shots : list
+            Ещё не сделанные записанные выстрелы игрока, объекты Dot.
+        """
+
+        super().__init__(own_board, opponent_board, rng)
+        # Храним в обратном порядке, чтобы брать выстрелы с конца
+        self.shots = list(shots)[::-1]
+
+    def ask(self) -> Dot:
+        """
+        Возвращает следующий записанный выстрел.
+        Если записанные выстрелы закончились, выбрасывает IndexError.
+        """
+
+        if not self.shots:
+            raise IndexError('Записанные выстрелы закончились.')
+        return self.shots.pop()
+
+
+class ReplayGame(HeadlessGame):
+    """
+    Класс для представления повтора партии по готовым доскам и
+    записанным выстрелам, без расстановки кораблей и без стратегий.
+
+    Наследуемые атрибуты
+    --------
+    board_class : type
+        Класс доски: Board или BitBoard.
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    seed : int
+        Зерно партии (для повтора всегда None).
+    pool : BoardPool
+        Запас готовых расстановок (для повтора всегда None).
+    boards : list
+        Доски первого и второго игрока.
+    players : list
+        Первый и второй игрок, объекты ReplayPlayer.
+
+    Наследуемые методы
+    --------
+    loop():
+        Игровой цикл без вывода на экран.
+        Возвращает итоги игры, объект GameResult.
+    start():
+        Запуск игры. Возвращает итоги игры, объект GameResult.
+    """
+
+    def __init__(self, boards: list, shots: list) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта ReplayGame.
+        boards - готовые к игре доски первого и второго игрока,
+        shots - выстрелы в формате GameResult.shots.
+        """
+
+        self.board_class = type(boards[0])
+        self.size = boards[0].size
+        self.ships_types = list(boards[0].ships_types)
+        self.seed = None
+        self.pool = None
+        self.boards = list(boards)
+        self.players = [
+            ReplayPlayer(self.boards[number], self.boards[1 - number],
+                         shots=[Dot(x, y) for player, x, y, _ in shots
+                                if player == number])
+            for number in (0, 1)]
+        for board in self.boards:
+            board.is_verbose = False
+        for player in self.players:
+            player.is_verbose = False
+
+
+class Instrumentation():
+    """
+    Класс для представления необязательных счётчиков и таймеров горячих
+    путей игры: add_ship, shot, random_board, make_board, ask компьютера
+    и игрового цикла.
+    Пока объект не включён методом enable(), код игры не меняется и ничего
+    не стоит. enable() подменяет эти методы в классах обёртками, которые
+    считают вызовы, исходы и время, а disable() возвращает исходные методы.
+
+    Атрибуты
+    --------
+    on_game : callable
+        Функция, которая получает сводку каждой законченной партии (или None).
+    counters : Counter
+        Счётчики текущей партии.
+    seconds : Counter
+        Суммарное время по операциям текущей партии в секундах.
+    games : int
+        Количество законченных партий.
+    totals : Counter
+        Счётчики всех законченных партий.
+    total_seconds : Counter
+        Суммарное время по операциям всех законченных партий в секундах.
+    histograms : dict
+        Для каждого счётчика гистограмма {значение за партию: количество партий}.
+    latencies : dict
+        Для каждой операции гистограмма {верхняя граница в мкс: количество
+        вызовов} с границами - степенями двойки.
+
+    Методы
+    --------
+    enable():
+        Подменяет методы игры обёртками со счётчиками.
+    disable():
+        Возвращает исходные методы игры.
+    count(str, n=1):
+        Увеличивает счётчик текущей партии.
+    record_time(str, float):
+        Учитывает время одного вызова операции.
+    end_game():
+        Заканчивает текущую партию и возвращает её сводку.
+    summary():
+        Возвращает сводку по всем законченным партиям.
+    """
+
+    # Включённый сейчас объект: одновременно методы подменяет только один
+    active = None
+
+    def __init__(self, on_game=None) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта Instrumentation.
+
+        Атрибуты
+        --------
+        on_game : callable
+            Функция, которая получает сводку каждой законченной партии (или None).
+        counters : Counter
+            Счётчики текущей партии.
+        seconds : Counter
+            Суммарное время по операциям текущей партии в секундах.
+        games : int
+            Количество законченных партий.
+        totals : Counter
+            Счётчики всех законченных партий.
+        total_seconds : Counter
+            Суммарное время по операциям всех законченных партий в секундах.
+        histograms : dict
+            Для каждого счётчика гистограмма {значение за партию: количество партий}.
+        latencies : dict
+            Для каждой операции гистограмма {верхняя граница в мкс: количество
+            вызовов} с границами - степенями двойки.
+        """
+
+        self.on_game = on_game
+        self.counters = Counter()
+        self.seconds = Counter()
+        self.games = 0
+        self.totals = Counter()
+        self.total_seconds = Counter()
+        self.histograms = dict()
+        self.latencies = dict()
+        self._originals = list()
+
+    def __enter__(self) -> 'Instrumentation':
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.disable()
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Увеличивает счётчик текущей партии.
+        """
+
+        self.counters[name] += n
+
+    def record_time(self, name: str, seconds: float) -> None:
+        """
+        Учитывает время одного вызова операции: в сумме за партию и
+        в гистограмме задержек.
+        """
+
+        self.seconds[name] += seconds
+        bucket = 1 << int(seconds * 1e6).bit_length()
+        latency = self.latencies.setdefault(name, Counter())
+        latency[bucket] += 1
+
+    def end_game(self) -> dict:
+        """
+        Заканчивает текущую партию: переносит её счётчики в общие и
+        в гистограммы, передаёт сводку в on_game и возвращает её.
+        """
+
+        summary = {'counters': dict(self.counters),
+                   'seconds': dict(self.seconds)}
+        self.games += 1
+        self.totals.update(self.counters)
+        self.total_seconds.update(self.seconds)
+        for name, value in self.counters.items():
+            self.histograms.setdefault(name, Counter())[value] += 1
+        self.counters = Counter()
+        self.seconds = Counter()
+        if self.on_game is not None:
+            self.on_game(summary)
+        return summary
+
+    def summary(self) -> dict:
+        """
+        Возвращает сводку по всем законченным партиям: количество партий,
+        суммы счётчиков, суммарное время и среднее время вызова операций,
+        гистограммы счётчиков по партиям и гистограммы задержек.
+        Счётчики, которые в какой-то партии не сработали, в её гистограмме
+        учитываются нулём. Вызовы вне партий (например, отдельные
+        random_board) входят в суммы, но не в гистограммы по партиям.
+        """
+
+        totals = self.totals + self.counters
+        seconds = self.total_seconds + self.seconds
+        histograms = dict()
+        for name, histogram in self.histograms.items():
+            histogram = Counter(histogram)
+            missing = self.games - sum(histogram.values())
+            if missing > 0:
+                histogram[0] += missing
+            histograms[name] = dict(sorted(histogram.items()))
+        calls = {name: sum(latency.values())
+                 for name, latency in self.latencies.items()}
+        return {'games': self.games,
+                'counters': dict(sorted(totals.items())),
+                'seconds': dict(sorted(seconds.items())),
+                'mean_us': {name: seconds[name] / calls[name] * 1e6
+                            for name in sorted(calls) if calls[name]},
+                'histograms': histograms,
+                'latencies_us': {name: dict(sorted(latency.items()))
+                                 for name, latency in sorted(self.latencies.items())}}
+
+    def enable(self) -> None:
+        """
+        Подменяет методы игры обёртками со счётчиками.
+        Классы компьютерных игроков берутся на момент вызова: AI и все его
+        уже определённые потомки.
+        """
+
+        if Instrumentation.active is not None:
+            raise ValueError('Другой объект Instrumentation уже включён.')
+        Instrumentation.active = self
+        for cls in (Board, BitBoard):
+            self._patch(cls, 'add_ship', self._add_ship)
+            self._patch(cls, 'shot', self._shot)
+        self._patch(Game, 'random_board', self._random_board)
+        self._patch(Game, 'rejection_board', self._random_board)
+        self._patch(Game, 'make_board', self._make_board)
+        for cls in (Game, HeadlessGame):
+            self._patch(cls, 'loop', self._loop)
+        players = [AI]
+        while players:
+            cls = players.pop()
+            self._patch(cls, 'ask', self._ask)
+            players.extend(cls.__subclasses__())
+
+    def disable(self) -> None:
+        """
+        Возвращает исходные методы игры.
+        """
+
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals = list()
+        if Instrumentation.active is self:
+            Instrumentation.active = None
+
+    def _patch(self, cls: type, name: str, make_wrapper: Callable) -> None:
+        """
+        Вспомогательный метод.
+        Подменяет метод name, если он определён в самом классе cls
+        (унаследованные методы подменяются в родителе).
+        """
+
+        if name not in cls.__dict__:
+            return
+        original = cls.__dict__[name]
+        self._originals.append((cls, name, original))
+        if isinstance(original, staticmethod):
+            setattr(cls, name, staticmethod(make_wrapper(original.__func__, name)))
+        else:
+            setattr(cls, name, make_wrapper(original, f'{name}[{cls.__name__}]'
+                                            if name == 'ask' else name))
+
+    def _add_ship(self, method, name: str) -> Callable:
+        """
+        Вспомогательный метод.
+        Возвращает обёртку add_ship: попытки, отказы и время.
+        """
+
+        @wraps(method)
+        def add_ship(board, ship):
+            self.counters['add_ship.attempts'] += 1
+            started = perf_counter()
+            try:
+                return method(board, ship)
+            except BoardWrongShipException:
+                self.counters['add_ship.rejections'] += 1
+                raise
+            finally:
+                self.record_time(name, perf_counter() - started)
+        return add_ship
+
+    def _shot(self, method, name: str) -> Callable:
+        """
+        Вспомогательный метод.
+        Возвращает обёртку shot: промахи, попадания, потопления, выстрелы
+        за пределы доски и в использованные точки (после них Player.move
+        повторяет ход) и время.
+        """
+
+        @wraps(method)
+        def shot(board, dot):
+            live_ships = board.live_ships
+            started = perf_counter()
+            try:
+                repeat = method(board, dot)
+            except BoardOutException:
+                self.counters['shot.out'] += 1
+                raise
+            except BoardUsedException:
+                self.counters['shot.used'] += 1
+                raise
+            finally:
+                self.record_time(name, perf_counter() - started)
+            if board.live_ships < live_ships:
+                self.counters['shot.sunk'] += 1
+            else:
+                self.counters['shot.hit' if repeat else 'shot.miss'] += 1
+            return repeat
+        return shot
+
+    def _random_board(self, function, name: str) -> Callable:
+        """
+        Вспомогательный метод.
+        Возвращает обёртку генератора доски: вызовы, неудачи и время.
+        """
+
+        @wraps(function)
+        def random_board(*args, **kwargs):
+            started = perf_counter()
+            board = function(*args, **kwargs)
+            self.record_time(name, perf_counter() - started)
+            self.counters[f'{name}.calls'] += 1
+            if board is None:
+                self.counters[f'{name}.failed'] += 1
+            return board
+        return random_board
+
+    def _make_board(self, method, name: str) -> Callable:
+        """
+        Вспомогательный метод.
+        Возвращает обёртку make_board: перезапуски расстановки и время.
+        """
+
+        @wraps(method)
+        def make_board(game, *args, **kwargs):
+            calls = self.counters['random_board.calls']
+            started = perf_counter()
+            board = method(game, *args, **kwargs)
+            self.record_time(name, perf_counter() - started)
+            # Каждый лишний вызов random_board - перезапуск расстановки
+            # (из запаса BoardPool доска берётся вовсе без random_board)
+            self.counters['make_board.restarts'] += \
+                max(0, self.counters['random_board.calls'] - calls - 1)
+            return board
+        return make_board
+
+    def _ask(self, method, name: str) -> Callable:
+        """
+        Вспомогательный метод.
+        Возвращает обёртку ask компьютера: время принятия решения.
+        """
+
+        @wraps(method)
+        def ask(player):
+            started = perf_counter()
+            try:
+                return method(player)
+            finally:
+                self.record_time(name, perf_counter() - started)
+        return ask
+
+    def _loop(self, method, name: str) -> Callable:
+        """
+        Вспомогательный метод.
+        Возвращает обёртку игрового цикла: время партии и её завершение
+        в счётчиках (end_game).
+        """
+
+        @wraps(method)
+        def loop(game):
+            started = perf_counter()
+            try:
+                return method(game)
+            finally:
+                self.record_time(name, perf_counter() - started)
+                self.end_game()
+        return loop
+
+
+def simulate(games: int,
+             seed: int = None,
+             first_class: type = AI,
+             second_class: type = AI,
+             board_class: type = Board,
+             size: int = BOARD_SIZE,
+             ships_types: list = SHIPS_TYPES,
+             recorder=None,
+             pool=None) -> dict:
+    """
+    Проводит games партий без ввода-вывода между двумя стратегиями.
+    Если передан recorder (например, records.RecordWriter), каждая партия
+    записывается вызовом recorder.write(доски, итоги). Если передан pool
+    (pool.BoardPool), доски берутся из этого запаса расстановок.
+    Возвращает словарь со статистикой: количество партий, побед каждого
+    игрока, среднее число ходов, затраченное время, число партий в секунду
+    и зерно самой долгой партии (для её повтора; None, если доски
+    брались из запаса: по зерну партии они не восстанавливаются).
+    """
+
+    seed_random(seed)
+    wins = [0, 0]
+    turns = 0
+    slowest = (0.0, None)
+    started = perf_counter()
+    for _ in range(games):
+        game_started = perf_counter()
+        game = HeadlessGame(first_class, second_class, board_class,
+                            size, ships_types, pool=pool)
+        result = game.start()
+        slowest = max(slowest, (perf_counter() - game_started, game.seed))
+        if recorder is not None:
+            recorder.write(game.boards, result)
+        wins[result.winner] += 1
+        turns += result.turns
+    elapsed = perf_counter() - started
+    return {'games': games,
+            'wins': wins,
+            'mean_turns': turns / games if games else 0.0,
+            'seconds': elapsed,
+            'games_per_second': games / elapsed if elapsed else 0.0,
+            'slowest_seconds': slowest[0],
+            'slowest_seed': slowest[1] if pool is None else None}
+
+
+def parse_fleet(value: str) -> list[int]:
+    """
+    Разбирает флот из строки вида '4,3,3,2,2,2,1,1,1,1'.
+    Возвращает длины кораблей в порядке убывания.
+    """
+
+    try:
+        fleet = sorted((int(length) for length in value.split(',')), reverse=True)
+    except ValueError:
+        raise argparse.ArgumentTypeError('Флот задаётся длинами кораблей через запятую.')
+    if not fleet or fleet[-1] < 1:
+        raise argparse.ArgumentTypeError('Длины кораблей должны быть больше нуля.')
+    return fleet
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    Без аргументов запускается обычная игра с пользователем.
+    """
+
+    def common_options(suppress: bool) -> argparse.ArgumentParser:
+        """
+        Возвращает родительский парсер с размером доски, флотом
+        и профилированием. Их можно задать и до подкоманды, и после неё,
+        поэтому у подкоманд значения по умолчанию не задаются (SUPPRESS),
+        иначе они затирали бы значения, заданные до подкоманды.
+        """
+
+        options = argparse.ArgumentParser(add_help=False)
+        options.add_argument('--size', type=int,
+                             default=argparse.SUPPRESS if suppress else BOARD_SIZE,
+                             help='размер доски')
+        options.add_argument('--fleet', type=parse_fleet,
+                             default=argparse.SUPPRESS if suppress else SHIPS_TYPES,
+                             help='длины кораблей через запятую')
+        options.add_argument('--profile',
+                             default=argparse.SUPPRESS if suppress else None,
+                             help='запустить под cProfile и записать статистику в файл')
+        return options
+
+    command_options = common_options(suppress=True)
+    game_options = argparse.ArgumentParser(add_help=False)
+    game_options.add_argument('--bitboard', action='store_true',
+                              help='использовать BitBoard вместо Board')
+    for player in ('first', 'second'):
+        game_options.add_argument(f'--{player}', default='AI',
+                                  choices=['AI', 'DensityAI'],
+                                  help='стратегия игрока')
+    parser = argparse.ArgumentParser(description='«Морской бой»',
+                                     parents=[common_options(suppress=False)])
+    parser.add_argument('--seed', type=int, default=None,
+                        help='зерно партии')
+    parser.add_argument('--plain', action='store_true',
+                        help='каждый ход выводить доски целиком '
+                             '(для терминалов без поддержки ANSI)')
+    parser.add_argument('--ai', default='AI',
+                        choices=['AI', 'DensityAI', 'MonteCarloAI'],
+                        help='стратегия компьютера')
+    parser.add_argument('--budget', type=float, default=50.0,
+                        help='время на ход MonteCarloAI в миллисекундах '
+                             '(пока вы думаете, он продолжает считать в фоне)')
+    commands = parser.add_subparsers(dest='command')
+    simulate_parser = commands.add_parser(
+        'simulate', help='партии компьютер против компьютера без вывода',
+        parents=[command_options, game_options])
+    simulate_parser.add_argument('--games', type=int, default=1000,
+                                 help='количество партий')
+    simulate_parser.add_argument('--seed', type=int, default=argparse.SUPPRESS,
+                                 help='зерно генератора случайных чисел')
+    simulate_parser.add_argument('--record', default=None,
+                                 help='дописывать партии в файл записей')
+    simulate_parser.add_argument('--pool', type=int, default=0,
+                                 help='объём запаса готовых расстановок '
+                                      '(пополняется в фоновом потоке)')
+    simulate_parser.add_argument('--pool-snapshot', default=None,
+                                 help='файл снимка запаса: загружается при старте, '
+                                      'сохраняется в конце')
+    simulate_parser.add_argument('--instrument', default=None,
+                                 help='включить счётчики и записать сводки '
+                                      'партий в файл JSON Lines')
+    replay_parser = commands.add_parser(
+        'replay', help='повтор партии по зерну или из файла записей',
+        parents=[command_options, game_options])
+    # Зерно можно задать и до подкоманды, поэтому наличие зерна
+    # или файла записей проверяется после разбора
+    source = replay_parser.add_mutually_exclusive_group()
+    source.add_argument('--seed', type=int, default=argparse.SUPPRESS,
+                        help='зерно партии (из вывода simulate)')
+    source.add_argument('--record', default=None,
+                        help='файл записей партий')
+    replay_parser.add_argument('--index', type=int, default=0,
+                               help='номер партии в файле записей')
+    replay_parser.add_argument('--shots', action='store_true',
+                               help='вывести все выстрелы партии')
+    args = parser.parse_args(argv)
+    try:
+        Game.check_fleet(args.size, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.command == 'replay' and args.seed is None and args.record is None:
+        parser.error('Для replay нужно задать --seed или --record.')
+    if args.command == 'replay' and args.record is not None:
+        from records import RecordReader
+        try:
+            with RecordReader(args.record) as reader:
+                reader.record(args.index)
+        except (OSError, ValueError, IndexError) as error:
+            parser.error(str(error))
+    if getattr(args, 'budget', 1) <= 0:
+        parser.error('Время на ход --budget должно быть больше нуля.')
+    return args
+
+
+def run_command(args: argparse.Namespace) -> None:
+    """
+    Выполняет команду из разобранных аргументов командной строки.
+    """
+
+    if args.command == 'simulate':
+        recorder = None
+        if args.record:
+            from records import RecordWriter
+            recorder = RecordWriter(args.record, args.size, args.fleet)
+        instrumentation = None
+        if args.instrument:
+            instrument_file = open(args.instrument, 'w', encoding='utf-8')
+            instrumentation = Instrumentation(
+                lambda summary: instrument_file.write(json.dumps(summary) + '\n'))
+            instrumentation.enable()
+        pool = None
+        if args.pool:
+            from pool import BoardPool
+            pool = BoardPool(args.size, args.fleet, args.pool,
+                             rng=Random(args.seed))
+            if args.pool_snapshot and os.path.exists(args.pool_snapshot):
+                pool.load(args.pool_snapshot)
+            pool.start()
+        stats = simulate(args.games, args.seed,
+                         globals()[args.first], globals()[args.second],
+                         BitBoard if args.bitboard else Board,
+                         args.size, args.fleet, recorder, pool)
+        if recorder is not None:
+            recorder.close()
+        if pool is not None:
+            pool.stop()
+            if args.pool_snapshot:
+                pool.fill()
+                pool.save(args.pool_snapshot)
+            print('Запас расстановок:', pool.stats())
+        if instrumentation is not None:
+            instrumentation.disable()
+            summary = instrumentation.summary()
+            instrument_file.write(json.dumps({'summary': summary}) + '\n')
+            instrument_file.close()
+            for name, value in summary['counters'].items():
+                print(f'{name:24} {value:12}')
+            for name, value in summary['mean_us'].items():
+                print(f'{name:24} {value:12.2f} мкс в среднем')
+        print(f'Партий: {stats["games"]}, '
+              f'побед первого / второго: {stats["wins"][0]} / {stats["wins"][1]}, '
+              f'в среднем ходов: {stats["mean_turns"]:.1f}')
+        print(f'Время: {stats["seconds"]:.3f} с, '
+              f'партий в секунду: {stats["games_per_second"]:.1f}')
+        if stats['slowest_seed'] is not None:
+            # Повтор должен играть той же стратегией на той же доске
+            replay = ['replay', '--seed', str(stats['slowest_seed'])]
+            if args.size != BOARD_SIZE:
+                replay += ['--size', str(args.size)]
+            if args.fleet != SHIPS_TYPES:
+                replay += ['--fleet', ','.join(map(str, args.fleet))]
+            for player in ('first', 'second'):
+                if getattr(args, player) != 'AI':
+                    replay += [f'--{player}', getattr(args, player)]
+            if args.bitboard:
+                replay.append('--bitboard')
+            print(f'Самая долгая партия: {stats["slowest_seconds"] * 1000:.2f} мс, '
+                  f'повтор: {" ".join(replay)}')
+    elif args.command == 'replay':
+        board_class = BitBoard if args.bitboard else Board
+        started = perf_counter()
+        if args.record:
+            from records import RecordReader
+            with RecordReader(args.record) as reader:
+                record = reader[args.index]
+                expected = record.shots()
+                result = ReplayGame(record.boards(board_class), expected).start()
+            if result.shots != expected or result.winner != record.winner:
+                raise SystemExit('Повтор не совпал с записью партии.')
+        else:
+            result = HeadlessGame(globals()[args.first], globals()[args.second],
+                                  board_class, args.size, args.fleet,
+                                  args.seed).start()
+        elapsed = perf_counter() - started
+        print(f'Победил игрок {result.winner}, ходов: {result.turns}, '
+              f'время: {elapsed * 1000:.2f} мс')
+        if args.shots:
+            for player, x, y, repeat in result.shots:
+                print(f'  игрок {player}: {x + 1} {y + 1}'
+                      f'{" (попадание)" if repeat else ""}')
+    else:
+        renderer = None
+        if not args.plain and TerminalRenderer.supported():
+            renderer = TerminalRenderer()
+        if args.ai == 'MonteCarloAI':
+            from montecarlo import MonteCarloAI
+            ai_class = partial(MonteCarloAI, budget=args.budget / 1000, ponder=True)
+        else:
+            ai_class = globals()[args.ai]
+        game = Game(size=args.size, ships_types=args.fleet, seed=args.seed,
+                    renderer=renderer, ai_class=ai_class)
+        game.start()
+
+
 if __name__ == '__main__':
-    game = Game()
-    game.start()
+    args = parse_args()
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(run_command, args)
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+    else:
+        run_command(args)
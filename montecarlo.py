@@ -0,0 +1,334 @@
+"""
+Игрок-компьютер с ограничением времени на ход: MonteCarloAI случайно
+расставляет оставшиеся корабли соперника так, чтобы расстановка была
+согласована с уже известными промахами, попаданиями и потопленными
+кораблями, и стреляет в клетку, которую корабли занимали в наибольшем
+числе таких расстановок (выборок).
+
+Выборки набираются до истечения времени на ход budget, поэтому чем больше
+время, тем точнее оценка вероятностей (5 мс - несколько сотен выборок
+на доске 6x6, 500 мс - десятки тысяч). Пока соперник думает над своим
+ходом (например, User ждёт ввода в input()), рабочий поток продолжает
+набирать выборки: доска соперника до нашего следующего выстрела
+не меняется, поэтому все они пригодятся. Результаты привязаны к хешу
+Зобриста доски соперника и отбрасываются, если позиция изменилась.
+
+Выборки приближённо равномерны: сначала корабли ставятся на подбитые
+палубы, затем остальные - в случайные свободные положения, а неудачные
+попытки отбрасываются.
+"""
+
+import threading
+from time import perf_counter, sleep
+
+from main import DEFAULT_RNG, Board, DensityAI, Dot
+
+
+# Время на ход по умолчанию, с
+DEFAULT_BUDGET = 0.05
+# Наибольшее количество попыток выборки в фоне за один ход соперника
+PONDER_LIMIT = 1 << 20
+# Через сколько попыток рабочий поток отпускает GIL, чтобы ход
+# не ждал переключения потоков дольше времени на ход
+PONDER_YIELD = 16
+# Сколько раз пробовать поставить корабль без подбитых палуб,
+# прежде чем отбросить выборку
+PLACEMENT_TRIES = 20
+
+
+class MonteCarloAI(DensityAI):
+    """
+    Класс для представления игрока-компьютера, который оценивает вероятность
+    попадания в каждую клетку по случайным согласованным расстановкам,
+    набранным за отведённое на ход время, и при желании продолжает их
+    набирать в фоне, пока ходит соперник. Если за время хода не набрано
+    ни одной выборки, ходит как DensityAI.
+
+    Наследуемые атрибуты
+    --------
+    own_board : Board
+        Собственная доска.
+    opponent_board: Board
+        Доска соперника.
+    last_shot : Dot
+        Точка последнего удачного (без исключений) выстрела игрока.
+    rng : Random
+        Генератор случайных чисел игрока.
+    size : int
+        Размер доски соперника.
+    fleet : dict
+        Количество ещё не потопленных кораблей каждой длины.
+    available : bytearray
+        Для каждой клетки флаг: можно ли ещё в неё стрелять.
+    hits : set
+        Клетки подбитых, но ещё не потопленных кораблей.
+
+    Атрибуты
+    --------
+    budget : float
+        Время на один ход в секундах.
+    ponder : bool
+        Набирать ли выборки в рабочем потоке, пока ходит соперник.
+    tallies : list
+        Для каждой клетки количество выборок, в которых она занята кораблём.
+    samples : int
+        Количество выборок для текущей позиции.
+    history : list
+        Для каждого хода словарь: всего выборок, из них набрано в фоне,
+        попыток и затраченное на ход время в секундах.
+    fallback_moves : int
+        Количество ходов, выбранных как у DensityAI.
+
+    Наследуемые методы
+    --------
+    move():
+        Делает ход в игре и учитывает его результат в карте плотности.
+    observe(Dot, bool, bool):
+        Учитывает результат выстрела: промах, попадание или потопление.
+
+    Методы
+    --------
+    sample(Random):
+        Возвращает случайную согласованную расстановку оставшихся кораблей.
+    start_pondering():
+        Запускает набор выборок в рабочем потоке.
+    stop_pondering():
+        Останавливает рабочий поток.
+    ask():
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Для MonteCarloAI это клетка, занятая кораблём в наибольшем числе
+        выборок, набранных за время хода.
+    """
+
+    def __init__(self,
+                 own_board: Board,
+                 opponent_board: Board,
+                 rng=DEFAULT_RNG,
+                 budget: float = DEFAULT_BUDGET,
+                 ponder: bool = False) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта MonteCarloAI.
+
+        Атрибуты
+        --------
+        budget : float
+            Время на один ход в секундах.
+        ponder : bool
+            Набирать ли выборки в рабочем потоке, пока ходит соперник.
+        tallies : list
+            Для каждой клетки количество выборок, в которых она занята кораблём.
+        samples : int
+            Количество выборок для текущей позиции.
+        history : list
+            Для каждого хода словарь: всего выборок, из них набрано в фоне,
+            попыток и затраченное на ход время в секундах.
+        fallback_moves : int
+            Количество ходов, выбранных как у DensityAI.
+        """
+
+        if budget <= 0:
+            raise ValueError('Параметр budget должен быть больше нуля.')
+        super().__init__(own_board, opponent_board, rng)
+        self.budget = budget
+        self.ponder = ponder
+        self.tallies = [0] * (self.size * self.size)
+        self.samples = 0
+        self.history = list()
+        self.fallback_moves = 0
+        self._attempts = 0
+        # Хеш позиции, к которой относятся tallies, и готовые для неё
+        # списки положений кораблей
+        self._key = None
+        self._options = None
+        self._thread = None
+        self._stop = threading.Event()
+        if ponder:
+            self.start_pondering()
+
+    def _prepare(self) -> None:
+        """
+        Вспомогательный метод.
+        Если позиция изменилась, обнуляет выборки и собирает для неё
+        возможные положения кораблей: для каждой длины - все ещё возможные,
+        для каждой подбитой палубы - накрывающие её.
+        """
+
+        key = self.opponent_board.zobrist
+        if key == self._key:
+            return
+        self._key = key
+        self.tallies = [0] * (self.size * self.size)
+        self.samples = self._attempts = 0
+        hits = 0
+        for cell in self.hits:
+            hits |= 1 << cell
+        # Корабль целиком из подбитых палуб уже был бы потоплен, а корабль
+        # с подбитой палубой в ореоле касался бы другого корабля
+        def possible(length: int, index: int) -> bool:
+            mask, oreol = self.placements[length][index][2:4]
+            return self.alive[length][index] and bool(mask & ~hits) \
+                and not oreol & ~mask & hits
+
+        options = dict()
+        for length, number in self.fleet.items():
+            if number:
+                options[length] = [placement[2:5] for index, placement
+                                   in enumerate(self.placements[length])
+                                   if possible(length, index)]
+        covering = dict()
+        for cell in self.hits:
+            covering[cell] = [(length, self.placements[length][index][2:5])
+                              for length in options
+                              for index in self.covering[length][cell]
+                              if possible(length, index)]
+        lengths = tuple(length for length in sorted(options, reverse=True)
+                        for _ in range(self.fleet[length]))
+        self._options = (lengths, hits, options, covering)
+
+    def sample(self, rng) -> list:
+        """
+        Возвращает случайную согласованную расстановку оставшихся кораблей
+        в виде списка кортежей клеток каждого корабля или None, если
+        попытка не удалась (корабли не поместились или задели друг друга).
+        """
+
+        lengths, uncovered, options, covering = self._options
+        remaining = list(lengths)
+        occupied = 0
+        layout = list()
+        # Сначала накрываем все подбитые палубы
+        while uncovered:
+            cell = (uncovered & -uncovered).bit_length() - 1
+            choices = [choice for choice in covering[cell]
+                       if choice[0] in remaining and not choice[1][0] & occupied]
+            if not choices:
+                return None
+            length, (mask, oreol, cells) = choices[rng.randrange(len(choices))]
+            remaining.remove(length)
+            occupied |= oreol
+            uncovered &= ~mask
+            layout.append(cells)
+        # Остальные корабли - в случайные свободные положения
+        for length in remaining:
+            choices = options[length]
+            if not choices:
+                return None
+            for _ in range(PLACEMENT_TRIES):
+                mask, oreol, cells = choices[rng.randrange(len(choices))]
+                if not mask & occupied:
+                    break
+            else:
+                return None
+            occupied |= oreol
+            layout.append(cells)
+        return layout
+
+    def _collect(self, rng, deadline: float = None, limit: int = None,
+                 stop: threading.Event = None) -> None:
+        """
+        Вспомогательный метод.
+        Набирает выборки в tallies до момента deadline (по perf_counter),
+        пока число попыток меньше limit, не установлен stop и игрок
+        ещё не проиграл.
+        """
+
+        tallies = self.tallies
+        attempts = samples = 0
+        while limit is None or attempts < limit:
+            if deadline is not None and perf_counter() >= deadline:
+                break
+            if stop is not None:
+                if stop.is_set() or self.own_board.is_loser():
+                    break
+                if not attempts % PONDER_YIELD:
+                    sleep(0)
+            attempts += 1
+            layout = self.sample(rng)
+            if layout is None:
+                continue
+            samples += 1
+            for cells in layout:
+                for cell in cells:
+                    tallies[cell] += 1
+        self.samples += samples
+        self._attempts += attempts
+
+    def start_pondering(self) -> None:
+        """
+        Запускает набор выборок для текущей позиции в рабочем потоке
+        (если он ещё не запущен). Поток работает, пока его не остановит
+        stop_pondering(), не наберётся PONDER_LIMIT попыток или игрок
+        не проиграет.
+        """
+
+        if self._thread is not None or not any(self.fleet.values()):
+            return
+        self._prepare()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._collect, args=(self.rng,),
+            kwargs={'limit': PONDER_LIMIT, 'stop': self._stop},
+            daemon=True, name='MonteCarloAI')
+        self._thread.start()
+
+    def stop_pondering(self) -> None:
+        """
+        Останавливает рабочий поток и дожидается его завершения.
+        """
+
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def ask(self) -> Dot:
+        """
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Для MonteCarloAI это клетка, занятая кораблём в наибольшем числе
+        выборок, набранных за время хода.
+        """
+
+        started = perf_counter()
+        self.stop_pondering()
+        self._prepare()
+        pondered = self.samples
+        if any(self.fleet.values()):
+            self._collect(self.rng, deadline=started + self.budget)
+        self.history.append({'samples': self.samples,
+                             'pondered': pondered,
+                             'attempts': self._attempts,
+                             'seconds': perf_counter() - started})
+        best = 0
+        candidates = list()
+        for cell, free in enumerate(self.available):
+            if not free:
+                continue
+            count = self.tallies[cell]
+            if count > best:
+                best = count
+                candidates = [cell]
+            elif count == best and best:
+                candidates.append(cell)
+        if not candidates:
+            self.fallback_moves += 1
+            return super().ask()
+        cell = candidates[self.rng.randint(0, len(candidates) - 1)]
+        x, y = cell // self.size, cell % self.size
+        self.report(f'x y = {x + 1} {y + 1} (выборок {self.samples}, '
+                    f'из них в фоне {pondered})')
+        return Dot(x, y)
+
+    def move(self) -> bool:
+        """
+        Делает ход в игре и учитывает его результат в карте плотности.
+        Если право хода перешло сопернику, запускает набор выборок в фоне
+        (при включённом ponder).
+        Возвращает True, если право следующего хода остаётся за текущим игроком
+        и False, если право следующего хода переходит сопернику.
+        """
+
+        repeat = super().move()
+        if self.ponder and not repeat:
+            self.start_pondering()
+        return repeat
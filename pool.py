@@ -0,0 +1,359 @@
+"""
+Запас готовых случайных расстановок кораблей для одного размера доски
+и флота. Расстановки заранее генерирует фоновый поток, а игра получает
+их мгновенно: на доску остаётся только поставить корабли через add_ship.
+Когда запас опускается до нижней отметки, фоновый поток пополняет его
+до полного объёма; если запас пуст, расстановка генерируется сразу.
+
+Снимок запаса сохраняется в двоичный файл (те же varint, что и в records.py),
+поэтому после перезапуска запас загружается из файла без генерации.
+
+Подготовка снимка: python pool.py --count 100000 --output pool.bin
+"""
+
+import argparse
+import os
+import threading
+from collections import deque
+from random import Random
+from time import perf_counter
+
+from main import (BOARD_SIZE, DEFAULT_RNG, SHIPS_TYPES, BitBoard, Board, Dot,
+                  Game, Ship, parse_fleet)
+from records import decode_varint, decode_varints, encode_varints
+
+
+# Сигнатура файла снимка запаса
+POOL_MAGIC = b'BSPL'
+# Объём запаса по умолчанию
+POOL_CAPACITY = 1000
+
+
+class BoardPool():
+    """
+    Класс для представления запаса готовых расстановок кораблей.
+    Расстановка - кортеж (x, y, направление) для каждого корабля флота.
+
+    Атрибуты
+    --------
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    capacity : int
+        Наибольшее количество расстановок в запасе.
+    low_watermark : int
+        Количество расстановок, при котором начинается пополнение.
+    rng : Random
+        Генератор случайных чисел всех расстановок запаса.
+    layouts : deque
+        Готовые расстановки.
+    generated : int
+        Количество расстановок, сгенерированных фоновым потоком или fill().
+    taken : int
+        Количество выданных расстановок.
+    fallbacks : int
+        Количество расстановок, сгенерированных сразу из-за пустого запаса.
+
+    Методы
+    --------
+    start():
+        Запускает фоновый поток пополнения.
+    stop():
+        Останавливает фоновый поток пополнения.
+    fill(count=None):
+        Пополняет запас в текущем потоке.
+    take():
+        Возвращает готовую расстановку.
+    make_board(board_class=Board):
+        Возвращает готовую к игре доску с расстановкой из запаса.
+    save(str):
+        Сохраняет снимок запаса в файл.
+    load(str):
+        Добавляет в запас расстановки из снимка.
+    stats():
+        Возвращает статистику запаса.
+    """
+
+    def __init__(self,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES,
+                 capacity: int = POOL_CAPACITY,
+                 low_watermark: int = None,
+                 rng: Random = None) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта BoardPool.
+
+        Атрибуты
+        --------
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        capacity : int
+            Наибольшее количество расстановок в запасе.
+        low_watermark : int
+            Количество расстановок, при котором начинается пополнение
+            (по умолчанию - четверть объёма).
+        rng : Random
+            Генератор случайных чисел всех расстановок запаса
+            (по умолчанию - с зерном из DEFAULT_RNG). Расстановки выдаются
+            в порядке генерации, поэтому при одном зерне последовательность
+            выданных расстановок одна и та же.
+        layouts : deque
+            Готовые расстановки.
+        generated : int
+            Количество расстановок, сгенерированных фоновым потоком или fill().
+        taken : int
+            Количество выданных расстановок.
+        fallbacks : int
+            Количество расстановок, сгенерированных сразу из-за пустого запаса.
+        """
+
+        Game.check_fleet(size, ships_types)
+        if capacity < 1:
+            raise ValueError('Параметр capacity должен быть больше нуля.')
+        if low_watermark is None:
+            low_watermark = capacity // 4
+        if not 0 <= low_watermark < capacity:
+            raise ValueError('Параметр low_watermark должен быть '
+                             'от нуля до capacity.')
+        self.size = size
+        self.ships_types = list(ships_types)
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.rng = rng if rng is not None else Random(DEFAULT_RNG.getrandbits(64))
+        self.layouts = deque()
+        self.generated = 0
+        self.taken = 0
+        self.fallbacks = 0
+        # Генерация (в фоне, в fill() и сразу в take()) идёт по очереди
+        # под этой блокировкой, поэтому порядок расстановок зависит только
+        # от зерна rng; счётчики и _stopped защищает _condition
+        self._generating = threading.Lock()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def __enter__(self) -> 'BoardPool':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _generate(self, rng: Random) -> tuple:
+        """
+        Вспомогательный метод.
+        Генерирует новую расстановку кораблей.
+        """
+
+        board = Game.random_board(BitBoard, self.size, self.ships_types, rng)
+        return tuple((ship.bow.x, ship.bow.y, ship.direction)
+                     for ship in board.ships)
+
+    def _append(self, background: bool = False) -> bool:
+        """
+        Вспомогательный метод.
+        Генерирует следующую расстановку и добавляет её в запас, если
+        в нём есть место (и, для фонового потока, пополнение
+        не остановлено). Возвращает True, если расстановка добавлена.
+        """
+
+        with self._generating:
+            with self._condition:
+                if (background and self._stopped) or \
+                   len(self.layouts) >= self.capacity:
+                    return False
+            self.layouts.append(self._generate(self.rng))
+        with self._condition:
+            self.generated += 1
+        return True
+
+    def start(self) -> None:
+        """
+        Запускает фоновый поток пополнения (если он ещё не запущен).
+        """
+
+        if self._thread is not None:
+            return
+        with self._condition:
+            self._stopped = False
+        self._thread = threading.Thread(target=self._refill, daemon=True,
+                                        name='BoardPool')
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Останавливает фоновый поток пополнения и дожидается его завершения.
+        """
+
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+
+    def _refill(self) -> None:
+        """
+        Вспомогательный метод.
+        Цикл фонового потока: ждёт, пока запас опустится до нижней отметки,
+        и пополняет его до полного объёма.
+        """
+
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopped or len(self.layouts) <= self.low_watermark)
+                if self._stopped:
+                    return
+            while self._append(background=True):
+                pass
+
+    def fill(self, count: int = None) -> None:
+        """
+        Пополняет запас в текущем потоке: добавляет count расстановок
+        (по умолчанию - до полного объёма).
+        """
+
+        if count is None:
+            count = self.capacity
+        for _ in range(count):
+            if not self._append():
+                break
+
+    def take(self) -> tuple:
+        """
+        Возвращает готовую расстановку: (x, y, направление) для каждого
+        корабля флота. Если запас пуст, генерирует её сразу.
+        """
+
+        fallback = False
+        try:
+            layout = self.layouts.popleft()
+        except IndexError:
+            with self._generating:
+                # Пока ждали блокировку, фоновый поток мог добавить расстановку
+                if self.layouts:
+                    layout = self.layouts.popleft()
+                else:
+                    layout = self._generate(self.rng)
+                    fallback = True
+        with self._condition:
+            self.taken += 1
+            self.fallbacks += fallback
+            if len(self.layouts) <= self.low_watermark and self._thread is not None:
+                self._condition.notify()
+        return layout
+
+    def make_board(self, board_class: type = Board) -> Board:
+        """
+        Возвращает готовую к игре доску с расстановкой из запаса.
+        """
+
+        board = board_class(self.size, self.ships_types)
+        for length, (x, y, direction) in zip(self.ships_types, self.take()):
+            board.add_ship(Ship(length, Dot(x, y), direction))
+        board.get_ready()
+        return board
+
+    def save(self, path: str) -> None:
+        """
+        Сохраняет снимок запаса в файл.
+        """
+
+        layouts = list(self.layouts)
+        size = self.size
+        with open(path, 'wb') as file:
+            file.write(POOL_MAGIC + encode_varints(
+                [size, len(self.ships_types), *self.ships_types, len(layouts)]))
+            file.write(encode_varints((x * size + y) * 2 + direction
+                                      for layout in layouts
+                                      for x, y, direction in layout))
+
+    def load(self, path: str) -> int:
+        """
+        Добавляет в запас расстановки из снимка (не больше свободного места).
+        Если размер доски или флот в снимке другие или файл оборван,
+        выбрасывает ValueError. Возвращает количество добавленных расстановок.
+        """
+
+        with open(path, 'rb') as file:
+            data = file.read()
+        if data[:len(POOL_MAGIC)] != POOL_MAGIC:
+            raise ValueError('Это не файл снимка запаса расстановок.')
+        try:
+            size, offset = decode_varint(data, len(POOL_MAGIC))
+            count, offset = decode_varint(data, offset)
+            ships_types, offset = decode_varints(data, offset, count)
+            if (size, ships_types) != (self.size, self.ships_types):
+                raise ValueError('Размер доски или флот не совпадают '
+                                 'со снимком запаса.')
+            count, offset = decode_varint(data, offset)
+            count = min(count, self.capacity - len(self.layouts))
+            ships = len(ships_types)
+            codes, _ = decode_varints(data, offset, count * ships)
+        except IndexError:
+            raise ValueError(f'Снимок запаса {path} оборван.')
+        for start in range(0, len(codes), ships):
+            self.layouts.append(tuple(((code >> 1) // size, (code >> 1) % size,
+                                       code & 1)
+                                      for code in codes[start:start + ships]))
+        return count
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику запаса: текущее количество расстановок,
+        сгенерированные, выданные и сгенерированные сразу расстановки.
+        """
+
+        with self._condition:
+            return {'available': len(self.layouts),
+                    'capacity': self.capacity,
+                    'generated': self.generated,
+                    'taken': self.taken,
+                    'fallbacks': self.fallbacks}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Снимок запаса расстановок кораблей')
+    parser.add_argument('--count', type=int, default=POOL_CAPACITY,
+                        help='количество расстановок')
+    parser.add_argument('--output', default='pool.bin',
+                        help='файл снимка')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='зерно генератора случайных чисел')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE,
+                        help='размер доски')
+    parser.add_argument('--fleet', type=parse_fleet, default=SHIPS_TYPES,
+                        help='длины кораблей через запятую')
+    args = parser.parse_args()
+    try:
+        Game.check_fleet(args.size, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+
+    pool = BoardPool(args.size, args.fleet, args.count, rng=Random(args.seed))
+    started = perf_counter()
+    pool.fill()
+    generated = perf_counter() - started
+    pool.save(args.output)
+    print(f'Расстановок: {args.count}, генерация: {generated:.2f} с, '
+          f'файл: {os.path.getsize(args.output)} байт')
+    loaded = BoardPool(args.size, args.fleet, args.count)
+    started = perf_counter()
+    loaded.load(args.output)
+    print(f'Загрузка снимка: {(perf_counter() - started) * 1000:.1f} мс')
+    for board_class in (Board, BitBoard):
+        started = perf_counter()
+        for _ in range(min(args.count, 1000)):
+            loaded.make_board(board_class)
+        from_pool = (perf_counter() - started) / min(args.count, 1000)
+        started = perf_counter()
+        for _ in range(100):
+            Game.random_board(board_class, args.size, args.fleet)
+        direct = (perf_counter() - started) / 100
+        print(f'{board_class.__name__}: доска из запаса {from_pool * 1e6:.1f} мкс, '
+              f'Game.random_board {direct * 1e6:.1f} мкс')
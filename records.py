@@ -0,0 +1,471 @@
+"""
+Компактный двоичный формат записей партий «Морского боя».
+
+Файл начинается с заголовка: сигнатура MAGIC, версия формата, размер доски
+и флот (все числа - varint, т.е. беззнаковые LEB128). Дальше подряд идут
+записи партий, каждая предваряется своей длиной в байтах:
+
+    длина записи, номер победителя,
+    расстановка первой доски, расстановка второй доски,
+    количество выстрелов, клетки выстрелов.
+
+Корабль расстановки - одно число (x * size + y) * 2 + направление, корабли
+идут в порядке флота из заголовка. Выстрел - номер клетки x * size + y.
+Кто стрелял и осталось ли за ним право хода, не хранится: это однозначно
+восстанавливается по расстановкам (первый игрок ходит первым, промах
+передаёт ход). На доске до 8x8 каждое число занимает один байт.
+
+Запись только дописывается в конец файла, поэтому оборванная последняя
+запись (например, при аварийном завершении) просто пропускается читателем.
+
+Запуск: python records.py FILE [--show N]
+"""
+
+import argparse
+import mmap
+import os
+from array import array
+
+from main import Board, Dot, GameResult, Ship
+
+
+# Сигнатура файла записей
+MAGIC = b'BSGR'
+# Версия формата
+VERSION = 1
+
+
+def encode_varints(values) -> bytes:
+    """
+    Кодирует последовательность неотрицательных чисел в varint (LEB128).
+    """
+
+    values = list(values)
+    if all(value < 0x80 for value in values):
+        return bytes(values)
+    data = bytearray()
+    for value in values:
+        while value >= 0x80:
+            data.append(value & 0x7F | 0x80)
+            value >>= 7
+        data.append(value)
+    return bytes(data)
+
+
+def decode_varint(data, offset: int) -> tuple[int, int]:
+    """
+    Декодирует одно число varint из data, начиная с offset.
+    Возвращает число и смещение следующего байта.
+    Если данные закончились раньше числа, выбрасывает IndexError.
+    """
+
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def decode_varints(data, offset: int, count: int) -> tuple[list[int], int]:
+    """
+    Декодирует count чисел varint из data, начиная с offset.
+    Возвращает список чисел и смещение следующего байта.
+    """
+
+    chunk = data[offset:offset + count]
+    if len(chunk) == count and max(chunk, default=0) < 0x80:
+        return list(chunk), offset + count
+    values = list()
+    for _ in range(count):
+        value, offset = decode_varint(data, offset)
+        values.append(value)
+    return values, offset
+
+
+def encode_header(size: int, ships_types: list) -> bytes:
+    """
+    Возвращает заголовок файла записей для доски size и флота ships_types.
+    """
+
+    return MAGIC + encode_varints([VERSION, size, len(ships_types), *ships_types])
+
+
+def decode_header(data) -> tuple[int, list, int]:
+    """
+    Разбирает заголовок файла записей.
+    Возвращает размер доски, флот и смещение первой записи.
+    Если это не файл записей, выбрасывает ValueError.
+    """
+
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError('Это не файл записей партий.')
+    try:
+        version, offset = decode_varint(data, len(MAGIC))
+        if version != VERSION:
+            raise ValueError(f'Неподдерживаемая версия формата: {version}.')
+        size, offset = decode_varint(data, offset)
+        count, offset = decode_varint(data, offset)
+        ships_types, offset = decode_varints(data, offset, count)
+    except IndexError:
+        raise ValueError('Заголовок файла записей оборван.')
+    return size, ships_types, offset
+
+
+class GameRecord():
+    """
+    Класс для представления одной прочитанной записи партии.
+
+    Атрибуты
+    --------
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    winner : int
+        Номер победившего игрока: 0 - ходивший первым, 1 - вторым.
+    placements : tuple
+        Расстановки досок первого и второго игрока:
+        списки (x, y, направление) в порядке флота.
+    cells : list
+        Номера клеток выстрелов x * size + y по порядку.
+
+    Методы
+    --------
+    shots():
+        Возвращает выстрелы в формате GameResult.shots.
+    result():
+        Возвращает итоги партии, объект GameResult.
+    boards(board_class=Board):
+        Восстанавливает готовые к игре доски обоих игроков.
+    """
+
+    def __init__(self,
+                 size: int,
+                 ships_types: list,
+                 winner: int,
+                 placements: tuple,
+                 cells: list) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта GameRecord.
+
+        Атрибуты
+        --------
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        winner : int
+            Номер победившего игрока: 0 - ходивший первым, 1 - вторым.
+        placements : tuple
+            Расстановки досок первого и второго игрока:
+            списки (x, y, направление) в порядке флота.
+        cells : list
+            Номера клеток выстрелов x * size + y по порядку.
+        """
+
+        self.size = size
+        self.ships_types = ships_types
+        self.winner = winner
+        self.placements = placements
+        self.cells = cells
+
+    def shots(self) -> list:
+        """
+        Возвращает выстрелы в формате GameResult.shots:
+        (номер игрока, x, y, право следующего хода осталось за игроком).
+        Право хода сохраняется при попадании, поэтому для восстановления
+        достаточно знать клетки кораблей каждой доски.
+        """
+
+        size = self.size
+        decks = list()
+        for placement in self.placements:
+            cells = set()
+            for length, (x, y, direction) in zip(self.ships_types, placement):
+                dx, dy = (1, 0) if direction == 0 else (0, 1)
+                cells.update((x + dx * i) * size + y + dy * i
+                             for i in range(length))
+            decks.append(cells)
+        shots = list()
+        player = 0
+        for cell in self.cells:
+            # Игрок стреляет по доске соперника
+            repeat = cell in decks[1 - player]
+            shots.append((player, cell // size, cell % size, repeat))
+            if not repeat:
+                player = 1 - player
+        return shots
+
+    def result(self) -> GameResult:
+        """
+        Возвращает итоги партии, объект GameResult.
+        """
+
+        return GameResult(self.winner, len(self.cells), self.shots())
+
+    def boards(self, board_class: type = Board) -> list:
+        """
+        Восстанавливает готовые к игре доски первого и второго игрока.
+        """
+
+        boards = list()
+        for placement in self.placements:
+            board = board_class(self.size, self.ships_types)
+            for length, (x, y, direction) in zip(self.ships_types, placement):
+                board.add_ship(Ship(length, Dot(x, y), direction))
+            board.get_ready()
+            boards.append(board)
+        return boards
+
+
+class RecordWriter():
+    """
+    Класс для представления потоковой записи партий в файл.
+    Записи только дописываются в конец файла. Если файл уже существует,
+    его заголовок должен совпадать с размером доски и флотом.
+
+    Атрибуты
+    --------
+    path : str
+        Путь к файлу записей.
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    count : int
+        Количество партий, записанных этим объектом.
+
+    Методы
+    --------
+    write_record(int, tuple, list):
+        Записывает партию по номеру победителя, расстановкам и клеткам выстрелов.
+    write(list, GameResult):
+        Записывает партию по доскам и её итогам.
+    flush():
+        Сбрасывает буфер записи на диск.
+    close():
+        Закрывает файл.
+    """
+
+    def __init__(self, path: str, size: int, ships_types: list) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта RecordWriter.
+
+        Атрибуты
+        --------
+        path : str
+            Путь к файлу записей.
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        count : int
+            Количество партий, записанных этим объектом.
+        """
+
+        self.path = path
+        self.size = size
+        self.ships_types = list(ships_types)
+        self.count = 0
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as file:
+                size, ships_types, _ = decode_header(file.read(64 + len(ships_types) * 2))
+            if (size, ships_types) != (self.size, self.ships_types):
+                raise ValueError('Размер доски или флот не совпадают '
+                                 'с заголовком файла записей.')
+            self._file = open(path, 'ab', buffering=1 << 16)
+        else:
+            self._file = open(path, 'wb', buffering=1 << 16)
+            self._file.write(encode_header(self.size, self.ships_types))
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write_record(self, winner: int, placements: tuple, cells: list) -> None:
+        """
+        Записывает партию по номеру победителя, расстановкам досок
+        (списки (x, y, направление) в порядке флота) и клеткам выстрелов.
+        """
+
+        size = self.size
+        body = encode_varints([winner,
+                               *((x * size + y) * 2 + direction
+                                 for placement in placements
+                                 for x, y, direction in placement),
+                               len(cells), *cells])
+        self._file.write(encode_varints([len(body)]) + body)
+        self.count += 1
+
+    def write(self, boards: list, result: GameResult) -> None:
+        """
+        Записывает партию по доскам первого и второго игрока
+        (например, HeadlessGame.boards) и её итогам, объекту GameResult.
+        """
+
+        placements = tuple([(ship.bow.x, ship.bow.y, ship.direction)
+                            for ship in board.ships] for board in boards)
+        self.write_record(result.winner, placements,
+                          [x * self.size + y for _, x, y, _ in result.shots])
+
+    def flush(self) -> None:
+        """
+        Сбрасывает буфер записи на диск.
+        """
+
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        Закрывает файл.
+        """
+
+        self._file.close()
+
+
+class RecordReader():
+    """
+    Класс для представления чтения файла записей через mmap.
+    Файл не загружается в память целиком: при открытии строится только
+    индекс смещений записей, а сами записи разбираются при обращении.
+
+    Атрибуты
+    --------
+    path : str
+        Путь к файлу записей.
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    offsets : array
+        Смещения начала каждой записи (после её длины) в файле.
+
+    Методы
+    --------
+    record(int):
+        Возвращает запись партии с указанным номером.
+    close():
+        Закрывает файл.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта RecordReader.
+
+        Атрибуты
+        --------
+        path : str
+            Путь к файлу записей.
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        offsets : array
+            Смещения начала каждой записи (после её длины) в файле.
+        """
+
+        self.path = path
+        self._file = open(path, 'rb')
+        self._data = None
+        try:
+            # Пустой файл нельзя отобразить в память, а заголовка в нём нет
+            if not os.fstat(self._file.fileno()).st_size:
+                raise ValueError(f'Файл записей {path} пуст: нет заголовка.')
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.size, self.ships_types, offset = decode_header(self._data)
+        except BaseException:
+            self.close()
+            raise
+        # Индекс смещений: проходим по длинам записей, не разбирая их
+        self.offsets = array('Q')
+        end = len(self._data)
+        while offset < end:
+            try:
+                length, start = decode_varint(self._data, offset)
+            except IndexError:
+                break
+            if start + length > end:
+                # Оборванная последняя запись
+                break
+            self.offsets.append(start)
+            offset = start + length
+
+    def __enter__(self) -> 'RecordReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> GameRecord:
+        return self.record(index)
+
+    def __iter__(self):
+        for index in range(len(self.offsets)):
+            yield self.record(index)
+
+    def record(self, index: int) -> GameRecord:
+        """
+        Возвращает запись партии с указанным номером, объект GameRecord.
+        Если партии с таким номером в файле нет, выбрасывает IndexError.
+        """
+
+        if not 0 <= index < len(self.offsets):
+            raise IndexError(f'Партии с номером {index} нет: в файле '
+                             f'{len(self.offsets)} партий.')
+        data = self._data
+        size = self.size
+        ships = len(self.ships_types)
+        winner, offset = decode_varint(data, self.offsets[index])
+        codes, offset = decode_varints(data, offset, ships * 2)
+        placements = tuple([((code >> 1) // size, (code >> 1) % size, code & 1)
+                            for code in codes[board * ships:(board + 1) * ships]]
+                           for board in (0, 1))
+        count, offset = decode_varint(data, offset)
+        cells, _ = decode_varints(data, offset, count)
+        return GameRecord(size, self.ships_types, winner, placements, cells)
+
+    def close(self) -> None:
+        """
+        Закрывает файл.
+        """
+
+        if self._data is not None:
+            self._data.close()
+        self._file.close()
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    """
+
+    parser = argparse.ArgumentParser(description='Просмотр файла записей партий')
+    parser.add_argument('path', help='файл записей')
+    parser.add_argument('--show', type=int, default=None,
+                        help='вывести выстрелы партии с этим номером')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    with RecordReader(args.path) as reader:
+        games = len(reader)
+        size = os.path.getsize(args.path)
+        print(f'Доска {reader.size}x{reader.size}, флот {reader.ships_types}')
+        print(f'Партий: {games}, размер файла: {size} байт, '
+              f'в среднем {size / games if games else 0:.1f} байт на партию')
+        if args.show is not None:
+            record = reader[args.show]
+            print(f'Партия {args.show}: победил игрок {record.winner}')
+            for player, x, y, repeat in record.shots():
+                print(f'  игрок {player}: {x + 1} {y + 1}'
+                      f'{" (попадание)" if repeat else ""}')
@@ -0,0 +1,624 @@
+"""
+Асинхронный сетевой сервер «Морского боя» по TCP.
+Все партии идут в одном цикле событий asyncio: пока сервер ждёт ход
+одного клиента, остальные партии продолжаются.
+
+Протокол построчный, в кодировке UTF-8 (подходит nc / telnet).
+После подключения клиент отправляет соперника: AI, DensityAI или PVP
+(партия с другим подключившимся клиентом). Затем сервер присылает доски
+и строку 'x y =', на которую клиент отвечает двумя числами через пробел.
+По окончании партии сервер закрывает соединение.
+
+Запуск сервера: python server.py --port 8765
+Нагрузочная проверка на localhost: python server.py --bench 2000
+"""
+
+import argparse
+import asyncio
+import os
+from collections import deque
+from functools import partial
+from random import Random, shuffle
+from time import perf_counter, process_time
+
+from main import (AI, BOARD_SIZE, DEFAULT_RNG, SHIPS_TYPES, BitBoard, Board,
+                  DensityAI, Dot, GameResult, HeadlessGame, Player, parse_fleet)
+
+
+# Соперники, которых может выбрать клиент
+OPPONENTS = {'AI': AI, 'DensityAI': DensityAI}
+# Выбор партии против другого клиента
+PVP = 'PVP'
+# Строка, которой сервер запрашивает ход
+PROMPT = 'x y ='
+# Сколько последних значений задержек хранит сервер для статистики
+LATENCY_WINDOW = 100000
+
+
+class RemotePlayer(Player):
+    """
+    Класс для представления игрока, присылающего ходы по сети.
+
+    Наследуемые атрибуты
+    --------
+    own_board : Board
+        Собственная доска.
+    opponent_board: Board
+        Доска соперника.
+    last_shot : Dot
+        Точка последнего удачного (без исключений) выстрела игрока.
+    rng : Random
+        Генератор случайных чисел игрока (не используется).
+
+    Атрибуты
+    --------
+    reader : asyncio.StreamReader
+        Поток чтения соединения с клиентом.
+    writer : asyncio.StreamWriter
+        Поток записи соединения с клиентом.
+    waiting : float
+        Суммарное время ожидания ходов клиента в секундах.
+
+    Методы
+    --------
+    send(str):
+        Отправляет клиенту строку.
+    report(str):
+        Отправляет клиенту сообщение игрока, если включён параметр _is_verbose.
+    ask():
+        Синхронный запрос хода по сети невозможен, выбрасывает исключение.
+    async ask_async():
+        Запрашивает у клиента, в какую клетку он делает выстрел,
+        и ждёт ответа, не блокируя другие партии.
+    """
+
+    def __init__(self,
+                 own_board: Board,
+                 opponent_board: Board,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 rng: Random = DEFAULT_RNG) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта RemotePlayer.
+
+        Атрибуты
+        --------
+        reader : asyncio.StreamReader
+            Поток чтения соединения с клиентом.
+        writer : asyncio.StreamWriter
+            Поток записи соединения с клиентом.
+        waiting : float
+            Суммарное время ожидания ходов клиента в секундах.
+        """
+
+        super().__init__(own_board, opponent_board, rng)
+        self.reader = reader
+        self.writer = writer
+        self.waiting = 0.0
+
+    def send(self, message: str) -> None:
+        """
+        Отправляет клиенту строку.
+        """
+
+        if not self.writer.is_closing():
+            self.writer.write((message + '\n').encode())
+
+    def report(self, message: str) -> None:
+        """
+        Отправляет клиенту сообщение игрока, если включён параметр _is_verbose.
+        В отличие от Player.report, не делает паузу.
+        """
+
+        if self._is_verbose:
+            self.send(message)
+
+    def ask(self) -> Dot:
+        """
+        Синхронный запрос хода по сети невозможен, выбрасывает исключение.
+        """
+
+        raise NotImplementedError('RemotePlayer делает ходы только через ask_async.')
+
+    async def ask_async(self) -> Dot:
+        """
+        Запрашивает у клиента, в какую клетку он делает выстрел,
+        и ждёт ответа, не блокируя другие партии.
+        Если клиент отключился, выбрасывает ConnectionResetError.
+        """
+
+        self.send(PROMPT)
+        started = perf_counter()
+        await self.writer.drain()
+        line = await self.reader.readline()
+        self.waiting += perf_counter() - started
+        if not line:
+            raise ConnectionResetError('Клиент отключился.')
+        x, y = line.decode().strip().split()
+        return Dot(int(x) - 1, int(y) - 1)
+
+
+class NetworkGame(HeadlessGame):
+    """
+    Класс для представления партии по сети.
+    Ходы игроков ожидаются асинхронно, после каждого хода удалённые
+    игроки получают свою доску и скрытую доску соперника.
+
+    Наследуемые атрибуты
+    --------
+    board_class : type
+        Класс доски: Board или BitBoard.
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    boards : list
+        Доски первого и второго игрока.
+    players : list
+        Первый и второй игрок.
+
+    Атрибуты
+    --------
+    latencies : list
+        Задержки обработки ходов сервером в секундах
+        (без времени ожидания ввода клиента).
+
+    Методы
+    --------
+    view(int):
+        Возвращает изображение досок для игрока с указанным номером.
+    notify(str):
+        Отправляет сообщение всем удалённым игрокам.
+    async loop_async():
+        Асинхронный игровой цикл. Возвращает итоги игры, объект GameResult.
+    """
+
+    def __init__(self,
+                 first_class: type,
+                 second_class: type,
+                 board_class: type = Board,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта NetworkGame.
+        Классы игроков могут быть и functools.partial от RemotePlayer
+        с уже переданными потоками соединения.
+
+        Атрибуты
+        --------
+        latencies : list
+            Задержки обработки ходов сервером в секундах
+            (без времени ожидания ввода клиента).
+        """
+
+        super().__init__(first_class, second_class, board_class,
+                         size, ships_types)
+        for player in self.players:
+            if isinstance(player, RemotePlayer):
+                player.is_verbose = True
+        self.latencies = list()
+
+    def view(self, player: int) -> str:
+        """
+        Возвращает изображение досок для игрока с указанным номером:
+        его собственную доску и скрытую доску соперника.
+        """
+
+        opponent_board = self.boards[1 - player]
+        opponent_board.is_hidden = True
+        try:
+            return ('Ваша доска:\n\n' + self.boards[player].render()
+                    + 'Доска соперника:\n\n' + opponent_board.render())
+        finally:
+            opponent_board.is_hidden = False
+
+    def notify(self, message: str) -> None:
+        """
+        Отправляет сообщение всем удалённым игрокам.
+        """
+
+        for player in self.players:
+            if isinstance(player, RemotePlayer):
+                player.send(message)
+
+    async def loop_async(self) -> GameResult:
+        """
+        Асинхронный игровой цикл.
+        Если удалённый игрок отключился, победа присуждается сопернику.
+        Возвращает итоги игры, объект GameResult.
+        """
+
+        shots = list()
+        player = 0
+        for number, current in enumerate(self.players):
+            if isinstance(current, RemotePlayer):
+                current.send(self.view(number))
+        while True:
+            current = self.players[player]
+            waiting = getattr(current, 'waiting', 0.0)
+            started = perf_counter()
+            try:
+                live_ships = current.opponent_board.live_ships
+                repeat = await current.move_async()
+            except ConnectionError:
+                self.notify('\nСоперник отключился. Вы победили!')
+                return GameResult(1 - player, len(shots), shots)
+            dot = current.last_shot
+            shots.append((player, dot.x, dot.y, repeat))
+            if current.opponent_board.live_ships < live_ships:
+                result = 'Корабль потоплен!'
+            else:
+                result = 'Попадание!' if repeat else 'Мимо.'
+            for number, other in enumerate(self.players):
+                if isinstance(other, RemotePlayer):
+                    who = 'Ваш выстрел' if number == player else 'Выстрел соперника'
+                    other.send(f'\n{who}: {dot.x + 1} {dot.y + 1}. {result}\n')
+                    other.send(self.view(number))
+            self.latencies.append(perf_counter() - started
+                                  - (getattr(current, 'waiting', 0.0) - waiting))
+            if current.opponent_board.is_loser():
+                for number, other in enumerate(self.players):
+                    if isinstance(other, RemotePlayer):
+                        other.send('Вы выиграли!' if number == player
+                                   else 'Вы проиграли.')
+                return GameResult(player, len(shots), shots)
+            if not repeat:
+                player = 1 - player
+
+
+def percentile(values: list, share: float) -> float:
+    """
+    Возвращает значение из values, не превышаемое долей share значений.
+    """
+
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class BattleshipServer():
+    """
+    Класс для представления сервера, который ведёт множество партий
+    в одном цикле событий asyncio.
+
+    Атрибуты
+    --------
+    host : str
+        Адрес сервера.
+    port : int
+        Порт сервера (0 - любой свободный).
+    board_class : type
+        Класс доски: Board или BitBoard.
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    waiting : tuple
+        Клиент, ожидающий соперника для партии PVP:
+        (reader, writer, future), или None.
+    active : int
+        Количество идущих партий.
+    peak_active : int
+        Наибольшее количество одновременно идущих партий.
+    finished : int
+        Количество законченных партий.
+    moves : int
+        Количество сделанных ходов.
+    move_latencies : deque
+        Задержки обработки последних ходов в секундах.
+    session_latencies : deque
+        Средние задержки обработки хода в последних партиях в секундах.
+
+    Методы
+    --------
+    async start():
+        Запускает сервер и возвращает объект asyncio.Server.
+    async handle(asyncio.StreamReader, asyncio.StreamWriter):
+        Обслуживает одно подключение клиента.
+    async play(NetworkGame):
+        Проводит партию и учитывает её в статистике.
+    stats():
+        Возвращает статистику сервера.
+    """
+
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 8765,
+                 board_class: type = BitBoard,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта BattleshipServer.
+
+        Атрибуты
+        --------
+        host : str
+            Адрес сервера.
+        port : int
+            Порт сервера (0 - любой свободный).
+        board_class : type
+            Класс доски: Board или BitBoard.
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        waiting : tuple
+            Клиент, ожидающий соперника для партии PVP:
+            (reader, writer, future), или None.
+        active : int
+            Количество идущих партий.
+        peak_active : int
+            Наибольшее количество одновременно идущих партий.
+        finished : int
+            Количество законченных партий.
+        moves : int
+            Количество сделанных ходов.
+        move_latencies : deque
+            Задержки обработки последних ходов в секундах.
+        session_latencies : deque
+            Средние задержки обработки хода в последних партиях в секундах.
+        """
+
+        self.host = host
+        self.port = port
+        self.board_class = board_class
+        self.size = size
+        self.ships_types = list(ships_types)
+        self.waiting = None
+        self.active = 0
+        self.peak_active = 0
+        self.finished = 0
+        self.moves = 0
+        self.move_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.session_latencies = deque(maxlen=LATENCY_WINDOW)
+        self._started = perf_counter()
+        self._cpu_started = process_time()
+
+    async def start(self) -> asyncio.Server:
+        """
+        Запускает сервер и возвращает объект asyncio.Server.
+        Если был указан порт 0, в port записывается выбранный порт.
+        """
+
+        server = await asyncio.start_server(self.handle, self.host, self.port,
+                                            limit=1024, backlog=4096)
+        self.port = server.sockets[0].getsockname()[1]
+        self._started = perf_counter()
+        self._cpu_started = process_time()
+        return server
+
+    async def handle(self,
+                     reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """
+        Обслуживает одно подключение клиента: узнаёт выбранного соперника
+        и проводит партию. Клиент, выбравший PVP, ждёт следующего такого же;
+        если он отключился, не дождавшись, его место занимает следующий.
+        """
+
+        try:
+            writer.write(f'«Морской бой» {self.size}x{self.size}. '
+                         f'Соперник ({", ".join([*OPPONENTS, PVP])}):\n'.encode())
+            line = await reader.readline()
+            choice = line.decode(errors='replace').strip()
+            remote = partial(RemotePlayer, reader=reader, writer=writer)
+            if choice in OPPONENTS:
+                await self.play(NetworkGame(remote, OPPONENTS[choice],
+                                            self.board_class, self.size,
+                                            self.ships_types))
+            elif choice == PVP:
+                self._drop_disconnected()
+                if self.waiting is None:
+                    # Первый клиент ждёт, партию проведёт обработчик второго
+                    finished = asyncio.get_running_loop().create_future()
+                    self.waiting = (reader, writer, finished)
+                    writer.write('Ожидание соперника...\n'.encode())
+                    await finished
+                else:
+                    first_reader, first_writer, finished = self.waiting
+                    self.waiting = None
+                    first = partial(RemotePlayer, reader=first_reader,
+                                    writer=first_writer)
+                    try:
+                        await self.play(NetworkGame(first, remote,
+                                                    self.board_class, self.size,
+                                                    self.ships_types))
+                    finally:
+                        # Обработчик первого клиента мог быть отменён
+                        if not finished.done():
+                            finished.set_result(None)
+            elif line:
+                writer.write('Неизвестный соперник.\n'.encode())
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _drop_disconnected(self) -> None:
+        """
+        Вспомогательный метод.
+        Если клиент, ожидающий соперника, уже отключился, освобождает
+        место ожидания и завершает его обработчик, чтобы следующий клиент
+        не попал в партию с разорванным соединением.
+        """
+
+        if self.waiting is None:
+            return
+        reader, writer, finished = self.waiting
+        if writer.is_closing() or reader.at_eof() or reader.exception() is not None:
+            self.waiting = None
+            if not finished.done():
+                finished.set_result(None)
+
+    async def play(self, game: NetworkGame) -> GameResult:
+        """
+        Проводит партию и учитывает её в статистике.
+        Возвращает итоги игры, объект GameResult.
+        """
+
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            return await game.loop_async()
+        finally:
+            self.active -= 1
+            self.finished += 1
+            self.moves += len(game.latencies)
+            self.move_latencies.extend(game.latencies)
+            if game.latencies:
+                self.session_latencies.append(sum(game.latencies)
+                                              / len(game.latencies))
+
+    def stats(self) -> dict:
+        """
+        Возвращает статистику сервера: количество партий, наибольшее число
+        одновременных партий, задержки обработки ходов (мс) и партий на ядро
+        в секунду процессорного времени (весь цикл событий занимает одно ядро).
+        """
+
+        cpu = process_time() - self._cpu_started
+        return {'finished': self.finished,
+                'active': self.active,
+                'peak_active': self.peak_active,
+                'moves': self.moves,
+                'move_p50_ms': percentile(self.move_latencies, 0.5) * 1000,
+                'move_p99_ms': percentile(self.move_latencies, 0.99) * 1000,
+                'session_p50_ms': percentile(self.session_latencies, 0.5) * 1000,
+                'session_p99_ms': percentile(self.session_latencies, 0.99) * 1000,
+                'seconds': perf_counter() - self._started,
+                'cpu_seconds': cpu,
+                'sessions_per_core_second': self.finished / cpu if cpu else 0.0}
+
+
+async def bot_client(host: str, port: int, opponent: str, size: int) -> list:
+    """
+    Клиент для нагрузочной проверки: стреляет по клеткам в случайном
+    порядке до закрытия соединения сервером.
+    Возвращает задержки от отправки хода до следующего запроса хода
+    или конца партии в секундах.
+    """
+
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 16)
+    writer.write(f'{opponent}\n'.encode())
+    cells = [f'{x} {y}\n'.encode() for x in range(1, size + 1)
+             for y in range(1, size + 1)]
+    shuffle(cells)
+    latencies = list()
+    sent = None
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(PROMPT.encode()):
+                if sent is not None:
+                    latencies.append(perf_counter() - sent)
+                writer.write(cells.pop())
+                sent = perf_counter()
+    finally:
+        writer.close()
+    return latencies
+
+
+async def bench(sessions: int,
+                concurrency: int,
+                opponent: str,
+                board_class: type,
+                size: int,
+                ships_types: list) -> None:
+    """
+    Нагрузочная проверка на localhost: запускает сервер и sessions
+    клиентов-ботов, из которых одновременно играют не более concurrency.
+    Выводит статистику сервера и задержки, измеренные клиентами.
+    Клиенты работают в том же процессе, поэтому число партий на ядро
+    получается заниженным.
+    """
+
+    server = BattleshipServer('127.0.0.1', 0, board_class, size, ships_types)
+    listener = await server.start()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def limited() -> list:
+        async with limit:
+            return await bot_client(server.host, server.port, opponent, size)
+
+    started = perf_counter()
+    results = await asyncio.gather(*(limited() for _ in range(sessions)))
+    elapsed = perf_counter() - started
+    listener.close()
+    await listener.wait_closed()
+    client = [latency for latencies in results for latency in latencies]
+    report(server.stats())
+    print(f'Клиенты: партий {sessions} за {elapsed:.2f} с '
+          f'({sessions / elapsed:.0f} партий/с), задержка ответа на ход '
+          f'p50 {percentile(client, 0.5) * 1000:.2f} мс, '
+          f'p99 {percentile(client, 0.99) * 1000:.2f} мс')
+
+
+def report(stats: dict) -> None:
+    """
+    Выводит статистику сервера.
+    """
+
+    print(f'Партий: {stats["finished"]}, идёт {stats["active"]}, '
+          f'одновременно до {stats["peak_active"]}, ходов {stats["moves"]}')
+    print(f'Обработка хода: p50 {stats["move_p50_ms"]:.3f} мс, '
+          f'p99 {stats["move_p99_ms"]:.3f} мс; средняя по партиям: '
+          f'p50 {stats["session_p50_ms"]:.3f} мс, p99 {stats["session_p99_ms"]:.3f} мс')
+    print(f'Процессорное время: {stats["cpu_seconds"]:.2f} с, '
+          f'партий на ядро в секунду: {stats["sessions_per_core_second"]:.1f} '
+          f'(ядер: {os.cpu_count()}, сервер занимает одно)', flush=True)
+
+
+async def serve(server: BattleshipServer, interval: float) -> None:
+    """
+    Запускает сервер и раз в interval секунд выводит его статистику.
+    """
+
+    listener = await server.start()
+    print(f'Сервер слушает {server.host}:{server.port}', flush=True)
+    async with listener:
+        while True:
+            await asyncio.sleep(interval)
+            report(server.stats())
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    """
+
+    parser = argparse.ArgumentParser(description='Сервер «Морского боя»')
+    parser.add_argument('--host', default='127.0.0.1', help='адрес сервера')
+    parser.add_argument('--port', type=int, default=8765, help='порт сервера')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE,
+                        help='размер доски')
+    parser.add_argument('--fleet', type=parse_fleet, default=SHIPS_TYPES,
+                        help='длины кораблей через запятую')
+    parser.add_argument('--list-board', action='store_true',
+                        help='использовать Board вместо BitBoard')
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help='период вывода статистики в секундах')
+    parser.add_argument('--bench', type=int, default=0,
+                        help='провести нагрузочную проверку с этим числом партий')
+    parser.add_argument('--concurrency', type=int, default=1000,
+                        help='число одновременных клиентов при проверке')
+    parser.add_argument('--opponent', default='AI', choices=[*OPPONENTS, PVP],
+                        help='соперник клиентов при проверке')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    board_class = Board if args.list_board else BitBoard
+    if args.bench:
+        asyncio.run(bench(args.bench, args.concurrency, args.opponent,
+                          board_class, args.size, args.fleet))
+    else:
+        try:
+            asyncio.run(serve(BattleshipServer(args.host, args.port, board_class,
+                                               args.size, args.fleet),
+                              args.interval))
+        except KeyboardInterrupt:
+            pass
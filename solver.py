@@ -0,0 +1,370 @@
+"""
+Точный решатель для небольших досок: SolverAI перебирает все расстановки
+оставшихся кораблей, согласованные с уже известными промахами, попаданиями
+и потопленными кораблями, и стреляет в клетку, занятую кораблём в наибольшей
+доле этих расстановок.
+
+Результаты перебора хранятся в LRU-кэше, ключ которого - каноническое
+состояние доски: маска заведомо пустых клеток, маска подбитых, но не
+потопленных палуб и оставшийся флот. Канонизация учитывает 8 симметрий
+квадрата (повороты и отражения), поэтому симметричные позиции перебираются
+один раз. Если расстановок слишком много (начало партии), SolverAI ходит
+как DensityAI.
+
+Перед канонизацией SolverAI ищет готовый результат в общей таблице
+транспозиций main.TRANSPOSITIONS по хешу Зобриста доски соперника,
+поэтому повторные позиции (в том числе в других партиях того же
+процесса) не требуют ни канонизации, ни обращения к кэшу перебора.
+"""
+
+from functools import lru_cache
+
+from main import (PLACEMENT_CACHE_SIZE, DEFAULT_RNG, TRANSPOSITIONS, Board,
+                  DensityAI, Dot, ship_placements)
+
+
+# Сколько состояний хранит кэш перебора
+SOLVER_CACHE_SIZE = 1 << 16
+# Наибольшее количество расстановок, которое перебирается точно
+LAYOUT_LIMIT = 20000
+# Во сколько раз грубая оценка числа расстановок может превышать
+# LAYOUT_LIMIT, чтобы ещё стоило пробовать точный перебор
+ESTIMATE_FACTOR = 50
+
+
+class _TooManyLayouts(Exception):
+    """
+    Вспомогательное исключение: перебор превысил допустимое число расстановок.
+    """
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def symmetries(size: int) -> tuple[tuple[int, ...], ...]:
+    """
+    Возвращает 8 симметрий квадратной доски размера size (повороты
+    и отражения) в виде перестановок: для каждой клетки x * size + y -
+    номер клетки, в которую она переходит.
+    """
+
+    last = size - 1
+    transforms = (lambda x, y: (x, y), lambda x, y: (y, last - x),
+                  lambda x, y: (last - x, last - y), lambda x, y: (last - y, x),
+                  lambda x, y: (x, last - y), lambda x, y: (last - x, y),
+                  lambda x, y: (y, x), lambda x, y: (last - y, last - x))
+    permutations = list()
+    for transform in transforms:
+        permutation = list()
+        for x in range(size):
+            for y in range(size):
+                nx, ny = transform(x, y)
+                permutation.append(nx * size + ny)
+        permutations.append(tuple(permutation))
+    return tuple(permutations)
+
+
+@lru_cache(maxsize=PLACEMENT_CACHE_SIZE)
+def symmetry_tables(size: int) -> tuple[tuple[tuple[int, ...], ...], ...]:
+    """
+    Возвращает таблицы для быстрого преобразования масок симметриями:
+    для каждой симметрии и каждого байта маски - 256 готовых масок образа.
+    """
+
+    tables = list()
+    for permutation in symmetries(size):
+        chunks = list()
+        for start in range(0, size * size, 8):
+            table = list()
+            for byte in range(256):
+                mask = 0
+                for bit in range(8):
+                    if byte >> bit & 1 and start + bit < size * size:
+                        mask |= 1 << permutation[start + bit]
+                table.append(mask)
+            chunks.append(tuple(table))
+        tables.append(tuple(chunks))
+    return tuple(tables)
+
+
+def transform_mask(mask: int, chunks: tuple) -> int:
+    """
+    Возвращает образ маски при симметрии, заданной таблицами chunks
+    из symmetry_tables.
+    """
+
+    result = 0
+    for table in chunks:
+        result |= table[mask & 0xFF]
+        mask >>= 8
+    return result
+
+
+def canonical_state(size: int, blocked: int, hits: int) -> tuple[int, int, int]:
+    """
+    Возвращает номер симметрии и образы масок blocked и hits при ней,
+    лексикографически наименьшие среди всех 8 симметрий доски.
+    """
+
+    best = None
+    for number, chunks in enumerate(symmetry_tables(size)):
+        state = (transform_mask(blocked, chunks), transform_mask(hits, chunks))
+        if best is None or state < best[1:]:
+            best = (number, *state)
+    return best
+
+
+@lru_cache(maxsize=SOLVER_CACHE_SIZE)
+def layout_counts(size: int,
+                  fleet: tuple,
+                  blocked: int,
+                  hits: int,
+                  limit: int = LAYOUT_LIMIT) -> tuple:
+    """
+    Перебирает все расстановки кораблей fleet, в которых корабли не
+    касаются друг друга, не занимают клеток blocked, накрывают все клетки
+    hits и ни один корабль не состоит только из клеток hits (иначе он
+    был бы уже потоплен).
+    Возвращает (количество расстановок, для каждой клетки количество
+    расстановок, где она занята кораблём) или None, если расстановок
+    больше limit. Результат хранится в LRU-кэше.
+    """
+
+    cells = size * size
+    lengths = sorted(set(fleet), reverse=True)
+    placements = dict()
+    for length in lengths:
+        placements[length] = [(mask, oreol, ship_cells)
+                              for _, _, mask, oreol, ship_cells, _
+                              in ship_placements(size, length)
+                              if not mask & blocked and mask & ~hits
+                              and not (oreol & ~mask) & hits]
+    counts = [0] * cells
+    total = 0
+    remaining = {length: fleet.count(length) for length in lengths}
+    chosen = list()
+
+    def place_free(free: list, index: int, start: int, occupied: int) -> None:
+        # Свободные корабли (без подбитых палуб) ставим по возрастанию
+        # номера положения внутри одной длины, чтобы не считать
+        # одинаковые корабли дважды
+        nonlocal total
+        length = free[index]
+        options = placements[length]
+        if index == len(free) - 1:
+            found = 0
+            for mask, _, ship_cells in options[start:]:
+                if not mask & occupied:
+                    found += 1
+                    for cell in ship_cells:
+                        counts[cell] += 1
+            if found:
+                for ship_cells in chosen:
+                    for cell in ship_cells:
+                        counts[cell] += found
+                total += found
+                if total > limit:
+                    raise _TooManyLayouts
+            return
+        same = free[index + 1] == length
+        for number in range(start, len(options)):
+            mask, oreol, ship_cells = options[number]
+            if mask & occupied:
+                continue
+            chosen.append(ship_cells)
+            place_free(free, index + 1, number + 1 if same else 0,
+                       occupied | oreol)
+            chosen.pop()
+
+    def cover(uncovered: int, occupied: int) -> None:
+        # Самую младшую ещё не накрытую подбитую палубу обязан
+        # накрыть какой-то из оставшихся кораблей
+        nonlocal total
+        if not uncovered:
+            free = [length for length in lengths
+                    for _ in range(remaining[length])]
+            if free:
+                place_free(free, 0, 0, occupied)
+            else:
+                for ship_cells in chosen:
+                    for cell in ship_cells:
+                        counts[cell] += 1
+                total += 1
+                if total > limit:
+                    raise _TooManyLayouts
+            return
+        low = uncovered & -uncovered
+        for length in lengths:
+            if not remaining[length]:
+                continue
+            remaining[length] -= 1
+            for mask, oreol, ship_cells in placements[length]:
+                if mask & low and not mask & occupied:
+                    chosen.append(ship_cells)
+                    cover(uncovered & ~mask, occupied | oreol)
+                    chosen.pop()
+            remaining[length] += 1
+
+    try:
+        cover(hits, 0)
+    except _TooManyLayouts:
+        return None
+    return total, tuple(counts)
+
+
+class SolverAI(DensityAI):
+    """
+    Класс для представления игрока-компьютера, который точно перебирает
+    расстановки кораблей, согласованные с результатами выстрелов, и стреляет
+    в клетку с наибольшей вероятностью попадания. Это жадное приближение
+    к минимизации ожидаемого числа оставшихся выстрелов: каждое попадание
+    сохраняет право хода. Пока расстановок слишком много, ходит как DensityAI.
+
+    Наследуемые атрибуты
+    --------
+    own_board : Board
+        Собственная доска.
+    opponent_board: Board
+        Доска соперника.
+    last_shot : Dot
+        Точка последнего удачного (без исключений) выстрела игрока.
+    rng : Random
+        Генератор случайных чисел игрока.
+    size : int
+        Размер доски соперника.
+    fleet : dict
+        Количество ещё не потопленных кораблей каждой длины.
+    available : bytearray
+        Для каждой клетки флаг: можно ли ещё в неё стрелять.
+    hits : set
+        Клетки подбитых, но ещё не потопленных кораблей.
+
+    Атрибуты
+    --------
+    limit : int
+        Наибольшее количество расстановок для точного перебора.
+    exact_moves : int
+        Количество ходов, выбранных точным перебором.
+    fallback_moves : int
+        Количество ходов, выбранных как у DensityAI.
+    salt : int
+        Добавка к хешу Зобриста для ключей таблицы транспозиций:
+        отличает размер доски, флот и limit.
+
+    Наследуемые методы
+    --------
+    move():
+        Делает ход в игре и учитывает его результат в карте плотности.
+    observe(Dot, bool, bool):
+        Учитывает результат выстрела: промах, попадание или потопление.
+
+    Методы
+    --------
+    estimate():
+        Возвращает грубую оценку сверху числа согласованных расстановок.
+    state():
+        Возвращает маски заведомо пустых клеток и подбитых палуб.
+    ask():
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Для SolverAI это клетка, занятая кораблём в наибольшем числе
+        согласованных расстановок.
+    """
+
+    def __init__(self,
+                 own_board: Board,
+                 opponent_board: Board,
+                 rng=DEFAULT_RNG,
+                 limit: int = LAYOUT_LIMIT) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта SolverAI.
+
+        Атрибуты
+        --------
+        limit : int
+            Наибольшее количество расстановок для точного перебора.
+        exact_moves : int
+            Количество ходов, выбранных точным перебором.
+        fallback_moves : int
+            Количество ходов, выбранных как у DensityAI.
+        salt : int
+            Добавка к хешу Зобриста для ключей таблицы транспозиций:
+            отличает размер доски, флот и limit.
+        """
+
+        super().__init__(own_board, opponent_board, rng)
+        self.limit = limit
+        self.exact_moves = 0
+        self.fallback_moves = 0
+        self.salt = hash(('SolverAI', self.size,
+                          tuple(opponent_board.ships_types), limit)) & (1 << 64) - 1
+
+    def estimate(self) -> float:
+        """
+        Возвращает грубую оценку сверху числа согласованных расстановок:
+        произведение по длинам числа ещё возможных положений в степени
+        количества кораблей, делённое на перестановки одинаковых кораблей.
+        """
+
+        estimate = 1.0
+        for length, number in self.fleet.items():
+            alive = sum(self.alive[length])
+            for k in range(number):
+                estimate *= (alive - k) / (k + 1)
+        return estimate
+
+    def state(self) -> tuple[int, int]:
+        """
+        Возвращает маски заведомо пустых клеток (промахи, потопленные
+        корабли и их ореол) и подбитых, но не потопленных палуб.
+        """
+
+        blocked = hits = 0
+        for cell in self.hits:
+            hits |= 1 << cell
+        for cell, free in enumerate(self.available):
+            if not free:
+                blocked |= 1 << cell
+        return blocked & ~hits, hits
+
+    def ask(self) -> Dot:
+        """
+        Спрашивает игрока, в какую клетку он делает выстрел.
+        Для SolverAI это клетка, занятая кораблём в наибольшем числе
+        согласованных расстановок.
+        """
+
+        result = None
+        fleet = tuple(length for length, number in sorted(self.fleet.items(),
+                                                          reverse=True)
+                      for _ in range(number))
+        if fleet and self.estimate() <= self.limit * ESTIMATE_FACTOR:
+            key = self.opponent_board.zobrist ^ self.salt
+            entry = TRANSPOSITIONS.get(key)
+            if entry is None:
+                blocked, hits = self.state()
+                symmetry, blocked, hits = canonical_state(self.size, blocked, hits)
+                result = layout_counts(self.size, fleet, blocked, hits, self.limit)
+                # Дороже всего результаты с большим числом расстановок
+                TRANSPOSITIONS.put(key, (symmetry, result),
+                                   result[0] if result else self.limit)
+            else:
+                symmetry, result = entry
+        if not result:
+            self.fallback_moves += 1
+            return super().ask()
+        self.exact_moves += 1
+        _, counts = result
+        permutation = symmetries(self.size)[symmetry]
+        best = -1
+        candidates = list()
+        for cell, free in enumerate(self.available):
+            if not free:
+                continue
+            count = counts[permutation[cell]]
+            if count > best:
+                best = count
+                candidates = [cell]
+            elif count == best:
+                candidates.append(cell)
+        cell = candidates[self.rng.randint(0, len(candidates) - 1)]
+        x, y = cell // self.size, cell % self.size
+        self.report(f'x y = {x + 1} {y + 1}')
+        return Dot(x, y)
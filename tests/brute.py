@@ -0,0 +1,32 @@
+"""
+Наивный перебор расстановок флота для сверки с быстрыми алгоритмами.
+"""
+
+from main import ship_placements
+
+
+def enumerate_layouts(size: int, fleet: list, blocked: int = 0):
+    """
+    Перебирает все расстановки кораблей fleet на доске size, в которых
+    корабли не касаются друг друга и не занимают клеток blocked.
+    Одинаковые корабли ставятся по возрастанию номера положения, поэтому
+    каждая расстановка встречается один раз. Возвращает генератор
+    кортежей масок кораблей.
+    """
+
+    fleet = sorted(fleet, reverse=True)
+    placements = {length: ship_placements(size, length) for length in set(fleet)}
+
+    def place(index: int, occupied: int, start: int, masks: tuple):
+        if index == len(fleet):
+            yield masks
+            return
+        length = fleet[index]
+        first = start if index and fleet[index - 1] == length else 0
+        for number in range(first, len(placements[length])):
+            _, _, mask, oreol, _, _ = placements[length][number]
+            if not mask & (occupied | blocked):
+                yield from place(index + 1, occupied | oreol, number + 1,
+                                 masks + (mask,))
+
+    return place(0, 0, 0, ())
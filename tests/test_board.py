@@ -0,0 +1,129 @@
+"""
+Проверки отмены выстрелов (make_shot / unmake_shot) и снимков состояния
+(snapshot / restore) для Board и BitBoard.
+"""
+
+import unittest
+from random import Random
+
+from main import SHIPS_TYPES, BitBoard, Board, BoardUsedException, Dot, Game
+
+
+def ready_board(board_class: type, seed: int) -> Board:
+    """
+    Возвращает готовую к игре доску с расстановкой, заданной зерном seed.
+    """
+
+    board = Game.random_board(board_class, 6, SHIPS_TYPES, Random(seed))
+    board.get_ready()
+    board.is_verbose = False
+    return board
+
+
+def state(board: Board) -> tuple:
+    """
+    Возвращает всё видимое и внутреннее состояние доски для сравнения.
+    """
+
+    return (board.render(), tuple(map(tuple, board.table)), board.snapshot(),
+            board.zobrist, board.live_ships, board.is_loser(),
+            tuple(ship.lives for ship in board.ships))
+
+
+def shots(board: Board, rng: Random, method: str = 'shot') -> list:
+    """
+    Стреляет по доске в случайные клетки до победы методом method
+    и возвращает состояния доски перед каждым выстрелом.
+    """
+
+    cells = [Dot(x, y) for x in range(board.size) for y in range(board.size)]
+    rng.shuffle(cells)
+    states = list()
+    for dot in cells:
+        if board.is_loser():
+            break
+        before = state(board)
+        try:
+            getattr(board, method)(dot)
+        except BoardUsedException:
+            # Клетка уже в ореоле, и состояние не изменилось
+            assert state(board) == before
+            continue
+        states.append(before)
+    return states
+
+
+class MakeUnmakeTest(unittest.TestCase):
+    """
+    unmake_shot возвращает доску точно в состояние до make_shot.
+    """
+
+    def test_round_trip(self):
+        for board_class in (Board, BitBoard):
+            for seed in range(10):
+                board = ready_board(board_class, seed)
+                states = shots(board, Random(seed), 'make_shot')
+                self.assertTrue(board.is_loser())
+                for before in reversed(states):
+                    board.unmake_shot()
+                    self.assertEqual(state(board), before)
+
+    def test_same_as_shot(self):
+        for board_class in (Board, BitBoard):
+            for seed in range(10):
+                made = ready_board(board_class, seed)
+                shot = ready_board(board_class, seed)
+                self.assertEqual(shots(made, Random(seed), 'make_shot'),
+                                 shots(shot, Random(seed), 'shot'))
+                self.assertEqual(state(made), state(shot))
+
+    def test_boards_agree(self):
+        for seed in range(10):
+            board = ready_board(Board, seed)
+            bitboard = ready_board(BitBoard, seed)
+            for before, bit_before in zip(shots(board, Random(seed)),
+                                          shots(bitboard, Random(seed))):
+                # Снимки у классов разного вида, сравниваем остальное
+                self.assertEqual(before[:2] + before[3:], bit_before[:2] + bit_before[3:])
+
+
+class SnapshotTest(unittest.TestCase):
+    """
+    restore возвращает доску в состояние snapshot.
+    """
+
+    def test_round_trip(self):
+        for board_class in (Board, BitBoard):
+            for seed in range(10):
+                board = ready_board(board_class, seed)
+                rng = Random(seed)
+                states = shots(board, rng)
+                snapshot = states[len(states) // 2][2]
+                board.restore(snapshot)
+                self.assertEqual(state(board), states[len(states) // 2])
+                # После восстановления игра продолжается как обычно
+                shots(board, rng)
+                self.assertTrue(board.is_loser())
+
+    def test_restore_clears_journal(self):
+        for board_class in (Board, BitBoard):
+            board = ready_board(board_class, 0)
+            snapshot = board.snapshot()
+            shots(board, Random(0), 'make_shot')
+            board.restore(snapshot)
+            self.assertEqual(board.snapshot(), snapshot)
+            with self.assertRaises(IndexError):
+                board.unmake_shot()
+
+    def test_other_board(self):
+        # Снимок переносится на доску с той же расстановкой
+        for board_class in (Board, BitBoard):
+            board = ready_board(board_class, 3)
+            shots(board, Random(3))
+            copy = ready_board(board_class, 3)
+            copy.restore(board.snapshot())
+            self.assertEqual(state(copy), state(board))
+
+
+if __name__ == '__main__':
+    unittest.main()
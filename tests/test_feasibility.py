@@ -0,0 +1,68 @@
+"""
+Проверки расстановки флота: main.fleet_feasibility, Game.check_fleet
+и Game.random_board.
+"""
+
+import unittest
+from random import Random
+
+from main import BitBoard, Board, Game, fleet_feasibility
+from tests.brute import enumerate_layouts
+
+
+class FleetFeasibilityTest(unittest.TestCase):
+    """
+    Сверка fleet_feasibility с наивным перебором.
+    """
+
+    def test_against_brute_force(self):
+        rng = Random(0)
+        checked = set()
+        for size in range(3, 7):
+            for _ in range(40):
+                fleet = tuple(sorted((rng.randint(1, min(size, 4))
+                                      for _ in range(rng.randint(1, size + 1))),
+                                     reverse=True))
+                if (size, fleet) in checked:
+                    continue
+                checked.add((size, fleet))
+                expected = next(enumerate_layouts(size, list(fleet)), None) is not None
+                self.assertEqual(fleet_feasibility(size, fleet)[0], expected,
+                                 (size, fleet))
+
+    def test_known_fleets(self):
+        self.assertTrue(fleet_feasibility(6, (3, 2, 2, 1, 1, 1, 1))[0])
+        self.assertTrue(fleet_feasibility(10, (4, 3, 3, 2, 2, 2, 1, 1, 1, 1))[0])
+        self.assertFalse(fleet_feasibility(6, (3, 3, 3, 3, 3))[0])
+        self.assertFalse(fleet_feasibility(4, (5,))[0])
+
+    def test_density(self):
+        _, density = fleet_feasibility(6, (3, 2, 1))
+        self.assertAlmostEqual(density, (8 + 6 + 4) / 49)
+
+
+class CheckFleetTest(unittest.TestCase):
+    """
+    Game.check_fleet и Game.random_board для возможных и невозможных флотов.
+    """
+
+    def test_rejects(self):
+        for size, fleet in ((6, [3, 3, 3, 3, 3]), (4, [5]), (6, []), (6, [2, 0])):
+            with self.assertRaises(ValueError):
+                Game.check_fleet(size, fleet)
+
+    def test_accepts(self):
+        Game.check_fleet(6, [3, 2, 2, 1, 1, 1, 1])
+        Game.check_fleet(6, [1, 2, 3])
+
+    def test_random_board(self):
+        rng = Random(0)
+        for board_class in (Board, BitBoard):
+            self.assertIsNone(Game.random_board(board_class, 6, [3, 3, 3, 3, 3], rng))
+            board = Game.random_board(board_class, 6, [3, 2, 2, 1, 1, 1, 1], rng)
+            self.assertEqual(sorted((ship.length for ship in board.ships),
+                                    reverse=True), [3, 2, 2, 1, 1, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
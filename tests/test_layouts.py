@@ -0,0 +1,70 @@
+"""
+Проверки точного подсчёта и равномерного выбора расстановок (layouts.py).
+"""
+
+import os
+import tempfile
+import unittest
+from random import Random
+
+from main import BitBoard, Board
+from tests.brute import enumerate_layouts
+
+try:
+    import layouts
+except ImportError:
+    layouts = None
+
+
+@unittest.skipIf(layouts is None, 'нужен NumPy')
+class LayoutTableTest(unittest.TestCase):
+    """
+    Таблицы расстановок против наивного перебора.
+    """
+
+    CASES = [(4, (4, 4)), (4, (2, 1)), (5, (3, 2, 1)), (5, (2, 2, 1, 1)),
+             (6, (3, 2, 1)), (6, (3, 2, 2, 1))]
+
+    def test_count(self):
+        for size, fleet in self.CASES:
+            self.assertEqual(layouts.layout_table(size, fleet, None).count(),
+                             sum(1 for _ in enumerate_layouts(size, list(fleet))),
+                             (size, fleet))
+
+    def test_known_counts(self):
+        self.assertEqual(layouts.layout_table(4, (4, 4), None).count(), 6)
+        self.assertEqual(layouts.layout_table(6, (3, 2, 2, 1, 1, 1, 1), None).count(),
+                         526888)
+
+    def test_cache_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            built = layouts.layout_table(5, (3, 2, 1), directory)
+            path = layouts.cache_path(5, (3, 2, 1), directory)
+            self.assertTrue(os.path.exists(path))
+            loaded = layouts.LayoutTable.load(path, 5, [3, 2, 1])
+            self.assertEqual(loaded.count(), built.count())
+
+    def test_uniform_choice(self):
+        # Все 6 расстановок двух четырёхпалубников на 4x4 выбираются
+        # примерно поровну
+        table = layouts.layout_table(4, (4, 4), None)
+        rng = Random(0)
+        seen = dict()
+        for _ in range(600):
+            board = table.make_board(Board, rng)
+            key = frozenset((ship.bow, ship.direction) for ship in board.ships)
+            seen[key] = seen.get(key, 0) + 1
+        self.assertEqual(len(seen), 6)
+        self.assertTrue(all(60 <= count <= 140 for count in seen.values()), seen)
+
+    def test_choice_fleet(self):
+        table = layouts.layout_table(6, (3, 2, 2, 1, 1, 1, 1), None)
+        board = table.make_board(BitBoard, Random(0))
+        self.assertEqual(sorted((ship.length for ship in board.ships), reverse=True),
+                         [3, 2, 2, 1, 1, 1, 1])
+        with self.assertRaises(ValueError):
+            layouts.layout_table(6, (3, 3, 3, 3, 3), None).make_board(Board, Random(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
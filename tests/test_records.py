@@ -0,0 +1,89 @@
+"""
+Проверки кодирования varint и записи партий в файл.
+"""
+
+import os
+import tempfile
+import unittest
+
+from main import AI, BOARD_SIZE, SHIPS_TYPES, DensityAI, HeadlessGame
+from records import (RecordReader, RecordWriter, decode_varint, decode_varints,
+                     encode_varints)
+
+
+class VarintTest(unittest.TestCase):
+    """
+    Кодирование неотрицательных чисел в varint и обратно.
+    """
+
+    VALUES = [0, 1, 0x7F, 0x80, 300, 0x3FFF, 0x4000, 2 ** 32, 2 ** 63 + 5]
+
+    def test_round_trip_one(self):
+        for value in self.VALUES:
+            data = encode_varints([value])
+            self.assertEqual(decode_varint(data, 0), (value, len(data)))
+
+    def test_round_trip_many(self):
+        data = b'\x07' + encode_varints(self.VALUES)
+        values, offset = decode_varints(data, 1, len(self.VALUES))
+        self.assertEqual(values, self.VALUES)
+        self.assertEqual(offset, len(data))
+
+    def test_round_trip_small(self):
+        # Все числа меньше 0x80 - быстрый путь, один байт на число
+        values = list(range(0x80))
+        data = encode_varints(values)
+        self.assertEqual(len(data), len(values))
+        self.assertEqual(decode_varints(data, 0, len(values)),
+                         (values, len(values)))
+
+    def test_truncated(self):
+        data = encode_varints([2 ** 40])
+        with self.assertRaises(IndexError):
+            decode_varint(data[:-1], 0)
+        with self.assertRaises(IndexError):
+            decode_varints(encode_varints([1, 2, 3]), 0, 4)
+
+
+class RecordFileTest(unittest.TestCase):
+    """
+    Запись партий RecordWriter и чтение RecordReader.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'games.bsr')
+
+    def test_round_trip(self):
+        games = [HeadlessGame(DensityAI, AI, seed=seed) for seed in range(5)]
+        results = [game.start() for game in games]
+        with RecordWriter(self.path, BOARD_SIZE, SHIPS_TYPES) as writer:
+            for game, result in zip(games, results):
+                writer.write(game.boards, result)
+        with RecordReader(self.path) as reader:
+            self.assertEqual(len(reader), len(games))
+            for game, result, record in zip(games, results, reader):
+                self.assertEqual(record.winner, result.winner)
+                self.assertEqual(record.shots(), result.shots)
+                for board, restored in zip(game.boards, record.boards()):
+                    self.assertEqual(
+                        [(ship.bow, ship.direction) for ship in board.ships],
+                        [(ship.bow, ship.direction) for ship in restored.ships])
+            with self.assertRaises(IndexError):
+                reader.record(len(games))
+
+    def test_append_other_fleet(self):
+        with RecordWriter(self.path, BOARD_SIZE, SHIPS_TYPES):
+            pass
+        with self.assertRaises(ValueError):
+            RecordWriter(self.path, BOARD_SIZE + 1, SHIPS_TYPES)
+
+    def test_empty_file(self):
+        open(self.path, 'wb').close()
+        with self.assertRaises(ValueError):
+            RecordReader(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Сверка точного подсчёта расстановок solver.layout_counts с наивным перебором.
+"""
+
+import unittest
+from random import Random
+
+from solver import layout_counts
+from tests.brute import enumerate_layouts
+
+
+def brute_counts(size: int, fleet: tuple, blocked: int, hits: int) -> tuple:
+    """
+    Считает то же, что layout_counts, перебором всех расстановок:
+    корабли накрывают все клетки hits, и ни один не состоит только из них.
+    """
+
+    counts = [0] * (size * size)
+    total = 0
+    for masks in enumerate_layouts(size, list(fleet), blocked):
+        union = 0
+        for mask in masks:
+            union |= mask
+        if hits & ~union or any(not mask & ~hits for mask in masks):
+            continue
+        total += 1
+        for cell in range(size * size):
+            if union >> cell & 1:
+                counts[cell] += 1
+    return total, tuple(counts)
+
+
+class LayoutCountsTest(unittest.TestCase):
+    """
+    layout_counts на маленьких досках.
+    """
+
+    CASES = [(4, (2, 1)), (4, (2, 2, 1)), (5, (3, 2, 1)), (5, (2, 2, 1, 1)),
+             (6, (3, 2, 1))]
+
+    def check(self, size: int, fleet: tuple, blocked: int, hits: int) -> None:
+        expected = brute_counts(size, fleet, blocked, hits)
+        self.assertEqual(layout_counts(size, fleet, blocked, hits, 10 ** 9),
+                         expected, (size, fleet, bin(blocked), bin(hits)))
+
+    def test_empty_board(self):
+        for size, fleet in self.CASES:
+            self.check(size, fleet, 0, 0)
+
+    def test_consistent_observations(self):
+        # Промахи и попадания берутся из настоящей расстановки,
+        # поэтому хотя бы одна согласованная расстановка есть
+        rng = Random(0)
+        for size, fleet in self.CASES:
+            layouts = list(enumerate_layouts(size, list(fleet)))
+            for _ in range(10):
+                masks = rng.choice(layouts)
+                union = 0
+                for mask in masks:
+                    union |= mask
+                cells = rng.sample(range(size * size), size)
+                blocked = sum(1 << cell for cell in cells if not union >> cell & 1)
+                hits = sum(1 << cell for cell in cells if union >> cell & 1)
+                # Целиком подбитый корабль был бы потоплен
+                for mask in masks:
+                    if mask & hits == mask:
+                        hits &= ~(mask & -mask)
+                self.check(size, fleet, blocked, hits)
+                self.assertGreater(layout_counts(size, fleet, blocked, hits,
+                                                 10 ** 9)[0], 0)
+
+    def test_random_observations(self):
+        rng = Random(1)
+        for size, fleet in self.CASES:
+            for _ in range(10):
+                cells = rng.sample(range(size * size), size)
+                hits = sum(1 << cell for cell in cells[:2])
+                blocked = sum(1 << cell for cell in cells[2:])
+                self.check(size, fleet, blocked, hits)
+
+    def test_limit(self):
+        total, _ = layout_counts(6, (3, 2, 1), 0, 0, 10 ** 9)
+        self.assertIsNone(layout_counts(6, (3, 2, 1), 0, 0, total - 1))
+        self.assertEqual(layout_counts(6, (3, 2, 1), 0, 0, total)[0], total)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Проверки доверительных интервалов турнира.
+"""
+
+import unittest
+
+from tournament import Z_95, mean_interval, wilson_interval
+
+
+class WilsonIntervalTest(unittest.TestCase):
+    """
+    Интервал Уилсона для доли побед.
+    """
+
+    def test_no_games(self):
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+
+    def test_known_value(self):
+        low, high = wilson_interval(50, 100)
+        self.assertAlmostEqual(low, 0.40383, places=4)
+        self.assertAlmostEqual(high, 0.59617, places=4)
+
+    def test_contains_share_within_bounds(self):
+        for games in (1, 2, 7, 100, 10000):
+            for wins in range(0, games + 1, max(1, games // 10)):
+                low, high = wilson_interval(wins, games)
+                self.assertLessEqual(0.0, low)
+                self.assertLessEqual(high, 1.0)
+                self.assertLessEqual(low, wins / games)
+                self.assertLessEqual(wins / games, high)
+
+    def test_symmetric(self):
+        low, high = wilson_interval(30, 100)
+        mirror_low, mirror_high = wilson_interval(70, 100)
+        self.assertAlmostEqual(low, 1 - mirror_high)
+        self.assertAlmostEqual(high, 1 - mirror_low)
+
+    def test_narrows_with_games(self):
+        widths = [high - low for low, high in
+                  (wilson_interval(games // 2, games) for games in (10, 100, 1000))]
+        self.assertEqual(widths, sorted(widths, reverse=True))
+
+    def test_wider_with_larger_z(self):
+        low, high = wilson_interval(40, 100, Z_95)
+        wide_low, wide_high = wilson_interval(40, 100, 2.575829)
+        self.assertLess(wide_low, low)
+        self.assertGreater(wide_high, high)
+
+
+class MeanIntervalTest(unittest.TestCase):
+    """
+    Среднее по гистограмме и его интервал.
+    """
+
+    def test_empty(self):
+        self.assertEqual(mean_interval({}), (0.0, (0.0, 0.0)))
+
+    def test_mean_inside_interval(self):
+        mean, (low, high) = mean_interval({20: 3, 30: 1})
+        self.assertAlmostEqual(mean, 22.5)
+        self.assertLess(low, mean)
+        self.assertLess(mean, high)
+
+
+if __name__ == '__main__':
+    unittest.main()
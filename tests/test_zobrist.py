@@ -0,0 +1,100 @@
+"""
+Проверки хеша Зобриста: после любых выстрелов и их отмены он совпадает
+с хешем, заново посчитанным по видимому состоянию доски.
+"""
+
+import unittest
+from random import Random
+
+from main import HIT, MISS, SUNK, BitBoard, Board, BoardUsedException, Dot, zobrist_keys
+from tests.test_board import ready_board, shots
+
+
+def recompute(board: Board) -> int:
+    """
+    Считает хеш Зобриста доски с нуля: промахи и ореол - MISS,
+    палубы живых кораблей - HIT, палубы потопленных - SUNK.
+    """
+
+    keys = zobrist_keys(board.size)
+    decks = dict()
+    for ship in board.ships:
+        for dot in ship.dots:
+            decks[dot.x * board.size + dot.y] = ship
+    zobrist = 0
+    for x, column in enumerate(board.table):
+        for y, symbol in enumerate(column):
+            cell = x * board.size + y
+            if symbol == '•':
+                zobrist ^= keys[cell][MISS]
+            elif symbol == '×':
+                zobrist ^= keys[cell][SUNK if decks[cell].lives == 0 else HIT]
+    return zobrist
+
+
+class ZobristTest(unittest.TestCase):
+    """
+    Инкрементальный хеш против пересчитанного.
+    """
+
+    def test_keys(self):
+        keys = zobrist_keys(6)
+        self.assertEqual(len(keys), 36)
+        self.assertEqual(len({key for cell in keys for key in cell}), 36 * 3)
+        zobrist_keys.cache_clear()
+        self.assertEqual(zobrist_keys(6), keys)
+
+    def test_after_shots(self):
+        for board_class in (Board, BitBoard):
+            for seed in range(10):
+                board = ready_board(board_class, seed)
+                self.assertEqual(board.zobrist, 0)
+                shots(board, Random(seed))
+                self.assertEqual(board.zobrist, recompute(board))
+
+    def test_every_shot_and_unmake(self):
+        for board_class in (Board, BitBoard):
+            for seed in range(5):
+                board = ready_board(board_class, seed)
+                rng = Random(seed)
+                played = 0
+                while not board.is_loser():
+                    x, y = rng.randrange(6), rng.randrange(6)
+                    if board.table[x][y] in '•×':
+                        continue
+                    board.make_shot(Dot(x, y))
+                    played += 1
+                    self.assertEqual(board.zobrist, recompute(board))
+                for _ in range(played):
+                    board.unmake_shot()
+                    self.assertEqual(board.zobrist, recompute(board))
+                self.assertEqual(board.zobrist, 0)
+
+    def test_boards_agree(self):
+        for seed in range(10):
+            board = ready_board(Board, seed)
+            bitboard = ready_board(BitBoard, seed)
+            shots(board, Random(seed))
+            shots(bitboard, Random(seed))
+            self.assertEqual(board.zobrist, bitboard.zobrist)
+
+    def test_order_independent(self):
+        # Одна и та же позиция, достигнутая в другом порядке, - тот же хеш
+        cells = [Dot(x, y) for x in range(6) for y in range(6)]
+        Random(0).shuffle(cells)
+        for board_class in (Board, BitBoard):
+            boards = list()
+            for order in (cells[:20], cells[19::-1]):
+                board = ready_board(board_class, 7)
+                for dot in order:
+                    try:
+                        board.shot(dot)
+                    except BoardUsedException:
+                        pass
+                boards.append(board)
+            self.assertEqual(boards[0].render(), boards[1].render())
+            self.assertEqual(boards[0].zobrist, boards[1].zobrist)
+
+
+if __name__ == '__main__':
+    unittest.main()
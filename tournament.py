@@ -0,0 +1,313 @@
+import argparse
+import importlib
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from time import perf_counter
+
+import main
+from main import (BOARD_SIZE, SHIPS_TYPES, BitBoard, Board, HeadlessGame, User,
+                  parse_fleet)
+
+
+# Количество партий, которое процесс играет за одно задание
+CHUNK_SIZE = 250
+# Квантиль нормального распределения для 95% доверительных интервалов
+Z_95 = 1.959964
+
+
+def play_chunk(first_class: type,
+               second_class: type,
+               board_class: type,
+               games: int,
+               seed: int,
+               size: int = BOARD_SIZE,
+               ships_types: list = SHIPS_TYPES) -> tuple[list[int], dict, float]:
+    """
+    Играет games партий между двумя стратегиями в текущем процессе.
+    Возвращает только сводку, чтобы не гонять между процессами
+    результаты отдельных партий: список побед каждой стратегии,
+    словарь {количество ходов: количество партий} и время игры в секундах.
+    """
+
+    started = perf_counter()
+    main.seed_random(seed)
+    wins = [0, 0]
+    turns = Counter()
+    for _ in range(games):
+        result = HeadlessGame(first_class, second_class, board_class,
+                              size, ships_types).start()
+        wins[result.winner] += 1
+        turns[result.turns] += 1
+    return wins, dict(turns), perf_counter() - started
+
+
+def chunk_seed(seed: int, pair: int, chunk: int) -> int:
+    """
+    Возвращает детерминированное зерно для задания.
+    Зерно зависит только от общего зерна турнира, номера пары и номера
+    задания, поэтому результат не зависит от того, какой процесс его выполнил.
+    """
+
+    return (seed * 1_000_003 + pair) * 1_000_003 + chunk
+
+
+def wilson_interval(wins: int, games: int, z: float = Z_95) -> tuple:
+    """
+    Возвращает доверительный интервал Уилсона для доли побед.
+    """
+
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / games
+    denominator = 1 + z * z / games
+    centre = (p + z * z / (2 * games)) / denominator
+    spread = z * math.sqrt(p * (1 - p) / games
+                           + z * z / (4 * games * games)) / denominator
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+def mean_interval(histogram: dict, z: float = Z_95) -> tuple:
+    """
+    Возвращает среднее значение по гистограмме {значение: количество}
+    и его доверительный интервал (нормальное приближение).
+    """
+
+    n = sum(histogram.values())
+    if n == 0:
+        return 0.0, (0.0, 0.0)
+    mean = sum(value * count for value, count in histogram.items()) / n
+    if n == 1:
+        return mean, (mean, mean)
+    variance = sum(count * (value - mean) ** 2
+                   for value, count in histogram.items()) / (n - 1)
+    spread = z * math.sqrt(variance / n)
+    return mean, (mean - spread, mean + spread)
+
+
+class Tournament():
+    """
+    Класс для представления турнира между стратегиями-потомками Player.
+    Партии разбиваются на задания по chunk_size штук и распределяются
+    по пулу процессов. Внутри пары стратегии по очереди ходят первыми.
+
+    Атрибуты
+    --------
+    pairs : list
+        Список пар классов игроков (первый, второй).
+    games : int
+        Количество партий для каждой пары.
+    seed : int
+        Общее зерно турнира.
+    workers : int
+        Количество процессов (по умолчанию - число ядер).
+    chunk_size : int
+        Количество партий в одном задании.
+    board_class : type
+        Класс доски: Board или BitBoard.
+    size : int
+        Размер досок.
+    ships_types : list
+        Длины всех кораблей флота в порядке убывания.
+    elapsed : float
+        Время последнего турнира целиком в секундах (0.0 до run()).
+
+    Методы
+    --------
+    @staticmethod
+    round_robin(list):
+        Возвращает все пары разных классов из списка.
+    tasks():
+        Возвращает список заданий (номер пары, первый класс, второй класс,
+        количество партий, зерно, поменяны ли игроки местами).
+    run():
+        Проводит турнир и возвращает сводные результаты по парам.
+    """
+
+    def __init__(self,
+                 pairs: list,
+                 games: int,
+                 seed: int = 0,
+                 workers: int = None,
+                 chunk_size: int = CHUNK_SIZE,
+                 board_class: type = Board,
+                 size: int = BOARD_SIZE,
+                 ships_types: list = SHIPS_TYPES) -> None:
+        """
+        Устанавливает все необходимые атрибуты для объекта Tournament.
+
+        Атрибуты
+        --------
+        pairs : list
+            Список пар классов игроков (первый, второй).
+        games : int
+            Количество партий для каждой пары.
+        seed : int
+            Общее зерно турнира.
+        workers : int
+            Количество процессов (по умолчанию - число ядер).
+        chunk_size : int
+            Количество партий в одном задании.
+        board_class : type
+            Класс доски: Board или BitBoard.
+        size : int
+            Размер досок.
+        ships_types : list
+            Длины всех кораблей флота в порядке убывания.
+        elapsed : float
+            Время последнего турнира целиком в секундах (0.0 до run()).
+        """
+
+        for pair in pairs:
+            for player_class in pair:
+                if issubclass(player_class, User):
+                    raise ValueError('User запрашивает ввод и '
+                                     'не может играть в турнире.')
+        if chunk_size < 1:
+            raise ValueError('Параметр chunk_size должен быть больше нуля.')
+        self.pairs = list(pairs)
+        self.games = games
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.board_class = board_class
+        self.size = size
+        self.ships_types = list(ships_types)
+        self.elapsed = 0.0
+
+    @staticmethod
+    def round_robin(classes: list) -> list:
+        """
+        Возвращает все пары разных классов из списка.
+        """
+
+        return list(combinations(classes, 2))
+
+    def tasks(self) -> list:
+        """
+        Возвращает список заданий (номер пары, первый класс, второй класс,
+        количество партий, зерно, поменяны ли игроки местами).
+        """
+
+        tasks = list()
+        for pair_index, (first, second) in enumerate(self.pairs):
+            for chunk, start in enumerate(range(0, self.games, self.chunk_size)):
+                games = min(self.chunk_size, self.games - start)
+                swapped = chunk % 2 == 1
+                players = (second, first) if swapped else (first, second)
+                tasks.append((pair_index, *players, games,
+                              chunk_seed(self.seed, pair_index, chunk), swapped))
+        return tasks
+
+    def run(self) -> list:
+        """
+        Проводит турнир и возвращает сводные результаты по парам:
+        список словарей с названиями стратегий, количеством партий и побед,
+        долями побед с доверительными интервалами, гистограммой числа ходов
+        и средним числом ходов с доверительным интервалом. Задания разных пар
+        идут вперемешку, поэтому время пары - сумма времени её заданий
+        в процессах, а время турнира целиком записывается в elapsed.
+        """
+
+        wins = [[0, 0] for _ in self.pairs]
+        turns = [Counter() for _ in self.pairs]
+        seconds = [0.0 for _ in self.pairs]
+        started = perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(play_chunk, first, second,
+                                       self.board_class, games, seed,
+                                       self.size, self.ships_types):
+                       (pair_index, swapped)
+                       for pair_index, first, second, games, seed, swapped
+                       in self.tasks()}
+            for future in as_completed(futures):
+                pair_index, swapped = futures[future]
+                chunk_wins, chunk_turns, chunk_seconds = future.result()
+                if swapped:
+                    chunk_wins = chunk_wins[::-1]
+                wins[pair_index][0] += chunk_wins[0]
+                wins[pair_index][1] += chunk_wins[1]
+                turns[pair_index].update(chunk_turns)
+                seconds[pair_index] += chunk_seconds
+        self.elapsed = perf_counter() - started
+
+        results = list()
+        for pair_index, (first, second) in enumerate(self.pairs):
+            games = sum(wins[pair_index])
+            mean, mean_ci = mean_interval(turns[pair_index])
+            results.append({
+                'players': (first.__name__, second.__name__),
+                'games': games,
+                'wins': tuple(wins[pair_index]),
+                'win_rate': wins[pair_index][0] / games if games else 0.0,
+                'win_rate_ci': wilson_interval(wins[pair_index][0], games),
+                'turns_histogram': dict(sorted(turns[pair_index].items())),
+                'mean_turns': mean,
+                'mean_turns_ci': mean_ci,
+                'seconds': seconds[pair_index],
+            })
+        return results
+
+
+def load_player_class(name: str) -> type:
+    """
+    Возвращает класс игрока по имени: 'AI' ищется в main,
+    'module:Class' импортируется из указанного модуля.
+    """
+
+    if ':' in name:
+        module_name, class_name = name.split(':', 1)
+        return getattr(importlib.import_module(module_name), class_name)
+    return getattr(main, name)
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    """
+
+    parser = argparse.ArgumentParser(description='Турнир стратегий «Морского боя»')
+    parser.add_argument('players', nargs='*', default=['AI', 'AI'],
+                        help="классы игроков: 'AI' или 'module:Class'")
+    parser.add_argument('--games', type=int, default=10000,
+                        help='количество партий для каждой пары')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='общее зерно турнира')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='количество процессов')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help='количество партий в одном задании')
+    parser.add_argument('--bitboard', action='store_true',
+                        help='использовать BitBoard вместо Board')
+    parser.add_argument('--size', type=int, default=BOARD_SIZE,
+                        help='размер доски')
+    parser.add_argument('--fleet', type=parse_fleet, default=SHIPS_TYPES,
+                        help='длины кораблей через запятую')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    classes = [load_player_class(name) for name in args.players]
+    pairs = [tuple(classes)] if len(classes) == 2 else Tournament.round_robin(classes)
+    tournament = Tournament(pairs, args.games, args.seed, args.workers,
+                            args.chunk_size,
+                            BitBoard if args.bitboard else Board,
+                            args.size, args.fleet)
+    results = tournament.run()
+    for result in results:
+        low, high = result['win_rate_ci']
+        mean_low, mean_high = result['mean_turns_ci']
+        print(f'{result["players"][0]} против {result["players"][1]}: '
+              f'партий {result["games"]}, побед {result["wins"][0]} / {result["wins"][1]}, '
+              f'доля побед первого {result["win_rate"]:.3f} [{low:.3f}; {high:.3f}], '
+              f'ходов {result["mean_turns"]:.1f} [{mean_low:.1f}; {mean_high:.1f}]')
+        print(f'Время партий пары: {result["seconds"]:.2f} с в сумме по процессам, '
+              f'партий в секунду на процесс: '
+              f'{result["games"] / result["seconds"] if result["seconds"] else 0.0:.1f}')
+    games = sum(result['games'] for result in results)
+    print(f'Всего: {games} партий за {tournament.elapsed:.2f} с, '
+          f'процессов: {tournament.workers}, '
+          f'партий в секунду: {games / tournament.elapsed if tournament.elapsed else 0.0:.1f}')